@@ -20,6 +20,8 @@
 #
 
 from collections import OrderedDict
+import functools
+import hashlib
 import logging
 import os
 import re
@@ -28,16 +30,34 @@ import sys
 
 from . import config
 
+# If set to a list, LogWarning() and the WarningRecorder() also append the
+# warnings to it, so that they can be logged again by ReplayWarnings().
+RecordedWarnings = None
+
+# The subsystems whose per line messages are logged or None for all of them,
+# see IsTracing()
+TracedSubsystems = None
+
 
 def setup_logging():
     """Check GTKDOC_TRACE environment variable.
 
     Set python log level to the value of the environment variable (DEBUG, INFO,
     WARNING, ERROR and CRITICAL) or INFO if the environment variable is empty.
+
+    The per line messages of the hot paths can be limited to some subsystems
+    with GTKDOC_TRACE_SUBSYSTEMS, a comma separated list of: 'header' (scanning
+    the headers), 'decl' (reading the declarations), 'source' (scanning the
+    sources), 'sections' (reading the sections), 'markdown' (converting the
+    docs) and 'xml' (expanding abbreviations).
     """
+    global TracedSubsystems
+
     log_level = os.environ.get('GTKDOC_TRACE', 'WARNING')
     if log_level == '':
         log_level = 'WARNING'
+    subsystems = os.environ.get('GTKDOC_TRACE_SUBSYSTEMS', '')
+    TracedSubsystems = set(subsystems.split(',')) if subsystems else None
     logging.basicConfig(stream=sys.stdout,
                         level=logging.getLevelName(log_level.upper()),
                         format='%(asctime)s:%(filename)s:%(funcName)s:%(lineno)d:%(levelname)s:%(message)s')
@@ -49,6 +69,24 @@ def setup_logging():
         sys.stdout = open(sys.stdout.fileno(), mode='w', encoding='utf8', buffering=1)
 
 
+def IsTracing(subsystem, level=logging.INFO):
+    """Checks if the per line messages of a subsystem are logged.
+
+    The hot paths check this once per call and skip the logging calls if not,
+    as those and their arguments are paid for even if nothing gets printed.
+
+    Args:
+      subsystem (str): the subsystem, see setup_logging()
+      level (int): the log level of the messages
+
+    Returns:
+      bool: True if the messages are logged
+    """
+    if TracedSubsystems is not None and subsystem not in TracedSubsystems:
+        return False
+    return logging.getLogger().isEnabledFor(level)
+
+
 def UpdateFileIfChanged(old_file, new_file, make_backup):
     """Compares the old version of the file with the new version and if the
     file has changed it moves the new version into the old versions place. This
@@ -93,6 +131,22 @@ def UpdateFileIfChanged(old_file, new_file, make_backup):
     return True
 
 
+def GetFileHash(filename):
+    """Get the hash of the content of a file.
+
+    Args:
+        filename (str): The pathname of the file.
+
+    Returns:
+        str: the sha256 hash as hex string
+    """
+    h = hashlib.sha256()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
 def GetModuleDocDir(module_name):
     """Get the docdir for the given module via pkg-config
 
@@ -118,12 +172,43 @@ def LogWarning(filename, line, message):
       line (int): line number in the file
       message (str): the error message to print
     """
+    if RecordedWarnings is not None:
+        RecordedWarnings.append((filename, line, message))
+
     filename = filename or "unknown"
 
     # TODO: write to stderr
     print("%s:%d: warning: %s" % (filename, line, message))
 
 
+class WarningRecorder(logging.Handler):
+    """Appends the warnings logged with the logging module to RecordedWarnings."""
+
+    def __init__(self):
+        super().__init__(logging.WARNING)
+
+    def emit(self, record):
+        if RecordedWarnings is not None:
+            RecordedWarnings.append({
+                'name': record.name, 'levelno': record.levelno, 'levelname': record.levelname,
+                'pathname': record.pathname, 'filename': record.filename, 'module': record.module,
+                'funcName': record.funcName, 'lineno': record.lineno, 'msg': record.getMessage()})
+
+
+def ReplayWarnings(warnings):
+    """Log the warnings that were recorded in RecordedWarnings again.
+
+    Args:
+      warnings (list): the recorded warnings
+    """
+    for warning in warnings:
+        if isinstance(warning, dict):
+            logging.getLogger().handle(logging.makeLogRecord(warning))
+        else:
+            LogWarning(*warning)
+
+
+@functools.lru_cache(maxsize=65536)
 def CreateValidSGMLID(xml_id):
     """Creates a valid SGML 'id' from the given string.
 
@@ -136,6 +221,9 @@ def CreateValidSGMLID(xml_id):
     prevent name clashes (SGML ids are case-insensitive). (It basically never is
     the case that mixed-case identifiers would collide.)
 
+    The same ids are requested many times, so the results are cached, see
+    ReportIdCacheStats().
+
     Args:
       id (str): The text to be converted into a valid SGML id.
 
@@ -161,6 +249,19 @@ def CreateValidSGMLID(xml_id):
     return xml_id
 
 
+def ReportIdCacheStats(out):
+    """Print how often CreateValidSGMLID() was called and answered from its cache.
+
+    Args:
+      out (file): the stream to print the report to
+    """
+    info = CreateValidSGMLID.cache_info()
+    calls = info.hits + info.misses
+    rate = 100.0 * info.hits / calls if calls else 0.0
+    out.write('%-24s %10s %10s %10s\n' % ('cache', 'calls', 'hits', 'hit rate'))
+    out.write('%-24s %10d %10d %9.1f%%\n' % ('CreateValidSGMLID', calls, info.hits, rate))
+
+
 # Parsing helpers (move to mkdb ?)
 
 class ParseError(Exception):
@@ -22,8 +22,10 @@
 ''"Fix cross-references in the HTML documentation.''"
 
 import logging
+import multiprocessing
 import os
 import re
+import sqlite3
 
 from . import common, highlight
 
@@ -44,13 +46,95 @@ NoLinks = {
     'void',
 }
 
+# When this is a list, additions to NoLinks and reports of bad xrefs are
+# collected here instead of being applied. Worker processes use this so that
+# the warnings can be replayed in a deterministic order, see ReplayXRefReports()
+XRefReports = None
+
+# The rewrites that FixHTMLFile() does, in the order they are applied.
+FIX_PATTERNS = [
+    # examples that we highlight
+    ('example', re.compile(
+        r'<div class="(?P<class>example-contents|informalexample)">'
+        r'<pre class="programlisting">(?P<source>.*?)</pre></div>', flags=re.DOTALL)),
+    # links that got escaped
+    ('escaped_link', re.compile(
+        r'&lt;GTKDOCLINK\s+HREF=&quot;(?P<id>.*?)&quot;&gt;(?P<text>.*?)&lt;/GTKDOCLINK&gt;',
+        flags=re.DOTALL)),
+    # functions marked up by the highlighter
+    ('function', re.compile(
+        r'(?P<pre><span class="function">)(?P<symbol>.*?)(?P<post></span>)', flags=re.DOTALL)),
+    # the first item in stuff marked up as 'normal'
+    ('normal', re.compile(
+        r'(?P<pre><span class="normal">\s*)(?P<symbol>.+?)(?P<post>(\s+.+?)?\s*</span>)',
+        flags=re.DOTALL)),
+    # links to resolve, these don't span multiple lines
+    ('link', re.compile(
+        r'<GTKDOCLINK[^\S\n]+HREF="(?P<id>[^"\n]*)"[^\S\n]*>(?P<text>[^\n]*?)</GTKDOCLINK[^\S\n]*>')),
+]
+
+
+def FindFixes(text, level):
+    """Find the matches for the rewrites in FixHTMLFile().
+
+    This works like a regexp that combines the patterns from FIX_PATTERNS with
+    '|', but is a lot faster as each of the patterns starts with a literal that
+    the regexp engine can search for quickly.
+
+    Args:
+        text (str): the text to search
+        level (int): the index of the first rewrite in FIX_PATTERNS to look for
+
+    Yields:
+        tuple: the index of the rewrite in FIX_PATTERNS and the match object
+    """
+    regexps = [regex for (name, regex) in FIX_PATTERNS[level:]]
+    matches = [regex.search(text) for regex in regexps]
+    while True:
+        m = None
+        for (ix, next_m) in enumerate(matches):
+            if next_m and (not m or next_m.start() < m.start()):
+                (m, m_ix) = (next_m, ix)
+        if not m:
+            return
+        yield (level + m_ix, m)
+        pos = m.end()
+        for (ix, next_m) in enumerate(matches):
+            if next_m and next_m.start() < pos:
+                matches[ix] = regexps[ix].search(text, pos)
+
+
+# Database with the links from the index files we read before, see
+# OpenIndexCache()
+IndexCache = None
+# Needs to be increased when the layout of the database changes
+INDEX_CACHE_VERSION = 1
+
+# For lazy lookups, the scanned index files with the position in the scan order
+# and the dir to prefix their links with
+LazyBooks = None
+# The database file for lazy lookups and the connection for the current process
+LazyIndex = None
+LazyIndexConnection = (None, None)
+# Results of the lazy lookups
+LazyLinks = {}
+
 
 def Run(options):
     logging.info('options: %s', str(options.__dict__))
 
-    LoadIndicies(options.module_dir, options.html_dir, options.extra_dir)
+    cache_file = None
+    if options.cache_dir:
+        if not os.path.isdir(options.cache_dir):
+            os.makedirs(options.cache_dir)
+        cache_file = os.path.join(options.cache_dir, 'xref-index.db')
+        highlight.set_cache_dir(os.path.join(options.cache_dir, 'highlight'))
+    elif options.lazy_links:
+        logging.warning('--lazy-links needs --cache-dir')
+    LoadIndicies(options.module_dir, options.html_dir, options.extra_dir, cache_file,
+                 options.lazy_links)
     ReadSections(options.module)
-    FixCrossReferences(options.module_dir, options.module, options.src_lang)
+    FixCrossReferences(options.module_dir, options.module, options.src_lang, options.jobs)
     highlight.append_style_defs(os.path.join(options.module_dir, 'style.css'))
 
 
@@ -58,10 +142,51 @@ def Run(options):
 # loop over them.
 # - module_dir is by default 'html'
 # - html_dir can be set by configure, defaults to $(docdir)
-def LoadIndicies(module_dir, html_dir, extra_dirs):
+def LoadIndicies(module_dir, html_dir, extra_dirs, cache_file=None, lazy=False):
+    """Load the link targets from the index files of all known modules.
+
+    Args:
+        module_dir (str): the directory of the module being processed
+        html_dir (str): the directory where the docs get installed
+        extra_dirs (list): additional directories to scan
+        cache_file (str): an optional database that keeps the links of all read
+                          index files between runs
+        lazy (bool): if set and a cache_file is given, the links are not loaded,
+                     but looked up in the cache_file when they are used
+    """
+    global IndexCache, LazyBooks, LazyIndex, LazyIndexConnection
+
     # Cache of dirs we already scanned for index files
     dir_cache = {}
 
+    # Forget the lazy links of a previous call
+    (pid, db) = LazyIndexConnection
+    if db and pid == os.getpid():
+        db.close()
+    LazyBooks = None
+    LazyIndex = None
+    LazyIndexConnection = (None, None)
+    LazyLinks.clear()
+
+    if cache_file:
+        IndexCache = OpenIndexCache(cache_file)
+    if IndexCache and lazy:
+        LazyBooks = {}
+        LazyIndex = cache_file
+    try:
+        _LoadIndicies(module_dir, html_dir, extra_dirs, dir_cache)
+    finally:
+        if IndexCache:
+            try:
+                IndexCache.commit()
+            except sqlite3.Error as e:
+                logging.info('Cannot update index cache: %s', e)
+            IndexCache.close()
+            IndexCache = None
+
+
+def _LoadIndicies(module_dir, html_dir, extra_dirs, dir_cache):
+
     path_prefix = ''
     m = re.search(r'(.*?)/share/gtk-doc/html', html_dir)
     if m:
@@ -177,12 +302,170 @@ def ReadDevhelp(file, use_absolute_links):
 
     logging.info('Scanning index file=%s, absolute=%d, dir=%s', file, use_absolute_links, dir)
 
+    if LazyBooks is not None:
+        path = os.path.abspath(file)
+        if ReadCachedLinks(file, False) is None:
+            WriteCachedLinks(file, ParseDevhelpLinks(file))
+        LazyBooks[path] = (len(LazyBooks), dir)
+        return
+
+    for (id, link) in ReadDevhelpLinks(file):
+        Links[id] = dir + link
+
+
+def ReadDevhelpLinks(file):
+    """Get the link targets from a devhelp2 file.
+
+    Args:
+        file (str): the devhelp2 file
+
+    Returns:
+        list: (id, link) tuples in the order they appear in the file
+    """
+    if IndexCache:
+        links = ReadCachedLinks(file)
+        if links is not None:
+            return links
+
+    links = ParseDevhelpLinks(file)
+    if IndexCache:
+        WriteCachedLinks(file, links)
+    return links
+
+
+def ParseDevhelpLinks(file):
+    links = []
     for line in open(file, 'r', encoding='utf-8'):
         m = re.search(r' link="([^#]*)#([^"]*)"', line)
         if m:
             link = m.group(1) + '#' + m.group(2)
             logging.debug('Found id: %s href: %s', m.group(2), link)
-            Links[m.group(2)] = dir + link
+            links.append((m.group(2), link))
+    return links
+
+
+def OpenIndexCache(cache_file):
+    """Open the database that caches the links from the index files.
+
+    The links of an index file are stored together with its modification time
+    and size. They are used as long as those don't change.
+
+    Args:
+        cache_file (str): the database file
+
+    Returns:
+        sqlite3.Connection: the database or None if it can't be used
+    """
+    try:
+        db = sqlite3.connect(cache_file, timeout=60)
+        if db.execute('PRAGMA user_version').fetchone()[0] != INDEX_CACHE_VERSION:
+            db.executescript('''
+                DROP TABLE IF EXISTS files;
+                DROP TABLE IF EXISTS links;
+                PRAGMA user_version = %d;
+            ''' % INDEX_CACHE_VERSION)
+        # files.links: one link per line, the id is the part after the '#'
+        # links: the same links by id for lazy lookups
+        db.executescript('''
+            CREATE TABLE IF NOT EXISTS files (
+                path TEXT PRIMARY KEY, mtime INTEGER, size INTEGER, links TEXT);
+            CREATE TABLE IF NOT EXISTS links (id TEXT, path TEXT, link TEXT);
+            CREATE INDEX IF NOT EXISTS links_id ON links (id);
+            CREATE INDEX IF NOT EXISTS links_path ON links (path);
+        ''')
+    except sqlite3.Error as e:
+        logging.warning('Cannot use index cache "%s": %s', cache_file, e)
+        return None
+    return db
+
+
+def ReadCachedLinks(file, load=True):
+    """Get the links of a devhelp2 file from the index cache.
+
+    Args:
+        file (str): the devhelp2 file
+        load (bool): if False only check that the cache is up to date
+
+    Returns:
+        list: (id, link) tuples or None if the file is not or not correctly
+              cached
+    """
+    path = os.path.abspath(file)
+    st = os.stat(path)
+    try:
+        row = IndexCache.execute('SELECT mtime, size, links FROM files WHERE path = ?',
+                                 (path,)).fetchone()
+    except sqlite3.Error as e:
+        logging.info('Cannot read index cache: %s', e)
+        return None
+    if row is None or row[:2] != (st.st_mtime_ns, st.st_size):
+        return None
+    if not load:
+        return []
+    return [(link.partition('#')[2], link) for link in row[2].splitlines()]
+
+
+def WriteCachedLinks(file, links):
+    path = os.path.abspath(file)
+    st = os.stat(path)
+    try:
+        IndexCache.execute('INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)',
+                           (path, st.st_mtime_ns, st.st_size,
+                            '\n'.join(link for (id, link) in links)))
+        IndexCache.execute('DELETE FROM links WHERE path = ?', (path,))
+        IndexCache.executemany('INSERT INTO links VALUES (?, ?, ?)',
+                               [(id, path, link) for (id, link) in links])
+    except sqlite3.Error as e:
+        logging.info('Cannot update index cache: %s', e)
+
+
+def LookupLazyLink(id):
+    """Look up a link in the index files scanned by LoadIndicies().
+
+    Args:
+        id (str): the link target
+
+    Returns:
+        str: the href or None
+    """
+    global LazyIndexConnection
+
+    # sqlite connections must not be shared with forked processes
+    (pid, db) = LazyIndexConnection
+    if pid != os.getpid():
+        try:
+            db = sqlite3.connect(LazyIndex, timeout=60)
+        except sqlite3.Error as e:
+            logging.warning('Cannot use index cache "%s": %s', LazyIndex, e)
+            db = None
+        LazyIndexConnection = (os.getpid(), db)
+    if not db:
+        return None
+
+    try:
+        rows = db.execute('SELECT path, link FROM links WHERE id = ? ORDER BY rowid', (id,)).fetchall()
+    except sqlite3.Error as e:
+        logging.info('Cannot read index cache: %s', e)
+        return None
+
+    href = None
+    order = -1
+    for (path, link) in rows:
+        (ix, dir) = LazyBooks.get(path, (-1, None))
+        # like for the non lazy loading, the last scanned file and the last
+        # link in it win
+        if ix >= order:
+            (href, order) = (dir + link, ix)
+    return href
+
+
+def GetLink(id):
+    href = Links.get(id)
+    if href or not LazyBooks:
+        return href
+    if id not in LazyLinks:
+        LazyLinks[id] = LookupLazyLink(id)
+    return LazyLinks[id]
 
 
 def ReadSections(module):
@@ -209,54 +492,138 @@ def ReadSections(module):
                 NoLinks.add(common.CreateValidSGMLID(symbol))
 
 
-def FixCrossReferences(module_dir, module, src_lang):
+def FixCrossReferences(module_dir, module, src_lang, jobs=1):
+    """Fix the cross-references in all html files of the module.
+
+    If jobs > 1 the files are processed by a pool of processes. The workers are
+    forked after the index files have been loaded and share the links with the
+    main process. The warnings are reported in the order of the files.
+
+    Args:
+        module_dir (str): the directory with the html files
+        module (str): the module name
+        src_lang (str): the programming language of the examples
+        jobs (int): number of worker processes
+    """
     # TODO(ensonic): use glob.glob()?
+    files = []
     for entry in sorted(os.listdir(module_dir)):
         full_entry = os.path.join(module_dir, entry)
         if os.path.isdir(full_entry):
             continue
         elif entry.endswith('.html') or entry.endswith('.htm'):
-            FixHTMLFile(src_lang, module, full_entry)
+            files.append((src_lang, module, full_entry))
+
+    mp_ctx = None
+    if jobs > 1:
+        try:
+            mp_ctx = multiprocessing.get_context('fork')
+        except ValueError:
+            logging.warning('Parallel fixxref is not supported on this platform')
+
+    if mp_ctx:
+        with mp_ctx.Pool(jobs) as p:
+            for reports in p.imap(FixHTMLFileWorker, files):
+                ReplayXRefReports(reports)
+    else:
+        for args in files:
+            FixHTMLFile(*args)
+
+
+def FixHTMLFileWorker(args):
+    """Run FixHTMLFile() and return the collected xref reports."""
+    global XRefReports
+
+    XRefReports = []
+    FixHTMLFile(*args)
+    reports = XRefReports
+    XRefReports = None
+    return reports
+
+
+def ReplayXRefReports(reports):
+    """Apply the NoLinks additions and bad xref reports collected by a worker.
+
+    Args:
+        reports (list): the XRefReports of the worker
+    """
+    for report in reports:
+        if len(report) == 1:
+            NoLinks.add(report[0])
+        else:
+            ReportBadXRef(*report)
 
 
 def FixHTMLFile(src_lang, module, file):
+    """Fix the cross-references and highlight the examples in a html file.
+
+    This is done in a single scan over the file. Each rewrite from
+    FIX_PATTERNS is applied to the text produced by the rewrites before it,
+    e.g. the GTKDOCLINKs in highlighted examples are resolved too. Resolving
+    the GTKDOCLINKs is done last, so that all ids of highlighted functions are
+    in NoLinks before we warn about unresolved links.
+    """
     logging.info('Fixing file: %s', file)
 
     content = open(file, 'r', encoding='utf-8').read()
 
-    # FIXME: ideally we'd pass a clue about the example language to the highligher
-    # unfortunately the "language" attribute is not appearing in the html output
-    # we could patch the customization to have <code class="xxx"> inside of <pre>
-    def repl_func(m):
-        return HighlightSourcePygments(src_lang, m.group(1), m.group(2))
-    content = re.sub(
-        r'<div class=\"(example-contents|informalexample)\"><pre class=\"programlisting\">(.*?)</pre></div>',
-        repl_func, content, flags=re.DOTALL)
-    content = re.sub(r'\&lt;GTKDOCLINK\s+HREF=\&quot;(.*?)\&quot;\&gt;(.*?)\&lt;/GTKDOCLINK\&gt;',
-                     r'\<GTKDOCLINK\ HREF=\"\1\"\>\2\</GTKDOCLINK\>', content, flags=re.DOTALL)
-
-    # From the highlighter we get all the functions marked up. Now we can turn them into GTKDOCLINK items
-    def repl_func(m):
-        return MakeGtkDocLink(m.group(1), m.group(2), m.group(3))
-    content = re.sub(r'(<span class=\"function\">)(.*?)(</span>)', repl_func, content, flags=re.DOTALL)
-    # We can also try the first item in stuff marked up as 'normal'
-    content = re.sub(
-        r'(<span class=\"normal\">\s*)(.+?)((\s+.+?)?\s*</span>)', repl_func, content, flags=re.DOTALL)
-
-    lines = content.rstrip().split('\n')
-
-    def repl_func_with_ix(i):
-        def repl_func(m):
-            return MakeXRef(module, file, i + 1, m.group(1), m.group(2))
-        return repl_func
-
-    for i in range(len(lines)):
-        lines[i] = re.sub(r'<GTKDOCLINK\s+HREF="([^"]*)"\s*>(.*?)</GTKDOCLINK\s*>', repl_func_with_ix(i), lines[i])
-        if 'GTKDOCLINK' in lines[i]:
-            logging.info('make xref failed for line %d: "%s"', i, lines[i])
+    # the output, None for GTKDOCLINKs that are resolved at the end
+    pieces = []
+    # (index in pieces, line, id, text)
+    links = []
+    line = 1
+
+    def emit(text):
+        nonlocal line
+        pieces.append(text)
+        line += text.count('\n')
+
+    def fix(text, level):
+        pos = 0
+        for (ix, m) in FindFixes(text, level):
+            emit(text[pos:m.start()])
+            pos = m.end()
+            kind = FIX_PATTERNS[ix][0]
+            if kind == 'example':
+                # FIXME: ideally we'd pass a clue about the example language to
+                # the highligher unfortunately the "language" attribute is not
+                # appearing in the html output we could patch the customization
+                # to have <code class="xxx"> inside of <pre>
+                fix(HighlightSourcePygments(src_lang, m.group('class'), m.group('source')),
+                    ix + 1)
+            elif kind == 'escaped_link':
+                fix('<GTKDOCLINK HREF="%s">%s</GTKDOCLINK>' % (m.group('id'), m.group('text')),
+                    ix + 1)
+            elif kind == 'link':
+                links.append((len(pieces), line, m.group('id'), m.group('text')))
+                pieces.append(None)
+            else:
+                # From the highlighter we get all the functions marked up. Now
+                # we can turn them into GTKDOCLINK items. We can also try the
+                # first item in stuff marked up as 'normal'
+                fix(MakeGtkDocLink(m.group('pre'), m.group('symbol'), m.group('post')),
+                    ix + 1)
+        emit(text[pos:])
+
+    fix(content, 0)
+
+    # strip trailing whitespace, a resolved link ends with '>'
+    while pieces and pieces[-1] is not None:
+        pieces[-1] = pieces[-1].rstrip()
+        if pieces[-1]:
+            break
+        pieces.pop()
+
+    for (ix, line, id, text) in links:
+        pieces[ix] = MakeXRef(module, file, line, id, text)
+
+    content = ''.join(pieces)
+    if 'GTKDOCLINK' in content:
+        for (i, line) in enumerate(content.split('\n')):
+            if 'GTKDOCLINK' in line:
+                logging.info('make xref failed for line %d: "%s"', i, line)
 
     new_file = file + '.new'
-    content = '\n'.join(lines)
     with open(new_file, 'w', encoding='utf-8') as h:
         h.write(content)
 
@@ -265,39 +632,39 @@ def FixHTMLFile(src_lang, module, file):
 
 
 def GetXRef(id):
-    href = Links.get(id)
+    href = GetLink(id)
     if href:
         return (id, href)
 
     # This is a workaround for some inconsistency we have with CreateValidSGMLID
     if ':' in id:
         tid = id.replace(':', '--')
-        href = Links.get(tid)
+        href = GetLink(tid)
         if href:
             return (tid, href)
 
     # poor mans plural support
     if id.endswith('es'):
         tid = id[:-2]
-        href = Links.get(tid)
+        href = GetLink(tid)
         if href:
             return (tid, href)
         tid += '-struct'
-        href = Links.get(tid)
+        href = GetLink(tid)
         if href:
             return (tid, href)
     elif id.endswith('s'):
         tid = id[:-1]
-        href = Links.get(tid)
+        href = GetLink(tid)
         if href:
             return (tid, href)
         tid += '-struct'
-        href = Links.get(tid)
+        href = GetLink(tid)
         if href:
             return (tid, href)
 
     tid = id + '-struct'
-    href = Links.get(tid)
+    href = GetLink(tid)
     if href:
         return (tid, href)
 
@@ -305,6 +672,10 @@ def GetXRef(id):
 
 
 def ReportBadXRef(file, line, id, text):
+    if XRefReports is not None:
+        XRefReports.append((file, line, id, text))
+        return
+
     logging.info('no link for: id=%s, linktext=%s', id, text)
 
     # don't warn multiple times and also skip blacklisted (ctypes)
@@ -357,6 +728,8 @@ def MakeGtkDocLink(pre, symbol, post):
     # these are implicitly created links in highlighted sources
     # we don't want warnings for those if the links cannot be resolved.
     NoLinks.add(id)
+    if XRefReports is not None:
+        XRefReports.append((id,))
 
     return pre + '<GTKDOCLINK HREF="' + id + '">' + symbol + '</GTKDOCLINK>' + post
 
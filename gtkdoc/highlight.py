@@ -21,9 +21,17 @@
 
 """
 Highlight sourcecode snippets.
+
+The results are cached by the hash of the code, the language and the pygments
+version. The cache is kept in memory and optionally on disk (see
+set_cache_dir()).
 """
+import hashlib
+import logging
 import os
+import pygments
 
+from collections import OrderedDict
 from pygments import highlight
 from pygments.lexers import CLexer
 from pygments.lexers import get_lexer_by_name
@@ -35,14 +43,77 @@ LEXERS = {
 }
 HTML_FORMATTER = HtmlFormatter(nowrap=True)
 
+# recently highlighted code, keyed by cache_key()
+CACHE = OrderedDict()
+CACHE_SIZE = 1000
+# directory for the on-disk cache, if any
+CACHE_DIR = None
 
-def highlight_code(code, lang='c'):
-    if lang not in LEXERS:
-        LEXERS[lang] = get_lexer_by_name(lang)
-    lexer = LEXERS.get(lang, None)
-    if not lexer:
+
+def set_cache_dir(cache_dir):
+    """Keep the highlighted code in cache_dir between runs.
+
+    Args:
+        cache_dir (str): the directory, None to disable the on-disk cache
+    """
+    global CACHE_DIR
+
+    if cache_dir and not os.path.isdir(cache_dir):
+        os.makedirs(cache_dir)
+    CACHE_DIR = cache_dir
+
+
+def cache_key(code, lang):
+    h = hashlib.sha256()
+    for part in (pygments.__version__, lang, code):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def read_cache_file(key):
+    try:
+        with open(os.path.join(CACHE_DIR, key), 'rt', encoding='utf-8', newline='') as f:
+            return f.read()
+    except IOError:
         return None
-    return highlight(code, lexer, HTML_FORMATTER)
+
+
+def write_cache_file(key, result):
+    # write to a temp file first as parallel processes might use the cache too
+    cache_file = os.path.join(CACHE_DIR, key)
+    tmp_file = '%s.%d' % (cache_file, os.getpid())
+    try:
+        with open(tmp_file, 'wt', encoding='utf-8', newline='') as f:
+            f.write(result)
+        os.replace(tmp_file, cache_file)
+    except IOError as e:
+        logging.info('Cannot write highlight cache: %s', e)
+
+
+def highlight_code(code, lang='c'):
+    key = cache_key(code, lang)
+    result = CACHE.get(key)
+    if result is not None:
+        CACHE.move_to_end(key)
+        return result
+
+    if CACHE_DIR:
+        result = read_cache_file(key)
+    if result is None:
+        if lang not in LEXERS:
+            LEXERS[lang] = get_lexer_by_name(lang)
+        lexer = LEXERS.get(lang, None)
+        if not lexer:
+            return None
+        result = highlight(code, lexer, HTML_FORMATTER)
+        if CACHE_DIR:
+            write_cache_file(key, result)
+
+    CACHE[key] = result
+    if len(CACHE) > CACHE_SIZE:
+        CACHE.popitem(last=False)
+    return result
 
 
 def append_style_defs(css_file_name):
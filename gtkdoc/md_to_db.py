@@ -23,9 +23,12 @@
 Markdown to Docbook converter
 """
 
+import functools
 import logging
 import re
 
+from . import common
+
 # external functions
 ExpandAbbreviations = MakeXRef = MakeHashXRef = tagify = None
 
@@ -38,6 +41,57 @@ MD_TEXT_LEVEL_ELEMENTS = {
 MD_ESCAPABLE_CHARS = r'\`*_{}[]()>#+-.!'
 MD_GTK_ESCAPABLE_CHARS = r'@%'
 
+# Matchers for the lines of a markdown document, see MarkDownParseBlocks()
+MD_H1_MATCHER = re.compile(r'^[#][ \t]+(.+?)[ \t]*[#]*[ \t]*(?:{#([^}]+)})?[ \t]*$')
+MD_HEADING_MATCHER = re.compile(r'^([#]{1,2})[ \t]+(.+?)[ \t]*[#]*[ \t]*(?:{#([^}]+)})?[ \t]*$')
+MD_SETEXT_H1_MATCHER = re.compile(r'^={4,}[ \t]*$')
+MD_SETEXT_H2_MATCHER = re.compile(r'^-{4,}[ \t]*$')
+MD_CODE_START_MATCHER = re.compile(r'^[ \t]*\|\[[ ]*(?:<!-- language="([^"]+?)" -->)?')
+MD_CODE_END_MATCHER = re.compile(r'^[ \t]*\]\|(.*)')
+MD_DOCTYPE_MATCHER = re.compile(r'^[ ]*<!DOCTYPE/')
+MD_MARKUP_MATCHER = re.compile(r'^[ ]*<\??(\w+)[^>]*([\/\?])?[ \t]*>')
+MD_LI_MATCHER = re.compile(r'^([ ]*)[*+-][ ](.*)')
+MD_ORDERED_LI_MATCHER = re.compile(r'^([ ]{0,4})\d+[.][ ]+(.*)')
+MD_QUOTE_MATCHER = re.compile(r'^[ ]*>[ ]?(.*)')
+MD_QUOTE_PREFIX_MATCHER = re.compile(r'^[ ]*>[ ]?')
+MD_INDENTATION_MATCHER = re.compile(r'^[ ]{0,4}')
+MD_LI_MARKER_MATCHERS = {
+    marker: re.compile(r'^([ ]{0,3})(%s)[ ](.*)' % marker) for marker in ('[*+-]', '\\d+[.]')
+}
+
+
+class MarkDownBlock(object):
+    """A block of a markdown document, see MarkDownParseBlocks()."""
+
+    __slots__ = ('type', 'text', 'lines', 'level', 'id', 'language', 'start', 'end', 'depth',
+                 'closed', 'interrupted', 'ordered', 'indentation', 'marker', 'first', 'last')
+
+    def __init__(self, type, text='', lines=None, level=0, id=None, language=None,
+                 start=None, end=None, closed=False, ordered=False, indentation='', marker=None,
+                 first=False, last=False):
+        self.type = type
+        self.text = text
+        self.lines = lines
+        self.level = level
+        self.id = id
+        self.language = language
+        self.start = start
+        self.end = end
+        self.depth = 0
+        self.closed = closed
+        self.interrupted = False
+        self.ordered = ordered
+        self.indentation = indentation
+        self.marker = marker
+        self.first = first
+        self.last = last
+
+    def copy(self):
+        block = MarkDownBlock.__new__(MarkDownBlock)
+        for name in self.__slots__:
+            setattr(block, name, getattr(self, name))
+        return block
+
 
 def Init():
     # TODO(enonic): find a better way to do this
@@ -47,212 +101,180 @@ def Init():
 
 def MarkDownParseBlocks(lines, symbol, context):
     md_blocks = []
-    md_block = {"type": ''}
+    md_block = MarkDownBlock('')
+    trace = common.IsTracing('markdown')
 
-    logging.debug("parsing %s lines", len(lines))
+    if trace:
+        logging.debug("parsing %s lines", len(lines))
     for line in lines:
-        logging.info("type='%s', int='%s', parsing '%s'", md_block["type"], md_block.get('interrupted'), line)
+        if trace:
+            logging.info("type='%s', int='%s', parsing '%s'", md_block.type, 1 if md_block.interrupted else None, line)
         first_char = None
         if line:
             first_char = line[0]
 
-        if md_block["type"] == "markup":
-            if 'closed' not in md_block:
-                if md_block["start"] in line:
-                    md_block["depth"] += 1
+        if md_block.type == "markup":
+            if not md_block.closed:
+                if md_block.start in line:
+                    md_block.depth += 1
 
-                if md_block["end"] in line:
-                    if md_block["depth"] > 0:
-                        md_block["depth"] -= 1
+                if md_block.end in line:
+                    if md_block.depth > 0:
+                        md_block.depth -= 1
                     else:
-                        logging.info("closing tag '%s'", line)
-                        md_block["closed"] = 1
+                        if trace:
+                            logging.info("closing tag '%s'", line)
+                        md_block.closed = True
                         # TODO(ensonic): reparse inner text with MarkDownParseLines?
 
-                md_block["text"] += "\n" + line
-                logging.info("add to markup: '%s'", line)
+                md_block.text += "\n" + line
+                if trace:
+                    logging.info("add to markup: '%s'", line)
                 continue
 
         deindented_line = line.lstrip()
 
-        if md_block["type"] == "heading":
+        if md_block.type == "heading":
             # a heading is ended by any level less than or equal
-            if md_block["level"] == 1:
-                heading_match = re.search(r'^[#][ \t]+(.+?)[ \t]*[#]*[ \t]*(?:{#([^}]+)})?[ \t]*$', line)
-                if re.search(r'^={4,}[ \t]*$', line):
-                    text = md_block["lines"].pop()
-                    md_block.pop("interrupted", None)
+            if md_block.level == 1:
+                heading_match = MD_H1_MATCHER.search(line)
+                if MD_SETEXT_H1_MATCHER.search(line):
+                    text = md_block.lines.pop()
+                    md_block.interrupted = False
                     md_blocks.append(md_block)
-                    md_block = {'type': "heading",
-                                'text': text,
-                                'lines': [],
-                                'level': 1,
-                                }
+                    md_block = MarkDownBlock("heading", text=text, lines=[], level=1)
                     continue
                 elif heading_match:
-                    md_block.pop("interrupted", None)
+                    md_block.interrupted = False
                     md_blocks.append(md_block)
-                    md_block = {'type': "heading",
-                                'text': heading_match.group(1),
-                                'lines': [],
-                                'level': 1,
-                                }
-                    if heading_match.group(2):
-                        md_block['id'] = heading_match.group(2)
+                    md_block = MarkDownBlock("heading", text=heading_match.group(1), lines=[], level=1,
+                                             id=heading_match.group(2) or None)
                     continue
                 else:
                     # push lines into the block until the end is reached
-                    md_block["lines"].append(line)
+                    md_block.lines.append(line)
                     continue
 
             else:
-                heading_match = re.search(r'^([#]{1,2})[ \t]+(.+?)[ \t]*[#]*[ \t]*(?:{#([^}]+)})?[ \t]*$', line)
-                if re.search(r'^[=]{4,}[ \t]*$', line):
-                    text = md_block["lines"].pop()
-                    md_block.pop("interrupted", None)
+                heading_match = MD_HEADING_MATCHER.search(line)
+                if MD_SETEXT_H1_MATCHER.search(line):
+                    text = md_block.lines.pop()
+                    md_block.interrupted = False
                     md_blocks.append(md_block)
-                    md_block = {'type': "heading",
-                                'text': text,
-                                'lines': [],
-                                'level': 1,
-                                }
+                    md_block = MarkDownBlock("heading", text=text, lines=[], level=1)
                     continue
-                elif re.search(r'^[-]{4,}[ \t]*$', line):
-                    text = md_block["lines"].pop()
-                    md_block.pop("interrupted", None)
+                elif MD_SETEXT_H2_MATCHER.search(line):
+                    text = md_block.lines.pop()
+                    md_block.interrupted = False
                     md_blocks.append(md_block)
-                    md_block = {'type': "heading",
-                                'text': text,
-                                'lines': [],
-                                'level': 2,
-                                }
+                    md_block = MarkDownBlock("heading", text=text, lines=[], level=2)
                     continue
                 elif heading_match:
-                    md_block.pop("interrupted", None)
+                    md_block.interrupted = False
                     md_blocks.append(md_block)
-                    md_block = {'type': "heading",
-                                'text': heading_match.group(2),
-                                'lines': [],
-                                'level': len(heading_match.group(1))
-                                }
-                    if heading_match.group(3):
-                        md_block['id'] = heading_match.group(3)
+                    md_block = MarkDownBlock("heading", text=heading_match.group(2), lines=[],
+                                             level=len(heading_match.group(1)),
+                                             id=heading_match.group(3) or None)
                     continue
                 else:
                     # push lines into the block until the end is reached
-                    md_block["lines"].append(line)
+                    md_block.lines.append(line)
                     continue
-        elif md_block["type"] == "code":
-            end_of_code_match = re.search(r'^[ \t]*\]\|(.*)', line)
+        elif md_block.type == "code":
+            end_of_code_match = MD_CODE_END_MATCHER.search(line)
             if end_of_code_match:
                 md_blocks.append(md_block)
-                md_block = {'type': "paragraph",
-                            'text': end_of_code_match.group(1),
-                            'lines': [],
-                            }
+                md_block = MarkDownBlock("paragraph", text=end_of_code_match.group(1), lines=[])
             else:
-                md_block["lines"].append(line)
+                md_block.lines.append(line)
             continue
 
         if deindented_line == '':
-            logging.info('setting "interrupted" due to empty line')
-            md_block["interrupted"] = 1
+            if trace:
+                logging.info('setting "interrupted" due to empty line')
+            md_block.interrupted = True
             continue
 
-        if md_block["type"] == "quote":
-            if 'interrupted' not in md_block:
-                line = re.sub(r'^[ ]*>[ ]?', '', line)
-                md_block["lines"].append(line)
+        if md_block.type == "quote":
+            if not md_block.interrupted:
+                line = MD_QUOTE_PREFIX_MATCHER.sub('', line)
+                md_block.lines.append(line)
                 continue
 
-        elif md_block["type"] == "li":
-            marker = md_block["marker"]
-            marker_match = re.search(r'^([ ]{0,3})(%s)[ ](.*)' % marker, line)
+        elif md_block.type == "li":
+            marker = md_block.marker
+            marker_match = MD_LI_MARKER_MATCHERS[marker].search(line)
             if marker_match:
                 indentation = marker_match.group(1)
-                if md_block["indentation"] != indentation:
-                    md_block["lines"].append(line)
+                if md_block.indentation != indentation:
+                    md_block.lines.append(line)
                 else:
-                    ordered = md_block["ordered"]
-                    md_block.pop('last', None)
+                    ordered = md_block.ordered
+                    md_block.last = False
                     md_blocks.append(md_block)
-                    md_block = {'type': "li",
-                                'ordered': ordered,
-                                'indentation': indentation,
-                                'marker': marker,
-                                'last': 1,
-                                'lines': [re.sub(r'^[ ]{0,4}', '', marker_match.group(3))],
-                                }
+                    md_block = MarkDownBlock("li", ordered=ordered, indentation=indentation,
+                                             marker=marker, last=True,
+                                             lines=[MD_INDENTATION_MATCHER.sub('', marker_match.group(3))])
                 continue
 
-            if 'interrupted' in md_block:
+            if md_block.interrupted:
                 if first_char == " ":
-                    md_block["lines"].append('')
-                    line = re.sub(r'^[ ]{0,4}', '', line)
-                    md_block["lines"].append(line)
-                    md_block.pop("interrupted", None)
+                    md_block.lines.append('')
+                    line = MD_INDENTATION_MATCHER.sub('', line)
+                    md_block.lines.append(line)
+                    md_block.interrupted = False
                     continue
             else:
-                line = re.sub(r'^[ ]{0,4}', '', line)
-                md_block["lines"].append(line)
+                line = MD_INDENTATION_MATCHER.sub('', line)
+                md_block.lines.append(line)
                 continue
 
-        # indentation sensitive types
-        heading_match = re.search(r'^([#]{1,2})[ \t]+(.+?)[ \t]*[#]*[ \t]*(?:{#([^}]+)})?[ \t]*$', line)
-        code_match = re.search(r'^[ \t]*\|\[[ ]*(?:<!-- language="([^"]+?)" -->)?', line)
+        # indentation sensitive types, only try the matchers that can match
+        # the first char
+        heading_match = first_char == '#' and MD_HEADING_MATCHER.search(line)
+        code_match = '|[' in line and MD_CODE_START_MATCHER.search(line)
         if heading_match:
             # atx heading (#)
             md_blocks.append(md_block)
-            md_block = {'type': "heading",
-                        'text': heading_match.group(2),
-                        'lines': [],
-                        'level': len(heading_match.group(1)),
-                        }
-            if heading_match.group(3):
-                md_block['id'] = heading_match.group(3)
+            md_block = MarkDownBlock("heading", text=heading_match.group(2), lines=[],
+                                     level=len(heading_match.group(1)),
+                                     id=heading_match.group(3) or None)
             continue
-        elif re.search(r'^={4,}[ \t]*$', line):
+        elif first_char == '=' and MD_SETEXT_H1_MATCHER.search(line):
             # setext heading (====)
 
-            if md_block["type"] == "paragraph" and "interrupted" in md_block:
+            if md_block.type == "paragraph" and md_block.interrupted:
                 md_blocks.append(md_block.copy())
-                md_block["type"] = "heading"
-                md_block["lines"] = []
-                md_block["level"] = 1
+                md_block.type = "heading"
+                md_block.lines = []
+                md_block.level = 1
             continue
-        elif re.search(r'^-{4,}[ \t]*$', line):
+        elif first_char == '-' and MD_SETEXT_H2_MATCHER.search(line):
             # setext heading (-----)
 
-            if md_block["type"] == "paragraph" and "interrupted" in md_block:
+            if md_block.type == "paragraph" and md_block.interrupted:
                 md_blocks.append(md_block.copy())
-                md_block["type"] = "heading"
-                md_block["lines"] = []
-                md_block["level"] = 2
+                md_block.type = "heading"
+                md_block.lines = []
+                md_block.level = 2
 
             continue
         elif code_match:
             # code
-            md_block["interrupted"] = 1
+            md_block.interrupted = True
             md_blocks.append(md_block)
-            md_block = {'type': "code",
-                        'lines': [],
-                        }
-            if code_match.group(1):
-                md_block['language'] = code_match.group(1)
+            md_block = MarkDownBlock("code", lines=[], language=code_match.group(1) or None)
             continue
 
-        # indentation insensitive types
-        markup_match = re.search(r'^[ ]*<\??(\w+)[^>]*([\/\?])?[ \t]*>', line)
-        li_match = re.search(r'^([ ]*)[*+-][ ](.*)', line)
-        quote_match = re.search(r'^[ ]*>[ ]?(.*)', line)
-        if re.search(r'^[ ]*<!DOCTYPE/', line):
+        # indentation insensitive types, only try the matchers that can match
+        # the first non-blank char
+        first_text_char = deindented_line[0]
+        markup_match = first_text_char == '<' and MD_MARKUP_MATCHER.search(line)
+        li_match = first_text_char in '*+-' and MD_LI_MATCHER.search(line)
+        quote_match = first_text_char == '>' and MD_QUOTE_MATCHER.search(line)
+        if first_text_char == '<' and MD_DOCTYPE_MATCHER.search(line):
             md_blocks.append(md_block)
-            md_block = {'type': "markup",
-                        'text': deindented_line,
-                        'start': '<',
-                        'end': '>',
-                        'depth': 0,
-                        }
+            md_block = MarkDownBlock("markup", text=deindented_line, start='<', end='>')
 
         elif markup_match:
             # markup, including <?xml version="1.0"?>
@@ -261,107 +283,92 @@ def MarkDownParseBlocks(lines, symbol, context):
 
             # skip link markdown
             # TODO(ensonic): consider adding more uri schemes (ftp, ...)
-            if re.search(r'https?', tag):
-                logging.info("skipping link '%s'", tag)
+            if 'http' in tag:
+                if trace:
+                    logging.info("skipping link '%s'", tag)
             else:
                 # for TEXT_LEVEL_ELEMENTS, we want to keep them as-is in the paragraph
                 # instead of creation a markdown block.
                 scanning_for_end_of_text_level_tag = (
-                    md_block["type"] == "paragraph" and
-                    'start' in md_block and
-                    'closed' not in md_block)
-                logging.info("markup found '%s', scanning %s ?", tag, scanning_for_end_of_text_level_tag)
+                    md_block.type == "paragraph" and
+                    md_block.start is not None and
+                    not md_block.closed)
+                if trace:
+                    logging.info("markup found '%s', scanning %s ?", tag, scanning_for_end_of_text_level_tag)
                 if tag not in MD_TEXT_LEVEL_ELEMENTS and not scanning_for_end_of_text_level_tag:
                     md_blocks.append(md_block)
 
                     if is_self_closing:
-                        logging.info("self-closing docbook '%s'", tag)
-                        md_block = {'type': "self-closing tag",
-                                    'text': deindented_line,
-                                    }
+                        if trace:
+                            logging.info("self-closing docbook '%s'", tag)
+                        md_block = MarkDownBlock("self-closing tag", text=deindented_line)
                         is_self_closing = 0
                         continue
 
-                    logging.info("new markup '%s'", tag)
-                    md_block = {'type': "markup",
-                                'text': deindented_line,
-                                'start': '<' + tag + '>',
-                                'end': '</' + tag + '>',
-                                'depth': 0,
-                                }
-                    if re.search(r'<\/%s>' % tag, deindented_line):
-                        md_block["closed"] = 1
-
+                    if trace:
+                        logging.info("new markup '%s'", tag)
+                    md_block = MarkDownBlock("markup", text=deindented_line,
+                                             start='<' + tag + '>', end='</' + tag + '>',
+                                             closed='</' + tag + '>' in deindented_line)
                     continue
                 else:
                     if tag in MD_TEXT_LEVEL_ELEMENTS:
-                        logging.info("text level docbook '%s' in '%s' state", tag, md_block["type"])
+                        if trace:
+                            logging.info("text level docbook '%s' in '%s' state", tag, md_block.type)
                         # TODO(ensonic): handle nesting
                         if not scanning_for_end_of_text_level_tag:
-                            if not re.search(r'<\/%s>' % tag, deindented_line):
-                                logging.info("new text level markup '%s'", tag)
-                                md_block["start"] = '<' + tag + '>'
-                                md_block["end"] = '</' + tag + '>'
-                                md_block.pop("closed", None)
-                                logging.info("scanning for end of '%s'", tag)
+                            if '</' + tag + '>' not in deindented_line:
+                                if trace:
+                                    logging.info("new text level markup '%s'", tag)
+                                md_block.start = '<' + tag + '>'
+                                md_block.end = '</' + tag + '>'
+                                md_block.closed = False
+                                if trace:
+                                    logging.info("scanning for end of '%s'", tag)
 
                         else:
-                            if md_block["end"] in deindented_line:
-                                md_block["closed"] = 1
-                                logging.info("found end of '%s'", tag)
+                            if md_block.end in deindented_line:
+                                md_block.closed = True
+                                if trace:
+                                    logging.info("found end of '%s'", tag)
         elif li_match:
             # li
             md_blocks.append(md_block)
-            indentation = li_match.group(1)
-            md_block = {'type': "li",
-                        'ordered': 0,
-                        'indentation': indentation,
-                        'marker': "[*+-]",
-                        'first': 1,
-                        'last': 1,
-                        'lines': [re.sub(r'^[ ]{0,4}', '', li_match.group(2))],
-                        }
+            md_block = MarkDownBlock("li", indentation=li_match.group(1), marker="[*+-]",
+                                     first=True, last=True,
+                                     lines=[MD_INDENTATION_MATCHER.sub('', li_match.group(2))])
             continue
         elif quote_match:
             md_blocks.append(md_block)
-            md_block = {'type': "quote",
-                        'lines': [quote_match.group(1)],
-                        }
+            md_block = MarkDownBlock("quote", lines=[quote_match.group(1)])
             continue
 
         # list item
-        list_item_match = re.search(r'^([ ]{0,4})\d+[.][ ]+(.*)', line)
+        list_item_match = first_text_char.isdigit() and MD_ORDERED_LI_MATCHER.search(line)
         if list_item_match:
             md_blocks.append(md_block)
-            indentation = list_item_match.group(1)
-            md_block = {'type': "li",
-                        'ordered': 1,
-                        'indentation': indentation,
-                        'marker': "\\d+[.]",
-                        'first': 1,
-                        'last': 1,
-                        'lines': [re.sub(r'^[ ]{0,4}', '', list_item_match.group(2))],
-                        }
+            md_block = MarkDownBlock("li", ordered=True, indentation=list_item_match.group(1),
+                                     marker="\\d+[.]", first=True, last=True,
+                                     lines=[MD_INDENTATION_MATCHER.sub('', list_item_match.group(2))])
             continue
 
         # paragraph
-        if md_block["type"] == "paragraph":
-            if "interrupted" in md_block:
+        if md_block.type == "paragraph":
+            if md_block.interrupted:
                 md_blocks.append(md_block)
-                md_block = {'type': "paragraph",
-                            'text': line,
-                            }
-                logging.info("new paragraph due to interrupted")
+                md_block = MarkDownBlock("paragraph", text=line)
+                if trace:
+                    logging.info("new paragraph due to interrupted")
             else:
-                md_block["text"] += "\n" + line
-                logging.info("add to paragraph: '%s'", line)
+                md_block.text += "\n" + line
+                if trace:
+                    logging.info("add to paragraph: '%s'", line)
 
         else:
             md_blocks.append(md_block)
-            md_block = {'type': "paragraph",
-                        'text': line,
-                        }
-            logging.info("new paragraph due to different block type")
+            md_block = MarkDownBlock("paragraph", text=line)
+            if trace:
+                logging.info("new paragraph due to different block type")
 
     md_blocks.append(md_block)
     md_blocks.pop(0)
@@ -631,10 +638,10 @@ def MarkDownOutputDocBook(blocksref, symbol, context):
     for block in blocks:
         # $output += "\n<!-- beg type='" . $block->{"type"} . "'-->\n"
 
-        if block["type"] == "paragraph":
-            text = MarkDownParseSpanElements(block["text"])
+        if block.type == "paragraph":
+            text = MarkDownParseSpanElements(block.text)
             if context == "li" and output == '':
-                if 'interrupted' in block:
+                if block.interrupted:
                     output += "\n<para>%s</para>\n" % text
                 else:
                     output += "<para>%s</para>" % text
@@ -643,72 +650,74 @@ def MarkDownOutputDocBook(blocksref, symbol, context):
             else:
                 output += "<para>%s</para>\n" % text
 
-        elif block["type"] == "heading":
+        elif block.type == "heading":
 
-            title = MarkDownParseSpanElements(block["text"])
+            title = MarkDownParseSpanElements(block.text)
 
-            if block["level"] == 1:
+            if block.level == 1:
                 tag = "refsect2"
             else:
                 tag = "refsect3"
 
-            text = MarkDownParseLines(block["lines"], symbol, "heading")
-            if 'id' in block:
-                output += "<%s id=\"%s\">" % (tag, block["id"])
+            text = MarkDownParseLines(block.lines, symbol, "heading")
+            if block.id is not None:
+                output += "<%s id=\"%s\">" % (tag, block.id)
             else:
                 output += "<%s>" % tag
 
             output += "<title>%s</title>%s</%s>\n" % (title, text, tag)
-        elif block["type"] == "li":
+        elif block.type == "li":
             tag = "itemizedlist"
 
-            if "first" in block:
-                if block["ordered"]:
+            if block.first:
+                if block.ordered:
                     tag = "orderedlist"
                 output += "<%s>\n" % tag
 
-            if "interrupted" in block:
-                block["lines"].append('')
+            if block.interrupted:
+                block.lines.append('')
 
-            text = MarkDownParseLines(block["lines"], symbol, "li")
+            text = MarkDownParseLines(block.lines, symbol, "li")
             output += "<listitem>" + text + "</listitem>\n"
-            if 'last' in block:
-                if block["ordered"]:
+            if block.last:
+                if block.ordered:
                     tag = "orderedlist"
                 output += "</%s>\n" % tag
 
-        elif block["type"] == "quote":
-            text = MarkDownParseLines(block["lines"], symbol, "quote")
+        elif block.type == "quote":
+            text = MarkDownParseLines(block.lines, symbol, "quote")
             output += "<blockquote>\n%s</blockquote>\n" % text
-        elif block["type"] == "code":
+        elif block.type == "code":
             tag = "programlisting"
 
-            if "language" in block:
-                if block["language"] == "plain":
+            if block.language is not None:
+                if block.language == "plain":
                     output += "<informalexample><screen><![CDATA[\n"
                     tag = "screen"
                 else:
-                    output += "<informalexample><programlisting role=\"example\" language=\"%s\"><![CDATA[\n" % block['language']
+                    output += "<informalexample><programlisting role=\"example\" language=\"%s\"><![CDATA[\n" % block.language
             else:
                 output += "<informalexample><programlisting role=\"example\"><![CDATA[\n"
 
-            logging.debug('listing for %s: [%s]', symbol, '\n'.join(block['lines']))
-            for line in block["lines"]:
+            if common.IsTracing('markdown', logging.DEBUG):
+                logging.debug('listing for %s: [%s]', symbol, '\n'.join(block.lines))
+            for line in block.lines:
                 output += ReplaceEntities(line) + "\n"
 
             output += "]]></%s></informalexample>\n" % tag
-        elif block["type"] == "markup":
-            text = ExpandAbbreviations(symbol, block["text"])
+        elif block.type == "markup":
+            text = ExpandAbbreviations(symbol, block.text)
             output += text + "\n"
         else:
-            output += block["text"] + "\n"
+            output += block.text + "\n"
 
         # $output += "\n<!-- end type='" . $block->{"type"} . "'-->\n"
     return output
 
 
 def MarkDownParseLines(lines, symbol, context):
-    logging.info('md parse: ctx=%s, [%s]', context, '\n'.join(lines))
+    if common.IsTracing('markdown'):
+        logging.info('md parse: ctx=%s, [%s]', context, '\n'.join(lines))
     blocks = MarkDownParseBlocks(lines, symbol, context)
     output = MarkDownOutputDocBook(blocks, symbol, context)
     return output
@@ -755,4 +764,17 @@ def MarkDownParse(text, symbol):
     """
     # TODO(ensonic): it would be nice to add id parameters to the refsect2 elements
 
-    return MarkDownParseLines(text.splitlines(), symbol, '')
+    # Markup blocks depend on the symbol and can log warnings. Other docs are
+    # converted once, as many like '@a: a #GObject' repeat a lot.
+    if '<' in text:
+        return MarkDownParseLines(text.splitlines(), symbol, '')
+    return MarkDownParseText(text)
+
+
+@functools.lru_cache(maxsize=8192)
+def MarkDownParseText(text):
+    """Converts mark down syntax without markup to docbook, see MarkDownParse().
+
+    The result does not depend on the symbol, so it is cached on the text.
+    """
+    return MarkDownParseLines(text.splitlines(), '', '')
@@ -24,12 +24,73 @@ Creates the DocBook files from the source comments.
 """
 
 from collections import OrderedDict
+import hashlib
+import json
 import logging
+import multiprocessing
 import os
 import re
 import string
-
-from . import common, md_to_db
+import sys
+
+from . import common, config, md_to_db
+
+# In a worker process the calls that change the global state or log warnings
+# while scanning a source file are recorded here, see SourceCall()
+SourceCalls = None
+
+# bump this when the format of the source cache changes
+SOURCE_CACHE_VERSION = 2
+
+# directory for the source cache, if any
+SOURCE_CACHE_DIR = None
+
+# bump this when the format of the section cache changes or when the generated
+# docs change for the same inputs
+SECTION_CACHE_VERSION = 3
+
+# directory for the state of the sections, if any, see OutputDB()
+SECTION_CACHE_DIR = None
+
+# The global hashes that get entries for the symbols of a section while the
+# section is generated. For unchanged sections these are restored from the
+# section cache.
+SECTION_STATE = ('AllSymbols', 'AllDocumentedSymbols', 'AllIncompleteSymbols', 'AllUnusedSymbols',
+                 'IndexEntriesFull', 'IndexEntriesSince', 'IndexEntriesDeprecated')
+
+# The declarations and docs that are used to generate a section, keyed on the
+# symbols of the section, see GetSectionInputs()
+SECTION_INPUTS = ('Declarations', 'DeclarationTypes', 'DeclarationConditional', 'StructHasTypedef',
+                  'SymbolDocs', 'SourceSymbolDocs', 'SymbolParams', 'SourceSymbolParams',
+                  'SymbolAnnotations', 'SymbolSourceLocation', 'Since', 'Deprecated', 'StabilityLevel')
+
+# The object data that is used to generate a section, keyed on the symbols and
+# the title of the section. It is filtered by the KnownSymbols of the whole
+# sections file, see GetSectionInputs()
+SECTION_OBJECT_INPUTS = ('ObjectRoots', 'Interfaces', 'Implementations', 'Prerequisites', 'DerivedInterfaces')
+
+# Records the warnings logged while a section is generated, see
+# StartSectionRecording()
+SECTION_WARNING_RECORDER = common.WarningRecorder()
+
+# The section docs, keyed on the file name of the section.
+SECTION_FIELDS = ('title', 'short_description', 'long_description', 'see_also', 'stability',
+                  'image', 'section_id', 'include')
+
+# Matchers for doc comment blocks in the sources, see ScanSourceContent()
+COMMENT_START_MATCHER = re.compile(r'^\s*/\*\*\s')
+ONE_LINE_COMMENT_MATCHER = re.compile(r'^\s*/\*.*\*/')
+COMMENT_END_MATCHER = re.compile(r'^\s*\*+/')
+COMMENT_PREFIX_MATCHER = re.compile(r'^\s*\*\s?')
+
+# Matchers for the gtk-doc abbreviations, see ExpandAbbreviationsCallback()
+PARAM_FUNCTION_MATCHER = re.compile(r'(\A|[^\\])\@(\w+((\.|->)\w+)*)\s*\(\)')
+FUNCTION_MATCHER = re.compile(r'([^\*.\w])(\w+)\s*\(\)')
+HASH_FUNCTION_MATCHER = re.compile(r'(\A|[^\\])#([\w\-:\.]+[\w]+)\s*\(\)')
+PARAM_MATCHER = re.compile(r'(\A|[^\\])\@(\w+((\.|->)\w+)*)')
+CONSTANT_MATCHER = re.compile(r'(\A|[^\\])\%(-?\w+)')
+HASH_MATCHER = re.compile(r'(\A|[^\\])#([\w\-:\.]+[\w]+)')
+PROGRAMLISTING_HASH_MATCHER = re.compile(r'#(\w+)')
 
 # Options
 MODULE = None
@@ -38,29 +99,48 @@ INLINE_MARKUP_MODE = None
 NAME_SPACE = ''
 ROOT_DIR = '.'
 
-# These global arrays store information on signals. Each signal has an entry
-# in each of these arrays at the same index, like a multi-dimensional array.
-SignalObjects = []        # The GtkObject which emits the signal.
-SignalNames = []        # The signal name.
-SignalReturns = []        # The return type.
-SignalFlags = []        # Flags for the signal
-SignalPrototypes = []        # The rest of the prototype of the signal handler.
-
-# These global arrays store information on Args. Each Arg has an entry
-# in each of these arrays at the same index, like a multi-dimensional array.
-ArgObjects = []                # The GtkObject which has the Arg.
-ArgNames = []                # The Arg name.
-ArgTypes = []                # The Arg type - gint, GtkArrowType etc.
-ArgFlags = []                # How the Arg can be used - readable/writable etc.
-ArgNicks = []                # The nickname of the Arg.
-ArgBlurbs = []          # Docstring of the Arg.
-ArgDefaults = []        # Default value of the Arg.
-ArgRanges = []                # The range of the Arg type
-
-ActionObjects = []
-ActionNames = []
-ActionParams = []
-ActionProperties = []
+# These global hashes store information on signals, args and actions. They are
+# keyed on the GObject which owns them and hold lists of records in the order
+# they appear in the input files.
+Signals = {}
+Args = {}
+Actions = {}
+
+
+class Signal(object):
+    """A signal read from the .signals file."""
+    __slots__ = ('name', 'returns', 'flags', 'prototype')
+
+    def __init__(self, name, returns, flags, prototype):
+        self.name = name                # The signal name.
+        self.returns = returns          # The return type.
+        self.flags = flags              # Flags for the signal.
+        self.prototype = prototype      # The rest of the prototype of the signal handler.
+
+
+class Arg(object):
+    """A property read from the .args file."""
+    __slots__ = ('name', 'type', 'flags', 'nick', 'blurb', 'default', 'range')
+
+    def __init__(self, name, atype, flags, nick, blurb, default, arange):
+        self.name = name                # The Arg name.
+        self.type = atype               # The Arg type - gint, GtkArrowType etc.
+        self.flags = flags              # How the Arg can be used - readable/writable etc.
+        self.nick = nick                # The nickname of the Arg.
+        self.blurb = blurb              # Docstring of the Arg.
+        self.default = default          # Default value of the Arg.
+        self.range = arange             # The range of the Arg type.
+
+
+class Action(object):
+    """An action read from the .actions file."""
+    __slots__ = ('name', 'params', 'prop')
+
+    def __init__(self, name, params, prop):
+        self.name = name                # The action name.
+        self.params = params            # The parameter type of the action.
+        self.prop = prop                # The property the action is bound to.
+
 
 # These global hashes store declaration info keyed on a symbol name.
 Declarations = {}
@@ -96,9 +176,18 @@ UndeclaredSymbols = {}
 Objects = []
 ObjectLevels = []
 ObjectRoots = {}
+# The index of the parent and the indices of the direct children of the entries
+# in Objects, at the same index, and the index of the first entry of an object.
+ObjectParents = []
+ObjectChildren = []
+ObjectIndices = {}
 
 Interfaces = {}
 Prerequisites = {}
+# The sorted lists of objects implementing an interface and of interfaces
+# requiring an interface, the reverse of the two hashes above.
+Implementations = {}
+DerivedInterfaces = {}
 
 # holds the symbols which are mentioned in <MODULE>-sections.txt and in which
 # section they are defined
@@ -120,6 +209,11 @@ PreProcessorDirectives = {
 # remember used annotation (to write minimal glossary)
 AnnotationsUsed = {}
 
+# memo of the links created by MakeXRef() and MakeHashXRef(), keyed on their
+# arguments
+XRefLinks = {}
+HashXRefLinks = {}
+
 # the regexp that parses the annotation is in ScanSourceFile()
 AnnotationDefinition = {
     # the GObjectIntrospection annotations are defined at:
@@ -267,6 +361,13 @@ def Run(options):
 
     logging.info('options: %s', str(options.__dict__))
 
+    # count the id cache stats of this run only
+    common.CreateValidSGMLID.cache_clear()
+    # the converted docs depend on the options and tables of the run
+    md_to_db.MarkDownParseText.cache_clear()
+    XRefLinks.clear()
+    HashXRefLinks.clear()
+
     # We should pass the options variable around instead of this global variable horror
     # but too much of the code expects these to be around. Fix this once the transition is done.
     MODULE = options.module
@@ -313,11 +414,23 @@ def Run(options):
     else:
         suffix_list = ['.c', '.h']
 
+    global SOURCE_CACHE_DIR, SECTION_CACHE_DIR
+    SOURCE_CACHE_DIR = SECTION_CACHE_DIR = None
+    if options.cache_dir:
+        SOURCE_CACHE_DIR = os.path.join(options.cache_dir, 'mkdb')
+        if not os.path.isdir(SOURCE_CACHE_DIR):
+            os.makedirs(SOURCE_CACHE_DIR)
+        SECTION_CACHE_DIR = os.path.join(options.cache_dir, 'mkdb-sections')
+        if not os.path.isdir(SECTION_CACHE_DIR):
+            os.makedirs(SECTION_CACHE_DIR)
+
     source_dirs = options.source_dir
     ignore_files = options.ignore_files
     logging.info(" ignore files: " + ignore_files)
+    source_files = []
     for sdir in source_dirs:
-        ReadSourceDocumentation(sdir, suffix_list, source_dirs, ignore_files)
+        FindSourceFiles(sdir, suffix_list, source_dirs, ignore_files, source_files)
+    ReadSourceDocumentation(source_files, ignore_files, options.jobs)
 
     logging.info("Sources scanned")
 
@@ -359,6 +472,9 @@ def Run(options):
 
     logging.info("All files created: %d", changed)
 
+    if options.id_stats:
+        common.ReportIdCacheStats(sys.stdout)
+
 
 def OutputObjectList(obj_list):
     """This outputs the alphabetical list of objects, in a columned table."""
@@ -486,6 +602,10 @@ def OutputDB(file, options):
     This collects the output for each section of the docs, and outputs each file
     when the end of the section is found.
 
+    If the section cache is enabled, sections whose inputs did not change since
+    the last run are not generated again. Instead the state they add to the
+    global hashes and their warnings are taken from the cache.
+
     Args:
         file (str): the $MODULE-sections.txt file which contains all of the
                     functions/macros/structs etc. being documented, organised
@@ -530,9 +650,17 @@ def OutputDB(file, options):
     file_objects = []
     file_def_line = {}
     symbol_def_line = {}
+    section_line = 0
 
     MergeSourceDocumentation()
 
+    section_inputs = []
+    if SECTION_CACHE_DIR:
+        section_inputs = GetSectionInputs(file, options)
+    section_index = 0
+    section_entry, section_record = OpenSectionCache(file, section_inputs, section_index)
+
+    trace = common.IsTracing('sections')
     line_number = 0
     for line in INPUT:
         line_number += 1
@@ -540,7 +668,8 @@ def OutputDB(file, options):
         if line.startswith('#'):
             continue
 
-        logging.info("section file data: %d: %s", line_number, line)
+        if trace:
+            logging.info("section file data: %d: %s", line_number, line)
 
         m1 = re.search(r'^<SUBSECTION\s*(.*)>', line, re.I)
         m2 = re.search(r'^<TITLE>(.*)<\/TITLE', line)
@@ -553,6 +682,9 @@ def OutputDB(file, options):
             in_section = False
             file_objects = []
             symbol_def_line = {}
+            section_line = line_number
+            if section_record is not None:
+                section_record['line'] = line_number
 
         elif m1:
             other_synop += "\n"
@@ -596,10 +728,19 @@ def OutputDB(file, options):
             logging.info("End of section: %s", title)
             # TODO: also output if we have sections docs?
             # long_desc = SymbolDocs.get(filename + ":long_description")
-            if num_symbols > 0:
+            if num_symbols > 0 and section_entry:
+                # collect documents
+                book_bottom += "    <xi:include href=\"xml/%s.xml\"/>\n" % filename
+
+                logging.info("Section %s did not change", filename)
+                RestoreSectionState(section_entry)
+                ReplaySectionWarnings(section_entry, '', file, section_line)
+            elif num_symbols > 0:
                 # collect documents
                 book_bottom += "    <xi:include href=\"xml/%s.xml\"/>\n" % filename
 
+                saved_annotations = StartSectionRecording(section_record, '')
+
                 key = filename + ":include"
                 if key in SourceSymbolDocs:
                     if section_includes:
@@ -698,6 +839,13 @@ def OutputDB(file, options):
                 if file_changed:
                     changed = True
 
+                StopSectionRecording(section_record, saved_annotations)
+                if section_record is not None:
+                    WriteSectionCache(file, section_inputs, section_index, filename, section_record)
+
+            section_index += 1
+            section_entry, section_record = OpenSectionCache(file, section_inputs, section_index)
+
             title = ''
             section_id = ''
             subsection = ''
@@ -727,7 +875,8 @@ def OutputDB(file, options):
 
         elif m5:
             symbol = m5.group(1)
-            logging.info('  Symbol: "%s" in subsection: "%s"', symbol, subsection)
+            if trace:
+                logging.info('  Symbol: "%s" in subsection: "%s"', symbol, subsection)
 
             # check for duplicate entries
             if symbol not in symbol_def_line:
@@ -737,46 +886,53 @@ def OutputDB(file, options):
                     if CheckIsObject(symbol):
                         file_objects.append(symbol)
 
-                    # We don't want standard macros/functions of GObjects,
-                    # or private declarations.
-                    if subsection != "Standard" and subsection != "Private":
-                        synop, desc = OutputDeclaration(symbol, declaration)
-                        type = DeclarationTypes[symbol]
-
-                        if type == 'FUNCTION' or type == 'USER_FUNCTION':
-                            functions_synop += synop
-                            functions_details += desc
-                        elif type == 'MACRO' and re.search(symbol + r'\(', declaration):
-                            functions_synop += synop
-                            functions_details += desc
-                        else:
-                            other_synop += synop
-                            other_details += desc
-
-                    sig_synop, sig_desc = GetSignals(symbol)
-                    arg_synop, child_arg_synop, style_arg_synop, arg_desc, child_arg_desc, style_arg_desc = GetArgs(
-                        symbol)
-                    action_synop, action_desc = GetActions(symbol)
-                    ifaces = GetInterfaces(symbol)
-                    impls = GetImplementations(symbol)
-                    prereqs = GetPrerequisites(symbol)
-                    der = GetDerived(symbol)
-                    hierarchy = GetHierarchy(symbol, hierarchy)
-
-                    signals_synop += sig_synop
-                    signals_desc += sig_desc
-                    args_synop += arg_synop
-                    child_args_synop += child_arg_synop
-                    style_args_synop += style_arg_synop
-                    args_desc += arg_desc
-                    child_args_desc += child_arg_desc
-                    style_args_desc += style_arg_desc
-                    actions_synop += action_synop
-                    actions_desc += action_desc
-                    interfaces += ifaces
-                    implementations += impls
-                    prerequisites += prereqs
-                    derived += der
+                    if section_entry:
+                        ReplaySectionWarnings(section_entry, symbol, file, section_line)
+                    else:
+                        saved_annotations = StartSectionRecording(section_record, symbol)
+
+                        # We don't want standard macros/functions of GObjects,
+                        # or private declarations.
+                        if subsection != "Standard" and subsection != "Private":
+                            synop, desc = OutputDeclaration(symbol, declaration)
+                            type = DeclarationTypes[symbol]
+
+                            if type == 'FUNCTION' or type == 'USER_FUNCTION':
+                                functions_synop += synop
+                                functions_details += desc
+                            elif type == 'MACRO' and re.search(symbol + r'\(', declaration):
+                                functions_synop += synop
+                                functions_details += desc
+                            else:
+                                other_synop += synop
+                                other_details += desc
+
+                        sig_synop, sig_desc = GetSignals(symbol)
+                        arg_synop, child_arg_synop, style_arg_synop, arg_desc, child_arg_desc, style_arg_desc = GetArgs(
+                            symbol)
+                        action_synop, action_desc = GetActions(symbol)
+                        ifaces = GetInterfaces(symbol)
+                        impls = GetImplementations(symbol)
+                        prereqs = GetPrerequisites(symbol)
+                        der = GetDerived(symbol)
+                        hierarchy = GetHierarchy(symbol, hierarchy)
+
+                        signals_synop += sig_synop
+                        signals_desc += sig_desc
+                        args_synop += arg_synop
+                        child_args_synop += child_arg_synop
+                        style_args_synop += style_arg_synop
+                        args_desc += arg_desc
+                        child_args_desc += child_arg_desc
+                        style_args_desc += style_arg_desc
+                        actions_synop += action_synop
+                        actions_desc += action_desc
+                        interfaces += ifaces
+                        implementations += impls
+                        prerequisites += prereqs
+                        derived += der
+
+                        StopSectionRecording(section_record, saved_annotations)
 
                     # Note that the declaration has been output.
                     DeclarationOutput[symbol] = True
@@ -836,6 +992,223 @@ def OutputDB(file, options):
     return (changed, book_top, book_bottom)
 
 
+def GetSectionInputs(file, options):
+    """Collect the inputs of each section for the section cache.
+
+    The hash of the inputs of a section covers the files written by gtkdoc-scangobj,
+    the options, the lines of the section in the sections file, the <INCLUDE>
+    in effect for the section, the declarations and docs of the section and of
+    its symbols, signals, properties and actions and the object hierarchy and
+    interfaces of its symbols and its title.
+
+    Args:
+        file (str): the $MODULE-sections.txt file
+        options: commandline options
+
+    Returns:
+        list: a tuple with the hash of the inputs and the list of symbols for
+              each section
+    """
+    module_hash = hashlib.sha256()
+    for part in (str(SECTION_CACHE_VERSION), config.version, MODULE, str(INLINE_MARKUP_MODE), NAME_SPACE,
+                 options.default_includes or '', options.default_stability or '', doctype_header):
+        module_hash.update(part.encode('utf-8'))
+        module_hash.update(b'\0')
+    for ifile in [os.path.join(ROOT_DIR, MODULE + suffix) for suffix in (
+            '.signals', '.args', '.actions', '.hierarchy', '.interfaces', '.prerequisites')]:
+        if os.path.isfile(ifile):
+            module_hash.update(common.GetFileHash(ifile).encode('utf-8'))
+        module_hash.update(b'\0')
+
+    sections = []
+    filename = ''
+    includes = ''
+    titles = []
+    names = []
+    symbols = []
+    lines = []
+    with open(file, 'r', encoding='utf-8') as INPUT:
+        for line in INPUT:
+            lines.append(line)
+            if line.startswith('#'):
+                continue
+
+            m1 = re.search(r'^<TITLE>(.*)<\/TITLE', line)
+            m2 = re.search(r'^<FILE>(.*)<\/FILE>', line)
+            m3 = re.search(r'^(\S+)', line)
+            m4 = re.search(r'^<INCLUDE>(.*)<\/INCLUDE>', line)
+            if m1:
+                titles.append(m1.group(1))
+                names += [m1.group(1), m1.group(1).replace(' ', '_')]
+            elif m2:
+                filename = m2.group(1)
+            elif m4:
+                # like in OutputDB() this applies to all later sections
+                if not options.default_includes:
+                    includes = m4.group(1)
+            elif re.search(r'^<\/SECTION>', line):
+                keys = symbols[:]
+                for symbol in symbols:
+                    keys += ['%s::%s' % (symbol, signal.name) for signal in Signals.get(symbol, ())]
+                    keys += ['%s:%s' % (symbol, arg.name) for arg in Args.get(symbol, ())]
+                    keys += ['%s|%s' % (symbol, action.name) for action in Actions.get(symbol, ())]
+                for name in [filename] + names:
+                    keys += ['%s:%s' % (name, field) for field in SECTION_FIELDS]
+
+                section_hash = module_hash.copy()
+                for line in lines:
+                    section_hash.update(line.encode('utf-8'))
+                section_hash.update(b'\0')
+                section_hash.update(includes.encode('utf-8'))
+                section_hash.update(b'\0')
+                for key in keys:
+                    section_hash.update(key.encode('utf-8'))
+                    for docs in SECTION_INPUTS:
+                        section_hash.update(repr(globals()[docs].get(key)).encode('utf-8'))
+                for name in symbols + titles:
+                    section_hash.update(name.encode('utf-8'))
+                    section_hash.update(repr(GetObjectTree(name)).encode('utf-8'))
+                    for data in SECTION_OBJECT_INPUTS:
+                        section_hash.update(repr(globals()[data].get(name)).encode('utf-8'))
+                sections.append((section_hash.hexdigest(), keys))
+                titles = []
+                names = []
+                symbols = []
+                lines = []
+            elif re.search(r'^<(SECTION|SUBSECTION|INCLUDE)\b', line, re.I):
+                continue
+            elif m3:
+                symbols.append(m3.group(1))
+
+    return sections
+
+
+def GetSectionCacheFile(file, index):
+    h = hashlib.sha256()
+    for part in (str(SECTION_CACHE_VERSION), os.path.realpath(file), os.path.realpath(DB_OUTPUT_DIR), str(index)):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return os.path.join(SECTION_CACHE_DIR, h.hexdigest() + '.json')
+
+
+def OpenSectionCache(file, section_inputs, index):
+    """Check if a section needs to be generated.
+
+    Args:
+        file (str): the $MODULE-sections.txt file
+        section_inputs (list): the inputs of the sections, see GetSectionInputs()
+        index (int): the number of the section in the file
+
+    Returns:
+        tuple: the cache entry if the section did not change, otherwise a record
+               for the annotations and warnings of the section if the cache is
+               enabled
+    """
+    if index >= len(section_inputs):
+        return (None, None)
+
+    entry = ReadSourceCache(GetSectionCacheFile(file, index))
+    if entry and entry['inputs'] == section_inputs[index][0] and os.path.isfile(entry['output']):
+        st = os.stat(entry['output'])
+        if entry['size'] == st.st_size and entry['mtime'] == st.st_mtime_ns:
+            return (entry, None)
+        if entry['hash'] == common.GetFileHash(entry['output']):
+            return (entry, None)
+    return (None, {'annotations': [], 'warnings': {}, 'line': 0})
+
+
+def WriteSectionCache(file, section_inputs, index, filename, record):
+    """Store the output and the state of a generated section.
+
+    Args:
+        file (str): the $MODULE-sections.txt file
+        section_inputs (list): the inputs of the sections, see GetSectionInputs()
+        index (int): the number of the section in the file
+        filename (str): the name of the section file
+        record (dict): the annotations and warnings of the section and its line
+    """
+    (inputs, keys) = section_inputs[index]
+    output = os.path.join(DB_OUTPUT_DIR, filename + '.xml')
+    st = os.stat(output)
+    state = {}
+    for name in SECTION_STATE:
+        values = globals()[name]
+        state[name] = {key: values[key] for key in keys if key in values}
+    WriteSourceCache(GetSectionCacheFile(file, index), {
+        'inputs': inputs, 'output': output, 'size': st.st_size, 'mtime': st.st_mtime_ns,
+        'hash': common.GetFileHash(output), 'state': state,
+        'annotations': record['annotations'], 'warnings': record['warnings'], 'line': record['line']})
+
+
+def RestoreSectionState(entry):
+    """Apply the state of a section that is not generated again.
+
+    Args:
+        entry (dict): the section cache entry
+    """
+    for (name, values) in entry['state'].items():
+        globals()[name].update(values)
+    for annotation in entry['annotations']:
+        AnnotationsUsed[annotation] = 1
+
+
+def ReplaySectionWarnings(entry, position, file, line_number):
+    """Log the recorded warnings of a section that is not generated again.
+
+    The warnings about the sections file are moved along with the section.
+
+    Args:
+        entry (dict): the section cache entry
+        position (str): the symbol that is generated or '' for the section
+        file (str): the $MODULE-sections.txt file
+        line_number (int): the line of the section in the file
+    """
+    offset = line_number - entry['line']
+    warnings = []
+    for warning in entry['warnings'].get(position, []):
+        if isinstance(warning, list) and warning[0] == file:
+            warning = (file, warning[1] + offset, warning[2])
+        warnings.append(warning)
+    common.ReplayWarnings(warnings)
+
+
+def StartSectionRecording(record, position):
+    """Start recording the annotations and warnings of a section.
+
+    The warnings are recorded for the position in the section they are logged
+    at, so that they can be replayed there for an unchanged section.
+
+    Args:
+        record (dict): the record of the section or None
+        position (str): the symbol that is generated or '' for the section
+
+    Returns:
+        dict: the annotations used so far, to pass to StopSectionRecording()
+    """
+    if record is None:
+        return None
+    saved_annotations = AnnotationsUsed.copy()
+    AnnotationsUsed.clear()
+    common.RecordedWarnings = record['warnings'].setdefault(position, [])
+    logging.getLogger().addHandler(SECTION_WARNING_RECORDER)
+    return saved_annotations
+
+
+def StopSectionRecording(record, saved_annotations):
+    """Stop recording the annotations and warnings of a section.
+
+    Args:
+        record (dict): the record of the section or None
+        saved_annotations (dict): the result of StartSectionRecording()
+    """
+    if record is None:
+        return
+    record['annotations'] += [a for a in AnnotationsUsed if a not in record['annotations']]
+    AnnotationsUsed.update(saved_annotations)
+    common.RecordedWarnings = None
+    logging.getLogger().removeHandler(SECTION_WARNING_RECORDER)
+
+
 def DetermineNamespace(symbols):
     """Find common set of characters.
 
@@ -947,39 +1320,33 @@ def OutputIndex(basename, apiindex):
             if m1:
                 oname = m1.group(1)
                 osym = m1.group(2)
-                logging.info("  trying object signal %s:%s in %d signals", oname, osym, len(SignalNames))
-                for name in SignalNames:
-                    logging.info("    " + name)
-                    if name == osym:
-                        symbol_type = "object signal"
-                        if oname in SymbolSection:
-                            symbol_section = SymbolSection[oname]
-                            symbol_section_id = SymbolSectionId[oname]
-                        break
+                logging.info("  trying object signal %s:%s in %d signals", oname, osym,
+                             len(Signals.get(oname, ())))
+                if any(signal.name == osym for signal in Signals.get(oname, ())):
+                    symbol_type = "object signal"
+                    if oname in SymbolSection:
+                        symbol_section = SymbolSection[oname]
+                        symbol_section_id = SymbolSectionId[oname]
             elif m2:
                 oname = m2.group(1)
                 osym = m2.group(2)
-                logging.info("  trying object property %s::%s in %d properties", oname, osym, len(ArgNames))
-                for name in ArgNames:
-                    logging.info("    " + name)
-                    if name == osym:
-                        symbol_type = "object property"
-                        if oname in SymbolSection:
-                            symbol_section = SymbolSection[oname]
-                            symbol_section_id = SymbolSectionId[oname]
-                        break
+                logging.info("  trying object property %s::%s in %d properties", oname, osym,
+                             len(Args.get(oname, ())))
+                if any(arg.name == osym for arg in Args.get(oname, ())):
+                    symbol_type = "object property"
+                    if oname in SymbolSection:
+                        symbol_section = SymbolSection[oname]
+                        symbol_section_id = SymbolSectionId[oname]
             elif m3:
                 oname = m3.group(1)
                 osym = m3.group(2)
-                logging.info("  trying action %s|%s in %d actions", oname, osym, len(ActionNames))
-                for name in ActionNames:
-                    logging.info("    " + name)
-                    if name == osym:
-                        symbol_type = "action"
-                        if oname in SymbolSection:
-                            symbol_section = SymbolSection[oname]
-                            symbol_section_id = SymbolSectionId[oname]
-                        break
+                logging.info("  trying action %s|%s in %d actions", oname, osym,
+                             len(Actions.get(oname, ())))
+                if any(action.name == osym for action in Actions.get(oname, ())):
+                    symbol_type = "action"
+                    if oname in SymbolSection:
+                        symbol_section = SymbolSection[oname]
+                        symbol_section_id = SymbolSectionId[oname]
         else:
             if symbol in SymbolSection:
                 symbol_section = SymbolSection[symbol]
@@ -2735,10 +3102,13 @@ def ExpandAbbreviations(symbol, text):
     """
     # Note: This is a fallback and normally done in the markdown parser
 
-    logging.debug('expand abbreviations for "%s", text: [%s]', symbol, text)
+    trace = common.IsTracing('xml', logging.DEBUG)
+    if trace:
+        logging.debug('expand abbreviations for "%s", text: [%s]', symbol, text)
     m = re.search(r'\|\[[^\n]*\n(.*)\]\|', text, flags=re.M | re.S)
     if m:
-        logging.debug('replaced entities in code block')
+        if trace:
+            logging.debug('replaced entities in code block')
         text = text[:m.start(1)] + md_to_db.ReplaceEntities(m.group(1)) + text[m.end(1):]
 
     # Convert "|[" and "]|" into the start and end of program listing examples.
@@ -2785,36 +3155,44 @@ def ExpandAbbreviationsCallback(text, symbol, tag):
         # We are outside any CDATA or <programlisting> sections, so we expand
         # any gtk-doc abbreviations.
 
+        # Each pass only runs if the text still contains its sigil, as most
+        # segments don't contain any abbreviation at all.
+
         # Convert '@param()'
         # FIXME: we could make those also links ($symbol.$2), but that would be less
         # useful as the link target is a few lines up or down
-        text = re.sub(r'(\A|[^\\])\@(\w+((\.|->)\w+)*)\s*\(\)', r'\1<parameter>\2()</parameter>', text)
+        if '@' in text and '()' in text:
+            text = PARAM_FUNCTION_MATCHER.sub(r'\1<parameter>\2()</parameter>', text)
 
         # Convert 'function()' or 'macro()'.
         # if there is abc_*_def() we don't want to make a link to _def()
         # FIXME: also handle abc(def(....)) : but that would need to be done recursively :/
         def f1(m):
             return m.group(1) + MakeXRef(m.group(2), tagify(m.group(2) + "()", "function"))
-        text = re.sub(r'([^\*.\w])(\w+)\s*\(\)', f1, text)
-        # handle #Object.func()
-        text = re.sub(r'(\A|[^\\])#([\w\-:\.]+[\w]+)\s*\(\)', f1, text)
+        if '()' in text:
+            text = FUNCTION_MATCHER.sub(f1, text)
+            # handle #Object.func()
+            if '#' in text:
+                text = HASH_FUNCTION_MATCHER.sub(f1, text)
 
         # Convert '@param', but not '\@param'.
-        text = re.sub(r'(\A|[^\\])\@(\w+((\.|->)\w+)*)', r'\1<parameter>\2</parameter>', text)
-        text = re.sub(r'/\\\@', r'\@', text)
+        if '@' in text:
+            text = PARAM_MATCHER.sub(r'\1<parameter>\2</parameter>', text)
+            text = text.replace('/\\@', '\\@')
 
         # Convert '%constant', but not '\%constant'.
         # Also allow negative numbers, e.g. %-1.
         def f2(m):
             return m.group(1) + MakeXRef(m.group(2), tagify(m.group(2), "literal"))
-        text = re.sub(r'(\A|[^\\])\%(-?\w+)', f2, text)
-        text = re.sub(r'\\\%', r'\%', text)
+        if '%' in text:
+            text = CONSTANT_MATCHER.sub(f2, text)
 
         # Convert '#symbol', but not '\#symbol'.
         def f3(m):
             return m.group(1) + MakeHashXRef(m.group(2), "type")
-        text = re.sub(r'(\A|[^\\])#([\w\-:\.]+[\w]+)', f3, text)
-        text = re.sub(r'\\#', '#', text)
+        if '#' in text:
+            text = HASH_MATCHER.sub(f3, text)
+            text = text.replace('\\#', '#')
 
     return text
 
@@ -2826,7 +3204,8 @@ def ExpandAbbreviationsCallback2(text, symbol, tag):
         # so we expand any gtk-doc abbreviations.
         # FIXME: why is this different from &ExpandAbbreviationsCallback(),
         #        why not just call it
-        text = re.sub(r'#(\w+)', lambda m: '%s;' % MakeHashXRef(m.group(1), ''), text)
+        if '#' in text:
+            text = PROGRAMLISTING_HASH_MATCHER.sub(lambda m: '%s;' % MakeHashXRef(m.group(1), ''), text)
     elif tag == "<![CDATA[":
         # NOTE: this is a fallback. It is normally done by the Markdown parser.
         text = md_to_db.ReplaceEntities(text, symbol)
@@ -2835,6 +3214,13 @@ def ExpandAbbreviationsCallback2(text, symbol, tag):
 
 
 def MakeHashXRef(symbol, tag):
+    xref = HashXRefLinks.get((symbol, tag))
+    if xref is None:
+        xref = HashXRefLinks[(symbol, tag)] = MakeHashXRefUncached(symbol, tag)
+    return xref
+
+
+def MakeHashXRefUncached(symbol, tag):
     text = symbol
 
     # Check for things like '#include', '#define', and skip them.
@@ -2892,50 +3278,65 @@ def ModifyXMLElements(text, symbol, start_tag_regexp, end_tag_func, callback):
         str: modified text
     """
     before_tag = start_tag = end_tag_regexp = end_tag = None
-    result = ''
+    # Walk the text by position and collect the parts, so that long texts with
+    # many elements are not copied over and over again.
+    result = []
+    pos = 0
 
-    logging.debug('modify xml for symbol: %s, regex: %s, text: [%s]', symbol, start_tag_regexp, text)
+    trace = common.IsTracing('xml', logging.DEBUG)
+    if trace:
+        logging.debug('modify xml for symbol: %s, regex: %s, text: [%s]', symbol, start_tag_regexp, text)
 
-    m = re.search(start_tag_regexp, text, flags=re.S)
+    start_tag_matcher = re.compile(start_tag_regexp, flags=re.S)
+    m = start_tag_matcher.search(text)
     while m:
-        before_tag = text[:m.start()]  # Prematch for last successful match string
-        start_tag = m.group(0)         # Last successful match
-        text = text[m.end():]          # Postmatch for last successful match string
+        before_tag = text[pos:m.start()]  # Prematch for last successful match string
+        start_tag = m.group(0)            # Last successful match
+        pos = m.end()                     # Postmatch for last successful match string
         # get the matching end-tag for current tag
         end_tag_regexp = end_tag_func(start_tag)
 
-        logging.debug('symbol: %s matched start: %s, end_tag: %s, text: [%s]', symbol, start_tag, end_tag_regexp, text)
-
-        logging.debug('converting before tag: [%s]', before_tag)
-        result += callback(before_tag, symbol, '')
-        result += start_tag
+        if trace:
+            logging.debug('symbol: %s matched start: %s, end_tag: %s, at: %d', symbol, start_tag, end_tag_regexp, pos)
+            logging.debug('converting before tag: [%s]', before_tag)
+        result.append(callback(before_tag, symbol, ''))
+        result.append(start_tag)
 
-        m2 = re.search(end_tag_regexp, text, flags=re.S)
+        m2 = re.compile(end_tag_regexp, flags=re.S).search(text, pos)
         if m2:
-            before_tag = text[:m2.start()]
+            before_tag = text[pos:m2.start()]
             end_tag = m2.group(0)
-            text = text[m2.end():]
+            pos = m2.end()
 
-            logging.debug('symbol: %s matched end %s: text: [%s]', symbol, end_tag, text)
+            if trace:
+                logging.debug('symbol: %s matched end %s: at: %d', symbol, end_tag, pos)
 
-            result += callback(before_tag, symbol, start_tag)
-            result += end_tag
+            result.append(callback(before_tag, symbol, start_tag))
+            result.append(end_tag)
         else:
-            common.LogWarning(*GetSymbolSourceLocation(symbol),
-                              "Can't find tag end: %s in docs for: %s." % (end_tag_regexp, symbol))
+            SourceCall(LogMissingEndTag, symbol, end_tag_regexp)
             # Just assume it is all inside the tag.
-            result += callback(text, symbol, start_tag)
-            text = ''
-        m = re.search(start_tag_regexp, text, flags=re.S)
+            result.append(callback(text[pos:], symbol, start_tag))
+            pos = len(text)
+        m = start_tag_matcher.search(text, pos)
 
     # Handle any remaining text outside the tags.
-    logging.debug('converting after tag: [%s]', text)
-    result += callback(text, symbol, '')
-    logging.debug('results for symbol: %s, text: [%s]', symbol, result)
+    text = text[pos:]
+    if trace:
+        logging.debug('converting after tag: [%s]', text)
+    result.append(callback(text, symbol, ''))
+    result = ''.join(result)
+    if trace:
+        logging.debug('results for symbol: %s, text: [%s]', symbol, result)
 
     return result
 
 
+def LogMissingEndTag(symbol, end_tag_regexp):
+    common.LogWarning(*GetSymbolSourceLocation(symbol),
+                      "Can't find tag end: %s in docs for: %s." % (end_tag_regexp, symbol))
+
+
 def tagify(text, elem):
     # Adds a tag around some text.
     # e.g tagify("Text", "literal") => "<literal>Text</literal>".
@@ -2972,6 +3373,14 @@ def MakeXRef(symbol, text=None):
     Returns:
         str: a docbook link
     """
+    xref = XRefLinks.get((symbol, text))
+    if xref is None:
+        xref = XRefLinks[(symbol, text)] = MakeXRefUncached(symbol, text)
+    return xref
+
+
+def MakeXRefUncached(symbol, text=None):
+    """Creates the link for MakeXRef(), which memoizes the result."""
     symbol = symbol.strip()
     if not text:
         text = symbol
@@ -3105,7 +3514,8 @@ def GetHierarchy(gobject, hierarchy):
 
     Returns the DocBook output describing the ancestors and
     immediate children of a GObject subclass. It uses the
-    global Objects and ObjectLevels arrays to walk the tree.
+    global ObjectParents and ObjectChildren arrays to walk the tree from
+    the first entry of the object.
 
     Args:
         object (str): the GtkObject subclass.
@@ -3114,38 +3524,12 @@ def GetHierarchy(gobject, hierarchy):
     Returns:
         list: lines of docbook describing the hierarchy
     """
-    # Find object in the objects array.
-    found = False
-    children = []
-    level = 0
-    j = 0
-    for i in range(len(Objects)):
-        if found:
-            if ObjectLevels[i] <= level:
-                break
-
-            elif ObjectLevels[i] == level + 1:
-                children.append(Objects[i])
-
-        elif Objects[i] == gobject:
-            found = True
-            j = i
-            level = ObjectLevels[i]
-
-    if not found:
+    tree = GetObjectTree(gobject)
+    if tree is None:
         return hierarchy
 
     logging.info("=== Hierarchy for: %s (%d existing entries) ===", gobject, len(hierarchy))
-
-    # Walk up the hierarchy, pushing ancestors onto the ancestors array.
-    ancestors = [gobject]
-    logging.info("Level: %s", level)
-    while level > 1:
-        j -= 1
-        if ObjectLevels[j] < level:
-            ancestors.append(Objects[j])
-            level = ObjectLevels[j]
-            logging.info("Level: %s", level)
+    ancestors, children = tree
 
     # Output the ancestors, indented and with links.
     logging.info('%d ancestors', len(ancestors))
@@ -3217,6 +3601,33 @@ def GetHierarchy(gobject, hierarchy):
     return hierarchy
 
 
+def GetObjectTree(gobject):
+    """Get the ancestors and the immediate children of an object.
+
+    It uses the global ObjectParents and ObjectChildren arrays to walk the tree
+    from the first entry of the object.
+
+    Args:
+        gobject (str): the GObject subclass.
+
+    Returns:
+        tuple: the list of the object and its ancestors and the list of its
+               children, or None if the object is not in the hierarchy
+    """
+    index = ObjectIndices.get(gobject)
+    if index is None:
+        return None
+
+    # Walk up the hierarchy, pushing ancestors onto the ancestors array.
+    ancestors = [gobject]
+    parent = ObjectParents[index]
+    while parent is not None:
+        ancestors.append(Objects[parent])
+        parent = ObjectParents[parent]
+    children = [Objects[i] for i in ObjectChildren[index]]
+    return (ancestors, children)
+
+
 def GetInterfaces(gobject):
     """Generate interface implementation graph.
 
@@ -3254,7 +3665,7 @@ def GetImplementations(gobject):
     """Generate interface usage graph.
 
     Returns the DocBook output describing the implementations
-    of an interface. It uses the global Interfaces hash.
+    of an interface. It uses the global Implementations hash.
 
     Args:
         object (str): the GObject subclass.
@@ -3263,14 +3674,10 @@ def GetImplementations(gobject):
         str: interface implementations
     """
     text = ''
-    impls = []
-    for key in Interfaces:
-        if re.search(r'\b%s\b' % gobject, Interfaces[key]):
-            impls.append(key)
+    impls = Implementations.get(gobject, [])
 
     count = len(impls)
     if count > 0:
-        impls.sort()
         text = '''<para>
 %s is implemented by
 ''' % gobject
@@ -3322,7 +3729,7 @@ def GetPrerequisites(iface):
 def GetDerived(iface):
     """
     Returns the DocBook output describing the derived interfaces
-    of an interface. It uses the global %Prerequisites hash.
+    of an interface. It uses the global DerivedInterfaces hash.
 
     Args:
         iface (str): the interface.
@@ -3331,14 +3738,10 @@ def GetDerived(iface):
         str: derived interfaces
     """
     text = ''
-    derived = []
-    for key in Prerequisites:
-        if re.search(r'\b%s\b' % iface, Prerequisites[key]):
-            derived.append(key)
+    derived = DerivedInterfaces.get(iface, [])
 
     count = len(derived)
     if count > 0:
-        derived.sort()
         text = '''<para>
 %s is required by
 ''' % iface
@@ -3370,144 +3773,143 @@ def GetSignals(gobject):
     synop = ''
     desc = ''
 
-    for i in range(len(SignalObjects)):
-        if SignalObjects[i] == gobject:
-            logging.info("Found signal: %s", SignalNames[i])
-            name = SignalNames[i]
-            symbol = '%s::%s' % (gobject, name)
-            sid = common.CreateValidSGMLID('%s-%s' % (gobject, name))
-
-            desc += u"<refsect2 id=\"%s\" role=\"signal\"><title>The <literal>“%s”</literal> signal</title>\n" % (
-                sid, name)
-            desc += MakeIndexterms(symbol, sid)
-            desc += "\n"
-            desc += OutputSymbolExtraLinks(symbol)
-
-            desc += "<programlisting language=\"C\">"
-
-            m = re.search(r'\s*(const\s+)?(\w+)\s*(\**)', SignalReturns[i])
-            type_modifier = m.group(1) or ''
-            gtype = m.group(2)
-            pointer = m.group(3)
-            xref = MakeXRef(gtype, tagify(gtype, "returnvalue"))
-
-            ret_type_output = '%s%s%s' % (type_modifier, xref, pointer)
-            callback_name = "user_function"
-            desc += '%s\n%s (' % (ret_type_output, callback_name)
-
-            indentation = ' ' * (len(callback_name) + 2)
-
-            sourceparams = SourceSymbolParams.get(symbol)
-            sourceparam_names = None
-            if sourceparams:
-                sourceparam_names = list(sourceparams)  # keys as list
-            params = SignalPrototypes[i].splitlines()
-            type_len = len("gpointer")
-            name_len = len("user_data")
-            # do two passes, the first one is to calculate padding
-            for l in range(2):
-                for j in range(len(params)):
-                    param_name = None
-                    # allow alphanumerics, '_', '[' & ']' in param names
-                    m = re.search(r'^\s*(\w+)\s*(\**)\s*([\w\[\]]+)\s*$', params[j])
-                    if m:
-                        gtype = m.group(1)
-                        pointer = m.group(2)
-                        if sourceparam_names:
-                            if j < len(sourceparam_names):
-                                param_name = sourceparam_names[j]
-                                logging.info('from sourceparams: "%s" (%d: %s)', param_name, j, params[j])
-                            # we're missing the docs for this param, don't warn here though
-                        else:
-                            param_name = m.group(3)
-                            logging.info('from params: "%s" (%d: %s)', param_name, j, params[j])
-
-                        if not param_name:
-                            param_name = "arg%d" % j
+    for signal in Signals.get(gobject, []):
+        logging.info("Found signal: %s", signal.name)
+        name = signal.name
+        symbol = '%s::%s' % (gobject, name)
+        sid = common.CreateValidSGMLID('%s-%s' % (gobject, name))
+
+        desc += u"<refsect2 id=\"%s\" role=\"signal\"><title>The <literal>“%s”</literal> signal</title>\n" % (
+            sid, name)
+        desc += MakeIndexterms(symbol, sid)
+        desc += "\n"
+        desc += OutputSymbolExtraLinks(symbol)
+
+        desc += "<programlisting language=\"C\">"
+
+        m = re.search(r'\s*(const\s+)?(\w+)\s*(\**)', signal.returns)
+        type_modifier = m.group(1) or ''
+        gtype = m.group(2)
+        pointer = m.group(3)
+        xref = MakeXRef(gtype, tagify(gtype, "returnvalue"))
+
+        ret_type_output = '%s%s%s' % (type_modifier, xref, pointer)
+        callback_name = "user_function"
+        desc += '%s\n%s (' % (ret_type_output, callback_name)
+
+        indentation = ' ' * (len(callback_name) + 2)
+
+        sourceparams = SourceSymbolParams.get(symbol)
+        sourceparam_names = None
+        if sourceparams:
+            sourceparam_names = list(sourceparams)  # keys as list
+        params = signal.prototype.splitlines()
+        type_len = len("gpointer")
+        name_len = len("user_data")
+        # do two passes, the first one is to calculate padding
+        for l in range(2):
+            for j in range(len(params)):
+                param_name = None
+                # allow alphanumerics, '_', '[' & ']' in param names
+                m = re.search(r'^\s*(\w+)\s*(\**)\s*([\w\[\]]+)\s*$', params[j])
+                if m:
+                    gtype = m.group(1)
+                    pointer = m.group(2)
+                    if sourceparam_names:
+                        if j < len(sourceparam_names):
+                            param_name = sourceparam_names[j]
+                            logging.info('from sourceparams: "%s" (%d: %s)', param_name, j, params[j])
+                        # we're missing the docs for this param, don't warn here though
+                    else:
+                        param_name = m.group(3)
+                        logging.info('from params: "%s" (%d: %s)', param_name, j, params[j])
 
-                        if l == 0:
-                            if len(gtype) + len(pointer) > type_len:
-                                type_len = len(gtype) + len(pointer)
-                            if len(param_name) > name_len:
-                                name_len = len(param_name)
-                        else:
-                            logging.info("signal arg[%d]: '%s'", j, param_name)
-                            xref = MakeXRef(gtype, tagify(gtype, "type"))
-                            pad = ' ' * (type_len - len(gtype) - len(pointer))
-                            desc += '%s%s %s%s,\n' % (xref, pad, pointer, param_name)
-                            desc += indentation
+                    if not param_name:
+                        param_name = "arg%d" % j
 
+                    if l == 0:
+                        if len(gtype) + len(pointer) > type_len:
+                            type_len = len(gtype) + len(pointer)
+                        if len(param_name) > name_len:
+                            name_len = len(param_name)
                     else:
-                        common.LogWarning(*GetSymbolSourceLocation(symbol),
-                                          "Can't parse arg: %s\nArgs:%s" % (params[j], SignalPrototypes[i]))
+                        logging.info("signal arg[%d]: '%s'", j, param_name)
+                        xref = MakeXRef(gtype, tagify(gtype, "type"))
+                        pad = ' ' * (type_len - len(gtype) - len(pointer))
+                        desc += '%s%s %s%s,\n' % (xref, pad, pointer, param_name)
+                        desc += indentation
 
-            xref = MakeXRef("gpointer", tagify("gpointer", "type"))
-            pad = ' ' * (type_len - len("gpointer"))
-            desc += '%s%s user_data)' % (xref, pad)
-            desc += "</programlisting>\n"
+                else:
+                    common.LogWarning(*GetSymbolSourceLocation(symbol),
+                                      "Can't parse arg: %s\nArgs:%s" % (params[j], signal.prototype))
 
-            flags = SignalFlags[i]
-            flags_string = ''
-            if flags:
-                if 'f' in flags:
-                    flags_string = "<link linkend=\"G-SIGNAL-RUN-FIRST:CAPS\">Run First</link>"
+        xref = MakeXRef("gpointer", tagify("gpointer", "type"))
+        pad = ' ' * (type_len - len("gpointer"))
+        desc += '%s%s user_data)' % (xref, pad)
+        desc += "</programlisting>\n"
 
-                elif 'l' in flags:
-                    flags_string = "<link linkend=\"G-SIGNAL-RUN-LAST:CAPS\">Run Last</link>"
+        flags = signal.flags
+        flags_string = ''
+        if flags:
+            if 'f' in flags:
+                flags_string = "<link linkend=\"G-SIGNAL-RUN-FIRST:CAPS\">Run First</link>"
 
-                elif 'c' in flags:
-                    flags_string = "<link linkend=\"G-SIGNAL-RUN-CLEANUP:CAPS\">Cleanup</link>"
-                    flags_string = "Cleanup"
+            elif 'l' in flags:
+                flags_string = "<link linkend=\"G-SIGNAL-RUN-LAST:CAPS\">Run Last</link>"
 
-                if 'r' in flags:
-                    if flags_string:
-                        flags_string += " / "
-                    flags_string = "<link linkend=\"G-SIGNAL-NO-RECURSE:CAPS\">No Recursion</link>"
+            elif 'c' in flags:
+                flags_string = "<link linkend=\"G-SIGNAL-RUN-CLEANUP:CAPS\">Cleanup</link>"
+                flags_string = "Cleanup"
 
-                if 'd' in flags:
-                    if flags_string:
-                        flags_string += " / "
-                    flags_string = "<link linkend=\"G-SIGNAL-DETAILED:CAPS\">Has Details</link>"
+            if 'r' in flags:
+                if flags_string:
+                    flags_string += " / "
+                flags_string = "<link linkend=\"G-SIGNAL-NO-RECURSE:CAPS\">No Recursion</link>"
 
-                if 'a' in flags:
-                    if flags_string:
-                        flags_string += " / "
-                    flags_string = "<link linkend=\"G-SIGNAL-ACTION:CAPS\">Action</link>"
+            if 'd' in flags:
+                if flags_string:
+                    flags_string += " / "
+                flags_string = "<link linkend=\"G-SIGNAL-DETAILED:CAPS\">Has Details</link>"
 
-                if 'h' in flags:
-                    if flags_string:
-                        flags_string += " / "
-                    flags_string = "<link linkend=\"G-SIGNAL-NO-HOOKS:CAPS\">No Hooks</link>"
+            if 'a' in flags:
+                if flags_string:
+                    flags_string += " / "
+                flags_string = "<link linkend=\"G-SIGNAL-ACTION:CAPS\">Action</link>"
+
+            if 'h' in flags:
+                if flags_string:
+                    flags_string += " / "
+                flags_string = "<link linkend=\"G-SIGNAL-NO-HOOKS:CAPS\">No Hooks</link>"
 
-            synop += "<row><entry role=\"signal_type\">%s</entry><entry role=\"signal_name\"><link linkend=\"%s\">%s</link></entry><entry role=\"signal_flags\">%s</entry></row>\n" % (
-                ret_type_output, sid, name, flags_string)
+        synop += "<row><entry role=\"signal_type\">%s</entry><entry role=\"signal_name\"><link linkend=\"%s\">%s</link></entry><entry role=\"signal_flags\">%s</entry></row>\n" % (
+            ret_type_output, sid, name, flags_string)
 
-            parameters = OutputParamDescriptions("SIGNAL", symbol, None)
-            logging.info("formatted signal params: '%s' -> '%s'", symbol, parameters)
+        parameters = OutputParamDescriptions("SIGNAL", symbol, None)
+        logging.info("formatted signal params: '%s' -> '%s'", symbol, parameters)
 
-            AllSymbols[symbol] = 1
-            if symbol in SymbolDocs:
-                symbol_docs = ConvertMarkDown(symbol, SymbolDocs[symbol])
+        AllSymbols[symbol] = 1
+        if symbol in SymbolDocs:
+            symbol_docs = ConvertMarkDown(symbol, SymbolDocs[symbol])
 
-                desc += symbol_docs
+            desc += symbol_docs
 
-                if not IsEmptyDoc(SymbolDocs[symbol]):
-                    AllDocumentedSymbols[symbol] = 1
+            if not IsEmptyDoc(SymbolDocs[symbol]):
+                AllDocumentedSymbols[symbol] = 1
 
-            if symbol in SymbolAnnotations:
-                param_desc = SymbolAnnotations[symbol]
-                param_desc, param_annotations = ExpandAnnotation(symbol, param_desc)
-                if param_annotations != '':
-                    desc += "\n<para>%s</para>" % param_annotations
+        if symbol in SymbolAnnotations:
+            param_desc = SymbolAnnotations[symbol]
+            param_desc, param_annotations = ExpandAnnotation(symbol, param_desc)
+            if param_annotations != '':
+                desc += "\n<para>%s</para>" % param_annotations
 
-            desc += MakeDeprecationNote(symbol)
+        desc += MakeDeprecationNote(symbol)
 
-            desc += parameters
-            if flags_string:
-                desc += "<para>Flags: %s</para>\n" % flags_string
+        desc += parameters
+        if flags_string:
+            desc += "<para>Flags: %s</para>\n" % flags_string
 
-            desc += OutputSymbolTraits(symbol)
-            desc += "</refsect2>"
+        desc += OutputSymbolTraits(symbol)
+        desc += "</refsect2>"
 
     return (synop, desc)
 
@@ -3531,128 +3933,127 @@ def GetArgs(gobject):
     style_synop = ''
     style_desc = ''
 
-    for i in range(len(ArgObjects)):
-        if ArgObjects[i] == gobject:
-            logging.info("Found arg: %s", ArgNames[i])
-            name = ArgNames[i]
-            flags = ArgFlags[i]
-            flags_string = ''
-            kind = ''
-            id_sep = ''
-
-            if 'c' in flags:
-                kind = "child property"
-                id_sep = "c-"
-            elif 's' in flags:
-                kind = "style property"
-                id_sep = "s-"
-            else:
-                kind = "property"
-
-            # Remember only one colon so we don't clash with signals.
-            symbol = '%s:%s' % (gobject, name)
-            # use two dashes and ev. an extra separator here for the same reason.
-            sid = common.CreateValidSGMLID('%s--%s%s' % (gobject, id_sep, name))
-
-            atype = ArgTypes[i]
-            type_output = None
-            arange = ArgRanges[i]
-            range_output = CreateValidSGML(arange)
-            default = ArgDefaults[i]
-            default_output = CreateValidSGML(default)
-
-            if atype == "GtkString":
-                atype = "char&#160;*"
-
-            if atype == "GtkSignal":
-                atype = "GtkSignalFunc, gpointer"
-                type_output = MakeXRef("GtkSignalFunc") + ", " + MakeXRef("gpointer")
-            elif re.search(r'^(\w+)\*$', atype):
-                m = re.search(r'^(\w+)\*$', atype)
-                type_output = MakeXRef(m.group(1), tagify(m.group(1), "type")) + "&#160;*"
-            else:
-                type_output = MakeXRef(atype, tagify(atype, "type"))
+    for arg in Args.get(gobject, []):
+        logging.info("Found arg: %s", arg.name)
+        name = arg.name
+        flags = arg.flags
+        flags_string = ''
+        kind = ''
+        id_sep = ''
+
+        if 'c' in flags:
+            kind = "child property"
+            id_sep = "c-"
+        elif 's' in flags:
+            kind = "style property"
+            id_sep = "s-"
+        else:
+            kind = "property"
+
+        # Remember only one colon so we don't clash with signals.
+        symbol = '%s:%s' % (gobject, name)
+        # use two dashes and ev. an extra separator here for the same reason.
+        sid = common.CreateValidSGMLID('%s--%s%s' % (gobject, id_sep, name))
+
+        atype = arg.type
+        type_output = None
+        arange = arg.range
+        range_output = CreateValidSGML(arange)
+        default = arg.default
+        default_output = CreateValidSGML(default)
+
+        if atype == "GtkString":
+            atype = "char&#160;*"
+
+        if atype == "GtkSignal":
+            atype = "GtkSignalFunc, gpointer"
+            type_output = MakeXRef("GtkSignalFunc") + ", " + MakeXRef("gpointer")
+        elif re.search(r'^(\w+)\*$', atype):
+            m = re.search(r'^(\w+)\*$', atype)
+            type_output = MakeXRef(m.group(1), tagify(m.group(1), "type")) + "&#160;*"
+        else:
+            type_output = MakeXRef(atype, tagify(atype, "type"))
 
-            if 'r' in flags:
-                flags_string = "Read"
+        if 'r' in flags:
+            flags_string = "Read"
 
-            if 'w' in flags:
-                if flags_string:
-                    flags_string += " / "
-                flags_string += "Write"
+        if 'w' in flags:
+            if flags_string:
+                flags_string += " / "
+            flags_string += "Write"
 
-            if 'x' in flags:
-                if flags_string:
-                    flags_string += " / "
-                flags_string += "Construct"
+        if 'x' in flags:
+            if flags_string:
+                flags_string += " / "
+            flags_string += "Construct"
 
-            if 'X' in flags:
-                if flags_string:
-                    flags_string += " / "
-                flags_string += "Construct&#160;Only"
+        if 'X' in flags:
+            if flags_string:
+                flags_string += " / "
+            flags_string += "Construct&#160;Only"
 
-            AllSymbols[symbol] = 1
-            blurb = ''
-            if symbol in SymbolDocs and not IsEmptyDoc(SymbolDocs[symbol]):
-                blurb = ConvertMarkDown(symbol, SymbolDocs[symbol])
-                logging.info(".. [%s][%s]", SymbolDocs[symbol], blurb)
-                AllDocumentedSymbols[symbol] = 1
+        AllSymbols[symbol] = 1
+        blurb = ''
+        if symbol in SymbolDocs and not IsEmptyDoc(SymbolDocs[symbol]):
+            blurb = ConvertMarkDown(symbol, SymbolDocs[symbol])
+            logging.info(".. [%s][%s]", SymbolDocs[symbol], blurb)
+            AllDocumentedSymbols[symbol] = 1
 
+        else:
+            if arg.blurb != '':
+                blurb = "<para>" + CreateValidSGML(arg.blurb) + "</para>"
+                AllDocumentedSymbols[symbol] = 1
             else:
-                if ArgBlurbs[i] != '':
-                    blurb = "<para>" + CreateValidSGML(ArgBlurbs[i]) + "</para>"
-                    AllDocumentedSymbols[symbol] = 1
-                else:
-                    # FIXME: print a warning?
-                    logging.info(".. no description")
-
-            pad1 = ''
-            if len(name) < 24:
-                pad1 = " " * (24 - len(name))
-
-            arg_synop = "<row><entry role=\"property_type\">%s</entry><entry role=\"property_name\"><link linkend=\"%s\">%s</link></entry><entry role=\"property_flags\">%s</entry></row>\n" % (
-                type_output, sid, name, flags_string)
-            arg_desc = u"<refsect2 id=\"%s\" role=\"property\"><title>The <literal>“%s”</literal> %s</title>\n" % (
-                sid, name, kind)
-            arg_desc += MakeIndexterms(symbol, sid)
-            arg_desc += "\n"
-            arg_desc += OutputSymbolExtraLinks(symbol)
-
-            arg_desc += u"<programlisting>  “%s”%s %s</programlisting>\n" % (name, pad1, type_output)
-            arg_desc += blurb
-            if symbol in SymbolAnnotations:
-                param_desc = SymbolAnnotations[symbol]
-                param_desc, param_annotations = ExpandAnnotation(symbol, param_desc)
-                if param_annotations != '':
-                    arg_desc += "\n<para>%s</para>" % param_annotations
+                # FIXME: print a warning?
+                logging.info(".. no description")
 
-            arg_desc += MakeDeprecationNote(symbol)
+        pad1 = ''
+        if len(name) < 24:
+            pad1 = " " * (24 - len(name))
+
+        arg_synop = "<row><entry role=\"property_type\">%s</entry><entry role=\"property_name\"><link linkend=\"%s\">%s</link></entry><entry role=\"property_flags\">%s</entry></row>\n" % (
+            type_output, sid, name, flags_string)
+        arg_desc = u"<refsect2 id=\"%s\" role=\"property\"><title>The <literal>“%s”</literal> %s</title>\n" % (
+            sid, name, kind)
+        arg_desc += MakeIndexterms(symbol, sid)
+        arg_desc += "\n"
+        arg_desc += OutputSymbolExtraLinks(symbol)
+
+        arg_desc += u"<programlisting>  “%s”%s %s</programlisting>\n" % (name, pad1, type_output)
+        arg_desc += blurb
+        if symbol in SymbolAnnotations:
+            param_desc = SymbolAnnotations[symbol]
+            param_desc, param_annotations = ExpandAnnotation(symbol, param_desc)
+            if param_annotations != '':
+                arg_desc += "\n<para>%s</para>" % param_annotations
 
-            arg_desc += "<para>Owner: %s</para>\n" % gobject
+        arg_desc += MakeDeprecationNote(symbol)
 
-            if flags_string:
-                arg_desc += "<para>Flags: %s</para>\n" % flags_string
+        arg_desc += "<para>Owner: %s</para>\n" % gobject
 
-            if arange != '':
-                arg_desc += "<para>Allowed values: %s</para>\n" % range_output
+        if flags_string:
+            arg_desc += "<para>Flags: %s</para>\n" % flags_string
 
-            if default != '':
-                arg_desc += "<para>Default value: %s</para>\n" % default_output
+        if arange != '':
+            arg_desc += "<para>Allowed values: %s</para>\n" % range_output
 
-            arg_desc += OutputSymbolTraits(symbol)
-            arg_desc += "</refsect2>\n"
+        if default != '':
+            arg_desc += "<para>Default value: %s</para>\n" % default_output
 
-            if 'c' in flags:
-                child_synop += arg_synop
-                child_desc += arg_desc
+        arg_desc += OutputSymbolTraits(symbol)
+        arg_desc += "</refsect2>\n"
 
-            elif 's' in flags:
-                style_synop += arg_synop
-                style_desc += arg_desc
+        if 'c' in flags:
+            child_synop += arg_synop
+            child_desc += arg_desc
 
-            else:
-                synop += arg_synop
-                desc += arg_desc
+        elif 's' in flags:
+            style_synop += arg_synop
+            style_desc += arg_desc
+
+        else:
+            synop += arg_synop
+            desc += arg_desc
 
     return (synop, child_synop, style_synop, desc, child_desc, style_desc)
 
@@ -3672,54 +4073,53 @@ def GetActions(gobject):
     synop = ''
     desc = ''
 
-    for i in range(len(ActionObjects)):
-        if ActionObjects[i] == gobject:
-            logging.info("Found action: %s", ActionNames[i])
-            name = ActionNames[i]
-            params = ActionParams[i]
-            prop = ActionProperties[i]
-
-            # Remember: pipe, so we don't clash with signals.
-            symbol = '%s|%s' % (gobject, name)
-            sid = common.CreateValidSGMLID(symbol)
-
-            AllSymbols[symbol] = 1
-            blurb = ''
-            if symbol in SymbolDocs and not IsEmptyDoc(SymbolDocs[symbol]):
-                blurb = ConvertMarkDown(symbol, SymbolDocs[symbol])
-                logging.info(".. [%s][%s]", SymbolDocs[symbol], blurb)
-                AllDocumentedSymbols[symbol] = 1
+    for action in Actions.get(gobject, []):
+        logging.info("Found action: %s", action.name)
+        name = action.name
+        params = action.params
+        prop = action.prop
 
-            else:
-                # FIXME: print a warning?
-                logging.info(".. no description")
+        # Remember: pipe, so we don't clash with signals.
+        symbol = '%s|%s' % (gobject, name)
+        sid = common.CreateValidSGMLID(symbol)
 
-            pad1 = ''
-            if len(name) < 24:
-                pad1 = " " * (24 - len(name))
-
-            action_synop = "<row><entry></entry><entry role=\"action_name\"><link linkend=\"%s\">%s</link></entry><entry role=\"parameter_type\">%s</entry></row>\n" % (
-                sid, name, params)
-            action_desc = u"<refsect2 id=\"%s\" role=\"action\"><title>The <literal>“%s”</literal> action</title>\n" % (
-                sid, name)
-            action_desc += MakeIndexterms(symbol, sid)
-            action_desc += "\n"
-            action_desc += OutputSymbolExtraLinks(symbol)
-            if blurb != '':
-                action_desc += blurb
-            elif prop != '':
-                action_desc += "<para>The %s action sets the %s property.</para>\n" % (name, MakeHashXRef (gobject + ':' + prop, "type"))
-            action_desc += MakeDeprecationNote(symbol)
-
-            if params != '':
-                action_desc += "<para>Parameter type: %s</para>\n" % params
-
-            action_desc += OutputParamDescriptions("ACTION", symbol, None)
-            action_desc += OutputSymbolTraits(symbol)
-            action_desc += "</refsect2>\n"
-
-            synop += action_synop
-            desc += action_desc
+        AllSymbols[symbol] = 1
+        blurb = ''
+        if symbol in SymbolDocs and not IsEmptyDoc(SymbolDocs[symbol]):
+            blurb = ConvertMarkDown(symbol, SymbolDocs[symbol])
+            logging.info(".. [%s][%s]", SymbolDocs[symbol], blurb)
+            AllDocumentedSymbols[symbol] = 1
+
+        else:
+            # FIXME: print a warning?
+            logging.info(".. no description")
+
+        pad1 = ''
+        if len(name) < 24:
+            pad1 = " " * (24 - len(name))
+
+        action_synop = "<row><entry></entry><entry role=\"action_name\"><link linkend=\"%s\">%s</link></entry><entry role=\"parameter_type\">%s</entry></row>\n" % (
+            sid, name, params)
+        action_desc = u"<refsect2 id=\"%s\" role=\"action\"><title>The <literal>“%s”</literal> action</title>\n" % (
+            sid, name)
+        action_desc += MakeIndexterms(symbol, sid)
+        action_desc += "\n"
+        action_desc += OutputSymbolExtraLinks(symbol)
+        if blurb != '':
+            action_desc += blurb
+        elif prop != '':
+            action_desc += "<para>The %s action sets the %s property.</para>\n" % (name, MakeHashXRef (gobject + ':' + prop, "type"))
+        action_desc += MakeDeprecationNote(symbol)
+
+        if params != '':
+            action_desc += "<para>Parameter type: %s</para>\n" % params
+
+        action_desc += OutputParamDescriptions("ACTION", symbol, None)
+        action_desc += OutputSymbolTraits(symbol)
+        action_desc += "</refsect2>\n"
+
+        synop += action_synop
+        desc += action_desc
 
     return (synop, desc)
 
@@ -3740,15 +4140,15 @@ def IgnorePath(path, source_dirs, ignore_files):
     return False
 
 
-def ReadSourceDocumentation(source_dir, suffix_list, source_dirs, ignore_files):
-    """Read the documentation embedded in comment blocks in the source code.
+def FindSourceFiles(source_dir, suffix_list, source_dirs, ignore_files, source_files):
+    """Find the source files to scan for documentation.
 
-    It recursively descends the source directory looking for source files and
-    scans them looking for specially-formatted comment blocks.
+    It recursively descends the source directory looking for source files.
 
     Args:
         source_dir (str): the directory to scan.
         suffix_list (list): extensions to check
+        source_files (list): the files found are added here
     """
     if IgnorePath(source_dir, source_dirs, ignore_files):
         return
@@ -3769,12 +4169,141 @@ def ReadSourceDocumentation(source_dir, suffix_list, source_dirs, ignore_files):
             for suffix in suffix_list:
                 if ifile.endswith(suffix):
                     if not IgnorePath(fname, source_dirs, ignore_files):
-                        ScanSourceFile(fname, ignore_files)
+                        source_files.append(fname)
                         break
 
     # Now recursively scan the subdirectories.
     for sdir in subdirs:
-        ReadSourceDocumentation(sdir, suffix_list, source_dirs, ignore_files)
+        FindSourceFiles(sdir, suffix_list, source_dirs, ignore_files, source_files)
+
+
+def ReadSourceDocumentation(source_files, ignore_files, jobs=1):
+    """Read the documentation embedded in comment blocks in the source code.
+
+    If jobs > 1 the files are read and the comment blocks are split into their
+    parts by a pool of processes. The results are merged in the order of the
+    files, so that the warnings and the docs are the same as with one process.
+    If the source cache is enabled, unchanged files are not scanned again, only
+    their results are merged.
+
+    Args:
+        source_files (list): the files to scan
+        jobs (int): number of processes to use
+    """
+    mp_ctx = None
+    if jobs > 1 and len(source_files) > 1:
+        try:
+            mp_ctx = multiprocessing.get_context('fork')
+        except ValueError:
+            logging.warning('Parallel scanning is not supported on this platform')
+
+    worker_args = [(f, ignore_files) for f in source_files]
+    if mp_ctx:
+        with mp_ctx.Pool(jobs) as p:
+            for calls in p.imap(ScanSourceFileWorker, worker_args):
+                for (func, args) in calls:
+                    func(*args)
+    elif SOURCE_CACHE_DIR:
+        for calls in map(ScanSourceFileWorker, worker_args):
+            for (func, args) in calls:
+                func(*args)
+    else:
+        for ifile in source_files:
+            ScanSourceFile(ifile, ignore_files)
+
+
+def ScanSourceFileWorker(args):
+    """Scan a source file and record the calls to make for it.
+
+    If the source cache is enabled and the file has not changed since the last
+    run, the calls are taken from the cache.
+
+    Args:
+        args (tuple): the arguments for ScanSourceFile()
+
+    Returns:
+        list: the recorded calls, see SourceCall()
+    """
+    global SourceCalls
+
+    (ifile, ignore_files) = args
+    cache_file = None
+    if SOURCE_CACHE_DIR:
+        cache_file = GetSourceCacheFile(ifile, ignore_files)
+        st = os.stat(ifile)
+        entry = ReadSourceCache(cache_file)
+        if entry and entry['size'] == st.st_size and entry['mtime'] == st.st_mtime_ns:
+            logging.info("Using cached results for %s", ifile)
+            return DecodeSourceCalls(entry['calls'])
+        content_hash = common.GetFileHash(ifile)
+        if entry and entry['hash'] == content_hash:
+            # only the timestamp changed, e.g. the file has been touched
+            logging.info("Using cached results for %s", ifile)
+            entry.update(size=st.st_size, mtime=st.st_mtime_ns)
+            WriteSourceCache(cache_file, entry)
+            return DecodeSourceCalls(entry['calls'])
+
+    SourceCalls = []
+    ScanSourceFile(*args)
+    calls = SourceCalls
+    SourceCalls = None
+
+    if cache_file:
+        WriteSourceCache(cache_file, {'size': st.st_size, 'mtime': st.st_mtime_ns,
+                                      'hash': content_hash, 'calls': EncodeSourceCalls(calls)})
+    return calls
+
+
+def GetSourceCacheFile(ifile, ignore_files):
+    h = hashlib.sha256()
+    for part in (str(SOURCE_CACHE_VERSION), config.version, str(INLINE_MARKUP_MODE), os.path.realpath(ifile),
+                 ignore_files):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return os.path.join(SOURCE_CACHE_DIR, h.hexdigest() + '.json')
+
+
+def ReadSourceCache(cache_file):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f, object_pairs_hook=OrderedDict)
+    except (IOError, ValueError):
+        return None
+
+
+def WriteSourceCache(cache_file, entry):
+    # write to a temp file first as parallel processes might use the cache too
+    tmp_file = '%s.%d' % (cache_file, os.getpid())
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_file, cache_file)
+    except IOError as e:
+        logging.info('Cannot write source cache: %s', e)
+
+
+def EncodeSourceCalls(calls):
+    return [[SOURCE_CALL_NAMES[func], args] for (func, args) in calls]
+
+
+def DecodeSourceCalls(calls):
+    return [(SOURCE_CALL_FUNCS[name], args) for (name, args) in calls]
+
+
+def SourceCall(func, *args):
+    """Call a function that changes the global state or logs a warning.
+
+    When running in a worker process, the call is recorded instead and the main
+    process makes it later on (see ReadSourceDocumentation()).
+
+    Args:
+        func (function): a module level function
+        args: the arguments for the function
+    """
+    if SourceCalls is None:
+        func(*args)
+    else:
+        SourceCalls.append((func, args))
 
 
 def ScanSourceFile(ifile, ignore_files):
@@ -3790,7 +4319,7 @@ def ScanSourceFile(ifile, ignore_files):
     if m:
         basename = m.group(1)
     else:
-        common.LogWarning(ifile, 1, "Can't find basename for this filename.")
+        SourceCall(common.LogWarning, ifile, 1, "Can't find basename for this filename.")
         basename = ifile
 
     # Check if the basename is in the list of files to ignore.
@@ -3801,10 +4330,8 @@ def ScanSourceFile(ifile, ignore_files):
     logging.info("Scanning %s", ifile)
 
     with open(ifile, 'r', encoding='utf-8') as src:
-        input_lines = src.readlines()
-
-    for c in ScanSourceContent(input_lines, ifile):
-        ParseCommentBlock(c[0], c[1], ifile)
+        for c in ScanSourceContent(src, ifile):
+            ParseCommentBlock(c[0], c[1], ifile)
 
     logging.info("Scanning %s done", ifile)
 
@@ -3817,14 +4344,17 @@ def ScanSourceContent(input_lines, ifile=''):
 
     Might read from global state in DeclarationTypes
 
+    The lines are processed as a stream, only the current comment block is kept
+    in memory.
+
     Args:
-        input_lines (list): list of source code lines
+        input_lines (iterable): the source code lines, e.g. an open file
         ifile (str): file name of the source file (for reporting)
 
-    Returns:
-        list: tuples with comment block and its starting line
+    Yields:
+        tuple: the comment block and its starting line
     """
-    comments = []
+    trace = common.IsTracing('source')
     in_comment_block = False
     line_number = 0
     comment = []
@@ -3833,34 +4363,37 @@ def ScanSourceContent(input_lines, ifile=''):
         line_number += 1
 
         if not in_comment_block:
+            # Most lines are code, skip them before running any regexp.
+            if '/**' not in line:
+                continue
             # Look for the start of a comment block.
-            if re.search(r'^\s*/\*.*\*/', line):
+            if ONE_LINE_COMMENT_MATCHER.search(line):
                 # one-line comment - not gtkdoc
                 pass
-            elif re.search(r'^\s*/\*\*\s', line):
-                logging.info("Found comment block start")
+            elif COMMENT_START_MATCHER.search(line):
+                if trace:
+                    logging.info("Found comment block start")
 
                 in_comment_block = True
                 comment = []
                 starting_line = line_number + 1
         else:
             # Look for end of comment
-            if re.search(r'^\s*\*+/', line):
-                comments.append((comment, starting_line))
+            if COMMENT_END_MATCHER.search(line):
+                yield (comment, starting_line)
                 in_comment_block = False
                 continue
 
             # Get rid of ' * ' at start of every line in the comment block.
-            line = re.sub(r'^\s*\*\s?', '', line)
+            line = COMMENT_PREFIX_MATCHER.sub('', line)
             # But make sure we don't get rid of the newline at the end.
             if not line.endswith('\n'):
                 line += "\n"
 
-            logging.info("scanning :%s", line.strip())
+            if trace:
+                logging.info("scanning :%s", line.strip())
             comment.append(line)
 
-    return comments
-
 
 def SegmentCommentBlock(lines, line_number=0, ifile=''):
     """Cut a single comment block into segments.
@@ -3873,6 +4406,7 @@ def SegmentCommentBlock(lines, line_number=0, ifile=''):
     Returns:
         (str, dict): symbol name and dict of comment segments
     """
+    trace = common.IsTracing('source')
     symbol = None
     in_part = ''
     segments = {'body': ''}
@@ -3882,7 +4416,8 @@ def SegmentCommentBlock(lines, line_number=0, ifile=''):
     line_number -= 1
     for line in lines:
         line_number += 1
-        logging.info("scanning[%s] :%s", in_part, line.strip())
+        if trace:
+            logging.info("scanning[%s] :%s", in_part, line.strip())
 
         # If we haven't found the symbol name yet, look for it.
         # We need to allow for the following cases:
@@ -3899,15 +4434,18 @@ def SegmentCommentBlock(lines, line_number=0, ifile=''):
             m2 = re.search(r'^\s*([\w:.|-]*\w)\s*:?\s*(\(.+?\)\s*)*$', line)
             if m1:
                 symbol = m1.group(1)
-                logging.info("docs found in source for : '%s'", symbol)
+                if trace:
+                    logging.info("docs found in source for : '%s'", symbol)
             elif m2:
                 symbol = m2.group(1)
-                logging.info("docs found in source for : '%s'", symbol)
+                if trace:
+                    logging.info("docs found in source for : '%s'", symbol)
                 if m2.group(2):
                     annotation = m2.group(2).strip()
                     if annotation != '':
-                        SymbolAnnotations[symbol] = annotation
-                        logging.info("remaining text for %s: '%s'", symbol, annotation)
+                        SourceCall(SetSymbolAnnotation, symbol, annotation)
+                        if trace:
+                            logging.info("remaining text for %s: '%s'", symbol, annotation)
 
             continue
 
@@ -3961,54 +4499,65 @@ def SegmentCommentBlock(lines, line_number=0, ifile=''):
             if re.search(r'^\.\.\.$', param_name):
                 param_name = "..."
 
-            logging.info("Found param for symbol %s : '%s'= '%s'", symbol, param_name, line)
+            if trace:
+                logging.info("Found param for symbol %s : '%s'= '%s'", symbol, param_name, line)
             params[param_name] = param_desc
             in_part = "param"
             continue
         elif in_part == '':
-            logging.info("continuation for %s annotation '%s'", symbol, line)
+            if trace:
+                logging.info("continuation for %s annotation '%s'", symbol, line)
             annotation = re.sub(r'^\s+|\s+$', '', line)
-            if symbol in SymbolAnnotations:
-                SymbolAnnotations[symbol] += annotation
-            else:
-                SymbolAnnotations[symbol] = annotation
+            SourceCall(AppendSymbolAnnotation, symbol, annotation)
             continue
 
         # We must be in the middle of a parameter description, so add it on
         # to the last element in @params.
         if not param_name:
-            common.LogWarning(ifile, line_number,
-                              "Parsing comment block file : parameter expected, but got '%s'" % line)
+            SourceCall(common.LogWarning, ifile, line_number,
+                       "Parsing comment block file : parameter expected, but got '%s'" % line)
         else:
             if not param_indent:
                 # determine indentation of first continuation line
                 spc = len(line) - len(line.lstrip(' '))
                 if spc > 0:
                     param_indent = spc
-                    logging.debug("Found param-indentation of %d", param_indent)
+                    if trace:
+                        logging.debug("Found param-indentation of %d", param_indent)
             if param_indent:
                 # cut common indentation (after double checking that it is all spaces)
                 if line[:param_indent].strip() == '':
                     line = line[param_indent:]
                 else:
-                    logging.warning("Not cutting param-indentation for %s: '%s'",
-                                    param_name, line[:param_indent])
+                    SourceCall(logging.warning, "Not cutting param-indentation for %s: '%s'",
+                               param_name, line[:param_indent])
 
             params[param_name] += line
 
     return (symbol, segments, params)
 
 
-def ParseCommentBlockSegments(symbol, segments, params, line_number=0, ifile=''):
-    """Parse the comemnts block segments.
+def SetSymbolAnnotation(symbol, annotation):
+    SymbolAnnotations[symbol] = annotation
+
+
+def AppendSymbolAnnotation(symbol, annotation):
+    if symbol in SymbolAnnotations:
+        SymbolAnnotations[symbol] += annotation
+    else:
+        SymbolAnnotations[symbol] = annotation
+
+
+def ConvertCommentBlockSegments(symbol, segments, params):
+    """Convert the special characters in the body and the params of a comment block.
+
+    This only depends on the text, so it is done in the worker processes, see
+    ReadSourceDocumentation().
 
     Args:
         symbol (str): the symbol name
         segments(dict): the comment block segments (except params)
         parans (dict): the comment block params
-        line_number (int): the first line of the block (for reporting)
-        ifile (str): file name of the source file (for reporting)
-
     """
     # Add the return value description to the end of the params.
     if "return" in segments:
@@ -4021,6 +4570,20 @@ def ParseCommentBlockSegments(symbol, segments, params, line_number=0, ifile='')
     for (param_name, param_desc) in params.items():
         params[param_name] = ConvertXMLChars(symbol, param_desc)
 
+
+def ParseCommentBlockSegments(symbol, segments, params, line_number=0, ifile=''):
+    """Parse the comemnts block segments.
+
+    Args:
+        symbol (str): the symbol name
+        segments(dict): the comment block segments (except params), the body
+                        converted by ConvertCommentBlockSegments()
+        parans (dict): the comment block params, converted by
+                       ConvertCommentBlockSegments()
+        line_number (int): the first line of the block (for reporting)
+        ifile (str): file name of the source file (for reporting)
+
+    """
     # Handle Section docs
     m = re.search(r'SECTION:\s*(.*)', symbol)
     m2 = re.search(r'PROGRAM:\s*(.*)', symbol)
@@ -4124,10 +4687,23 @@ def ParseCommentBlock(lines, line_number=0, ifile=''):
     (symbol, segments, params) = SegmentCommentBlock(lines, line_number, ifile)
     if not symbol:
         # maybe its not even meant to be a gtk-doc comment?
-        common.LogWarning(ifile, line_number, "Symbol name not found at the start of the comment block.")
+        SourceCall(common.LogWarning, ifile, line_number, "Symbol name not found at the start of the comment block.")
         return
 
-    ParseCommentBlockSegments(symbol, segments, params, line_number, ifile)
+    ConvertCommentBlockSegments(symbol, segments, params)
+    SourceCall(ParseCommentBlockSegments, symbol, segments, params, line_number, ifile)
+
+
+# The functions that are passed to SourceCall(), by name for the source cache
+SOURCE_CALL_FUNCS = {
+    'LogWarning': common.LogWarning,
+    'warning': logging.warning,
+    'SetSymbolAnnotation': SetSymbolAnnotation,
+    'AppendSymbolAnnotation': AppendSymbolAnnotation,
+    'ParseCommentBlockSegments': ParseCommentBlockSegments,
+    'LogMissingEndTag': LogMissingEndTag,
+}
+SOURCE_CALL_NAMES = {func: name for (name, func) in SOURCE_CALL_FUNCS.items()}
 
 
 def OutputMissingDocumentation():
@@ -4408,6 +4984,7 @@ def ReadDeclarationsFile(ifile, override):
         DeclarationConditional.clear()
         DeclarationOutput.clear()
 
+    trace = common.IsTracing('decl')
     INPUT = open(ifile, 'r', encoding='utf-8')
     declaration_type = ''
     declaration_name = None
@@ -4422,7 +4999,8 @@ def ReadDeclarationsFile(ifile, override):
             if m1:
                 declaration_type = m1.group(1)
                 declaration_name = ''
-                logging.info("Found declaration: %s", declaration_type)
+                if trace:
+                    logging.info("Found declaration: %s", declaration_type)
                 declaration = ''
         else:
             m2 = re.search(r'^<NAME>(.*)</NAME>', line)
@@ -4433,7 +5011,8 @@ def ReadDeclarationsFile(ifile, override):
             elif m3:
                 is_deprecated = True
             elif m4:
-                logging.info("Found end of declaration: %s, %s", declaration_type, declaration_name)
+                if trace:
+                    logging.info("Found end of declaration: %s, %s", declaration_type, declaration_name)
                 # Check that the declaration has a name
                 if declaration_name == '':
                     common.LogWarning(ifile, line_number, declaration_type + " has no name.\n")
@@ -4442,7 +5021,8 @@ def ReadDeclarationsFile(ifile, override):
                 # set the flag to indicate the struct has a typedef.
                 if (declaration_type == 'STRUCT' or declaration_type == 'UNION') \
                         and re.search(r'^\s*$', declaration):
-                    logging.info("Struct has typedef: %s", declaration_name)
+                    if trace:
+                        logging.info("Struct has typedef: %s", declaration_name)
                     StructHasTypedef[declaration_name] = 1
 
                 # Check if the symbol is already defined.
@@ -4486,7 +5066,9 @@ def ReadDeclarationsFile(ifile, override):
 
                     Declarations[declaration_name] = declaration
                     DeclarationTypes[declaration_name] = declaration_type
-                    logging.debug("added declaration: %s, %s, [%s]", declaration_type, declaration_name, declaration)
+                    if trace:
+                        logging.debug("added declaration: %s, %s, [%s]",
+                                      declaration_type, declaration_name, declaration)
 
                 declaration_type = ''
                 is_deprecated = False
@@ -4498,9 +5080,9 @@ def ReadDeclarationsFile(ifile, override):
 def ReadSignalsFile(ifile):
     """Reads information about object signals.
 
-    It creates the arrays @SignalNames and @SignalPrototypes containing details
-    about the signals. The first line of the SignalPrototype is the return type
-    of the signal handler. The remaining lines are the parameters passed to it.
+    It fills the Signals hash with details about the signals. The first line of
+    the prototype is the return type of the signal handler. The remaining lines
+    are the parameters passed to it.
     The last parameter, "gpointer user_data" is always the same so is not included.
 
     Args:
@@ -4514,11 +5096,7 @@ def ReadSignalsFile(ifile):
     signal_prototype = None
 
     # Reset the signal info.
-    SignalObjects[:] = []
-    SignalNames[:] = []
-    SignalReturns[:] = []
-    SignalFlags[:] = []
-    SignalPrototypes[:] = []
+    Signals.clear()
 
     if not os.path.isfile(ifile):
         return
@@ -4556,11 +5134,8 @@ def ReadSignalsFile(ifile):
             elif re.search(r'^</SIGNAL>', line):
                 logging.info("Found end of signal: %s::%s\nReturns: %s\n%s",
                              signal_object, signal_name, signal_returns, signal_prototype)
-                SignalObjects.append(signal_object)
-                SignalNames.append(signal_name)
-                SignalReturns.append(signal_returns)
-                SignalFlags.append(signal_flags)
-                SignalPrototypes.append(signal_prototype)
+                Signals.setdefault(signal_object, []).append(
+                    Signal(signal_name, signal_returns, signal_flags, signal_prototype))
                 in_signal = False
             else:
                 signal_prototype += line
@@ -4575,6 +5150,8 @@ def ReadObjectHierarchy(ifile):
     It places them in the Objects array, and places their level
     in the object hierarchy in the ObjectLevels array, at the
     same index. GObject, the root object, has a level of 1.
+    The parent and the children of each entry are stored in the
+    ObjectParents and ObjectChildren arrays, at the same index.
 
     Args:
         ifile (str): the input filename.
@@ -4586,6 +5163,9 @@ def ReadObjectHierarchy(ifile):
 
     Objects[:] = []
     ObjectLevels[:] = []
+    ObjectParents[:] = []
+    ObjectChildren[:] = []
+    ObjectIndices.clear()
 
     INPUT = open(ifile, 'r', encoding='utf-8')
 
@@ -4595,6 +5175,10 @@ def ReadObjectHierarchy(ifile):
     # child turns up.
     pending_objects = []
     pending_levels = []
+    # The indices of the objects which have been emitted and are ancestors of
+    # the next one.
+    parent_indices = []
+    parent_levels = []
     root = None
     tree = []
     for line in INPUT:
@@ -4622,9 +5206,21 @@ def ReadObjectHierarchy(ifile):
                 xref = MakeXRef(gobject)
 
                 tree.append(' ' * (level * 4) + xref)
+                index = len(Objects)
                 Objects.append(gobject)
                 ObjectLevels.append(level)
                 ObjectRoots[gobject] = root
+                ObjectIndices.setdefault(gobject, index)
+
+                while parent_levels and parent_levels[-1] >= level:
+                    parent_indices.pop()
+                    parent_levels.pop()
+                ObjectParents.append(parent_indices[-1] if parent_indices else None)
+                ObjectChildren.append([])
+                if parent_levels and parent_levels[-1] == level - 1:
+                    ObjectChildren[parent_indices[-1]].append(index)
+                parent_indices.append(index)
+                parent_levels.append(level)
         # else
         #    common.LogWarning(ifile, line_number, "unknown type %s" % object)
         #
@@ -4642,6 +5238,7 @@ def ReadInterfaces(ifile):
     """
 
     Interfaces.clear()
+    Implementations.clear()
 
     if not os.path.isfile(ifile):
         return
@@ -4667,6 +5264,10 @@ def ReadInterfaces(ifile):
 
     INPUT.close()
 
+    for gobject in sorted(Interfaces):
+        for iface in set(Interfaces[gobject].split()):
+            Implementations.setdefault(iface, []).append(gobject)
+
 
 def ReadPrerequisites(ifile):
     """This reads in the $MODULE.prerequisites file.
@@ -4675,6 +5276,7 @@ def ReadPrerequisites(ifile):
         ifile (str): the input filename.
     """
     Prerequisites.clear()
+    DerivedInterfaces.clear()
 
     if not os.path.isfile(ifile):
         return
@@ -4697,12 +5299,15 @@ def ReadPrerequisites(ifile):
 
     INPUT.close()
 
+    for iface in sorted(Prerequisites):
+        for prereq in set(Prerequisites[iface].split()):
+            DerivedInterfaces.setdefault(prereq, []).append(iface)
+
 
 def ReadArgsFile(ifile):
     """Reads information about object properties
 
-    It creates the arrays ArgObjects, ArgNames, ArgTypes, ArgFlags, ArgNicks and
-    ArgBlurbs containing info on the args.
+    It fills the Args hash with info on the args.
 
     Args:
         ifile (str): the input filename.
@@ -4718,14 +5323,7 @@ def ReadArgsFile(ifile):
     arg_range = None
 
     # Reset the args info.
-    ArgObjects[:] = []
-    ArgNames[:] = []
-    ArgTypes[:] = []
-    ArgFlags[:] = []
-    ArgNicks[:] = []
-    ArgBlurbs[:] = []
-    ArgDefaults[:] = []
-    ArgRanges[:] = []
+    Args.clear()
 
     if not os.path.isfile(ifile):
         return
@@ -4783,14 +5381,8 @@ def ReadArgsFile(ifile):
                 arg_default = m7.group(1)
             elif re.search(r'^</ARG>', line):
                 logging.info("Found end of arg: %s::%s\n%s : %s", arg_object, arg_name, arg_type, arg_flags)
-                ArgObjects.append(arg_object)
-                ArgNames.append(arg_name)
-                ArgTypes.append(arg_type)
-                ArgRanges.append(arg_range)
-                ArgFlags.append(arg_flags)
-                ArgNicks.append(arg_nick)
-                ArgBlurbs.append(arg_blurb)
-                ArgDefaults.append(arg_default)
+                Args.setdefault(arg_object, []).append(
+                    Arg(arg_name, arg_type, arg_flags, arg_nick, arg_blurb, arg_default, arg_range))
                 in_arg = False
 
     INPUT.close()
@@ -4798,8 +5390,7 @@ def ReadArgsFile(ifile):
 def ReadActionsFile(ifile):
     """Reads information about object actions
 
-    It creates the arrays ActionObjects, ActionNames, ActionParams
-    and ActionProperties containing info on the actions.
+    It fills the Actions hash with info on the actions.
 
     Args:
         ifile (str): the input filename.
@@ -4811,10 +5402,7 @@ def ReadActionsFile(ifile):
     action_prop = None
 
     # Reset the args info.
-    ActionObjects[:] = []
-    ActionNames[:] = []
-    ActionParams[:] = []
-    ActionProperties[:] = []
+    Actions.clear()
 
     if not os.path.isfile(ifile):
         return
@@ -4851,10 +5439,8 @@ def ReadActionsFile(ifile):
                 action_prop = m3.group(1)
             elif re.search(r'^</ACTION>', line):
                 logging.info("Found end of action: %s::%s", action_object, action_name)
-                ActionObjects.append(action_object)
-                ActionNames.append(action_name)
-                ActionParams.append(action_param)
-                ActionProperties.append(action_prop)
+                Actions.setdefault(action_object, []).append(
+                    Action(action_name, action_param, action_prop))
                 in_action = False
 
     INPUT.close()
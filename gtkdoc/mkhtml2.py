@@ -58,10 +58,6 @@ TODO:
 - performance
   - consider some perf-warnings flag
     - see 'No "id" attribute on'
-  - xinclude processing in libxml2 is slow
-    - if we disable it, we get '{http://www.w3.org/2003/XInclude}include' tags
-      and we could try handling them ourself, in some cases those are subtrees
-      that we extract for chunking anyway
 
 DIFFERENCES:
 - titles
@@ -96,12 +92,14 @@ cd tests/bugs/docs/;
 rm html-build.stamp; time make html-build.stamp
 """
 
+import hashlib
+import json
 import logging
+import multiprocessing
 import os
 import shutil
 import sys
 
-from copy import deepcopy
 from glob import glob
 from lxml import etree
 from timeit import default_timer as timer
@@ -156,11 +154,14 @@ TITLE_XPATHS = {
     ),
 }
 
-ID_XPATH = etree.XPath('//*[@id]')
+ID_XPATH = etree.XPath('descendant-or-self::*[@id]')
 
-GLOSSENTRY_XPATH = etree.XPath('//glossentry')
+GLOSSENTRY_XPATH = etree.XPath('.//glossentry')
 glossary = {}
 
+FOOTNOTE_XPATH = etree.XPath('.//footnote')
+LINKEND_XPATH = etree.XPath('.//*[@linkend]')
+ACRONYM_XPATH = etree.XPath('.//acronym')
 footnote_idx = 1
 
 # nested dict with subkeys:
@@ -172,6 +173,14 @@ titles = {}
 # files to copy
 assets = set()
 
+XINCLUDE_TAG = '{http://www.w3.org/2003/XInclude}include'
+XINCLUDE_FALLBACK_TAG = '{http://www.w3.org/2003/XInclude}fallback'
+# attribute that links a xi:include element to an included chunk in fragments
+FRAGMENT_ATTR = '{http://www.gtk.org/gtk-doc}fragment'
+
+# included chunks that are attached to the chunk tree by chunk()
+fragments = {}
+
 
 def encode_entities(text):
     return text.replace('&', '&amp;').replace('<', '&lt;').replace('>', '&gt;')
@@ -321,11 +330,10 @@ def chunk(xml_node, module, depth=0, idx=0, parent=None):
         # segments
         if idx >= chunk_params.min_idx:
             logging.info('chunk tag: "%s"[%d]', tag, idx)
-            if parent:
-                # remove the xml-node from the parent
-                sub_tree = etree.ElementTree(deepcopy(xml_node)).getroot()
+            if parent and xml_node.getparent() is not None:
+                # detach the xml-node from the parent, queries on the chunk
+                # must therefore not use absolute paths
                 xml_node.getparent().remove(xml_node)
-                xml_node = sub_tree
 
             parent = Node(tag, parent=parent, xml=xml_node, depth=depth,
                           idx=idx,
@@ -340,6 +348,8 @@ def chunk(xml_node, module, depth=0, idx=0, parent=None):
         depth += 1
         idx = 0
         for child in xml_node:
+            if child.tag == XINCLUDE_TAG:
+                child = attach_fragment(child, idx)
             chunk(child, module, depth, idx, parent)
             if child.tag in CHUNK_PARAMS:
                 idx += 1
@@ -347,6 +357,22 @@ def chunk(xml_node, module, depth=0, idx=0, parent=None):
     return parent
 
 
+def attach_fragment(xml_node, idx):
+    """Get the included chunk for a xi:include element that xinclude() kept.
+
+    If the chunk gets its own file we return the root of the included document
+    as is. Otherwise the chunk is put in place of
+    the xi:include element.
+    """
+    fragment = fragments.pop(xml_node.attrib[FRAGMENT_ATTR])
+    if idx >= CHUNK_PARAMS[fragment.tag].min_idx:
+        xml_node.getparent().remove(xml_node)
+    else:
+        fragment.tail = xml_node.tail
+        xml_node.getparent().replace(xml_node, fragment)
+    return fragment
+
+
 def add_id_links_and_titles(files, links):
     for node in files:
         chunk_name = node.filename[:-5]
@@ -391,6 +417,19 @@ def build_glossary(files):
                                 term.attrib['id'], ','.join(debug))
 
 
+def number_footnotes(files):
+    """Assign the first footnote number to each chunk.
+
+    Footnotes are numbered per document and not per page. Precomputing the
+    start index for each chunk makes the numbering independent of the order in
+    which the chunks are converted.
+    """
+    idx = 1
+    for node in files:
+        node.footnote_idx = idx
+        idx += len(FOOTNOTE_XPATH(node.xml))
+
+
 # conversion helpers
 
 
@@ -1674,6 +1713,9 @@ def convert_content(module, files, node, src_lang):
         logging.warning('Add chunk converter for "%s"', node.name)
         return []
 
+    global footnote_idx
+    footnote_idx = getattr(node, 'footnote_idx', footnote_idx)
+
     ctx = {
         'module': module,
         'files': files,
@@ -1700,6 +1742,128 @@ def convert(out_dir, module, files, node, src_lang):
             html.write(line)
 
 
+# arguments for convert_worker(), inherited by the forked worker processes
+worker_args = None
+
+
+def convert_worker(ix):
+    """Convert one chunk.
+
+    Returns:
+      tuple: the chunk index, the assets it references and the xref reports
+    """
+    (out_dir, module, files, src_lang) = worker_args
+    known_assets = assets.copy()
+    assets.clear()
+    fixxref.XRefReports = []
+    convert(out_dir, module, files, files[ix], src_lang)
+    reports = fixxref.XRefReports
+    fixxref.XRefReports = None
+    chunk_assets = sorted(assets)
+    assets.update(known_assets)
+    return (ix, chunk_assets, reports)
+
+
+def write_chunks(out_dir, module, files, indices, src_lang, jobs):
+    """Convert the selected docbook chunks to html files.
+
+    If jobs > 1 the chunks are converted by a pool of processes. The workers are
+    forked after the chunking and table extraction. This way they share the
+    chunk tree and the lookup tables (links, titles, glossary) with the main
+    process and we only send the index of the chunk to convert. The bad xref
+    reports are returned instead of being logged, so that the caller can replay
+    them with fixxref.ReplayXRefReports() in the order of the chunks.
+
+    Args:
+      out_dir: already created output dir
+      files: list of nodes in the tree in pre-order
+      indices: indexes into files of the chunks to convert
+      jobs: number of worker processes
+
+    Returns:
+      tuple: dicts with the list of assets and the list of xref reports for
+             each converted chunk index
+    """
+    global worker_args
+
+    mp_ctx = None
+    if jobs > 1:
+        try:
+            mp_ctx = multiprocessing.get_context('fork')
+        except ValueError:
+            logging.warning('Parallel html conversion is not supported on this platform')
+
+    worker_args = (out_dir, module, files, src_lang)
+    chunk_assets = {}
+    chunk_reports = {}
+    if mp_ctx:
+        with mp_ctx.Pool(jobs) as p:
+            for (ix, a, reports) in p.imap(convert_worker, indices):
+                chunk_assets[ix] = a
+                chunk_reports[ix] = reports
+    else:
+        for ix in indices:
+            (ix, a, reports) = convert_worker(ix)
+            chunk_assets[ix] = a
+            chunk_reports[ix] = reports
+    worker_args = None
+    return (chunk_assets, chunk_reports)
+
+
+def chunk_fingerprint(module, files, node, src_lang):
+    """Calculate a hash over everything that goes into the html of a chunk.
+
+    This covers the chunk's xml, the titles of its nav neighbours and toc
+    entries and the link targets and titles it references.
+    """
+    h = hashlib.sha256()
+
+    def add(*values):
+        for v in values:
+            h.update(str(v).encode('utf-8'))
+            h.update(b'\0')
+
+    add(config.version, module, src_lang, node.filename, node.title, node.root.title,
+        getattr(node, 'footnote_idx', 0))
+    n = node
+    while n is not None:
+        add(n.idx, n.depth)
+        n = n.parent
+    h.update(etree.tostring(node.xml, encoding='utf-8'))
+
+    for (key, n) in sorted(generate_nav_nodes(files, node).items()):
+        add(key, n.filename, n.raw_title)
+    # the book page contains the toc of the whole document
+    toc_root = node.root if node.parent is None else node
+    for n in PreOrderIter(toc_root):
+        add(n.filename, n.anchor, n.title, n.title_tag, n.subtitle, n.subtitle_tag)
+
+    for elem in LINKEND_XPATH(node.xml):
+        (tid, href) = fixxref.GetXRef(elem.attrib['linkend'])
+        add(tid, href)
+        title = titles.get(tid)
+        if title:
+            add(title['title'], title['tag'])
+            h.update(etree.tostring(title['xml'], encoding='utf-8'))
+    for elem in ACRONYM_XPATH(node.xml):
+        add(glossary.get(elem.text, ''))
+
+    return h.hexdigest()
+
+
+def read_fingerprints(cache_file):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_fingerprints(cache_file, fingerprints):
+    with open(cache_file, 'w', encoding='utf-8') as f:
+        json.dump(fingerprints, f, indent=1, sort_keys=True)
+
+
 def create_devhelp2_toc(node):
     result = []
     for c in node.children:
@@ -1767,7 +1931,7 @@ def create_devhelp2_content(module, xml, files):
   <functions>
 """)
     # keywords from all refsect2 and refsect3
-    refsect2 = etree.XPath('//refsect2[@role]')
+    refsect2 = etree.XPath('.//refsect2[@role]')
     refsect3_enum = etree.XPath('refsect3[@role="enum_members"]/informaltable/tgroup/tbody/row[@role="constant"]')
     refsect3_enum_details = etree.XPath('entry[@role="enum_member_name"]/para')
     refsect3_struct = etree.XPath('refsect3[@role="struct_members"]/informaltable/tgroup/tbody/row[@role="member"]')
@@ -1816,7 +1980,110 @@ class FakeDTDResolver(etree.Resolver):
         return self.resolve_string('', context)
 
 
-def main(module, index_file, out_dir, uninstalled, src_lang, paths):
+def replace_xinclude(xml_node, text, children):
+    """Replace the xi:include element with the given text and elements."""
+    parent = xml_node.getparent()
+    prev = xml_node.getprevious()
+    text = (text or '') + (xml_node.tail or '')
+    if children:
+        children[-1].tail = (children[-1].tail or '') + text
+        text = ''
+    if prev is not None:
+        prev.tail = (prev.tail or '') + text
+    else:
+        parent.text = (parent.text or '') + text
+    pos = parent.index(xml_node)
+    parent.remove(xml_node)
+    parent[pos:pos] = children
+
+
+def xinclude(xml_node, parser, base=None, chunkable=True):
+    """Resolve the xi:include elements below xml_node.
+
+    This replaces libxml2's xinclude processing. Included documents that are
+    chunks on their own are not put into the tree, but kept for chunk() so
+    that they don't need to be copied there.
+
+    Includes with features we don't support and includes of the document
+    that can't be loaded and have no fallback are left to libxml2's xinclude.
+    The latter fails on them as before. Like libxml2 we keep such includes in
+    included documents as they are.
+
+    Args:
+        xml_node (etree.Element): root element of the document
+        parser (etree.XMLParser): parser to use for included documents
+        base (str): path of the document, if it is not the one of xml_node
+        chunkable (bool): whether chunk() will see the xml_node
+
+    Returns:
+        list: the xi:include elements that need libxml2's xinclude
+    """
+    unsupported = []
+    for elem in list(xml_node.iter(XINCLUDE_TAG)):
+        # Skip includes in the fallback of another include. They are still
+        # there if the fallback is used, as it has been put in place then.
+        if next(elem.iterancestors(XINCLUDE_TAG), None) is not None:
+            continue
+
+        href = elem.attrib.get('href')
+        parse = elem.attrib.get('parse', 'xml')
+        if not href or 'xpointer' in elem.attrib or parse not in ('xml', 'text'):
+            unsupported.append(elem)
+            continue
+
+        path = os.path.join(os.path.dirname(base or elem.base or ''), href)
+        path = os.path.normpath(path)
+        root = text = None
+        try:
+            if parse == 'text':
+                with open(path, 'rt', encoding=elem.attrib.get('encoding', 'utf-8')) as f:
+                    text = f.read()
+            else:
+                root = etree.parse(path, parser).getroot()
+        except (IOError, etree.XMLSyntaxError) as e:
+            logging.info('Can\'t include "%s": %s', path, e)
+
+        if text is not None:
+            replace_xinclude(elem, text, [])
+        elif root is None:
+            fallback = elem.find(XINCLUDE_FALLBACK_TAG)
+            if fallback is None:
+                if base is None:
+                    unsupported.append(elem)
+            else:
+                replace_xinclude(elem, fallback.text, list(fallback))
+        else:
+            in_chunk = (chunkable and root.tag in CHUNK_PARAMS and
+                        all(e.tag in CHUNK_PARAMS for e in elem.iterancestors()))
+            if in_chunk:
+                # keep it as a document of its own
+                key = str(len(fragments))
+                fragments[key] = root
+                elem.attrib[FRAGMENT_ATTR] = key
+            else:
+                replace_xinclude(elem, None, [root])
+            unsupported.extend(xinclude(root, parser, path, in_chunk))
+
+    return unsupported
+
+
+def resolve_xincludes(xml_node, parser):
+    """Resolve the xi:include elements of the document, see xinclude().
+
+    Only the includes that xinclude() leaves are handed to libxml2, as the
+    tree still has the xi:include elements of the chunks in fragments.
+    """
+    fragments.clear()
+    libxml2_xinclude = etree.XInclude()
+    for elem in xinclude(xml_node, parser):
+        libxml2_xinclude(elem)
+
+
+def main(module, index_file, out_dir, uninstalled, src_lang, paths, jobs=1,
+         cache_dir=None, lazy_links=False):
+
+    if cache_dir:
+        highlight.set_cache_dir(os.path.join(cache_dir, 'highlight'))
 
     # == Loading phase ==
     # the next 3 steps could be done in parallel
@@ -1828,7 +2095,7 @@ def main(module, index_file, out_dir, uninstalled, src_lang, paths):
     tree = etree.parse(index_file, parser)
     logging.warning("1a: %7.3lf: load doc", timer() - _t)
     _t = timer()
-    tree.xinclude()
+    resolve_xincludes(tree.getroot(), parser)
     logging.warning("1b: %7.3lf: xinclude doc", timer() - _t)
 
     # 2) copy datafiles
@@ -1847,7 +2114,11 @@ def main(module, index_file, out_dir, uninstalled, src_lang, paths):
     # TODO: migrate options from fixxref
     # TODO: ideally explicitly specify the files we need, this will save us the
     # globbing and we'll load less files.
-    fixxref.LoadIndicies(out_dir, '/usr/share/gtk-doc/html', [])
+    index_cache = None
+    if cache_dir:
+        index_cache = os.path.join(cache_dir, 'xref-index.db')
+    fixxref.LoadIndicies(out_dir, '/usr/share/gtk-doc/html', [], index_cache,
+                         lazy_links)
     logging.warning("3: %7.3lf: load xrefs", timer() - _t)
 
     # == Processing phase ==
@@ -1867,6 +2138,8 @@ def main(module, index_file, out_dir, uninstalled, src_lang, paths):
     add_id_links_and_titles(files, fixxref.Links)
     # - build glossary dict
     build_glossary(files)
+    # - number footnotes
+    number_footnotes(files)
     logging.warning("5: %7.3lf: extract tables", timer() - _t)
 
     # == Output phase ==
@@ -1879,15 +2152,40 @@ def main(module, index_file, out_dir, uninstalled, src_lang, paths):
 
     # 7) iterate the tree and output files
     _t = timer()
-    # TODO: can be done in parallel, figure out why this is not faster
-    # from multiprocessing.pool import Pool
-    # with Pool(4) as p:
-    #     p.apply_async(convert, args=(out_dir, module, files))
-    # from multiprocessing.pool import ThreadPool
-    # with ThreadPool(4) as p:
-    #     p.apply_async(convert, args=(out_dir, module, files))
-    for node in files:
-        convert(out_dir, module, files, node, src_lang)
+    indices = range(len(files))
+    if cache_dir:
+        # only convert chunks whose inputs changed since the last run
+        cache_file = os.path.join(cache_dir, module + '-mkhtml2.cache')
+        old_fingerprints = read_fingerprints(cache_file)
+        fingerprints = {}
+        indices = []
+        for ix, node in enumerate(files):
+            fingerprint = chunk_fingerprint(module, files, node, src_lang)
+            entry = old_fingerprints.get(node.filename)
+            if entry and entry['hash'] == fingerprint and 'reports' in entry and \
+                    os.path.exists(os.path.join(out_dir, node.filename)):
+                fingerprints[node.filename] = entry
+                assets.update(entry['assets'])
+            else:
+                fingerprints[node.filename] = {'hash': fingerprint}
+                indices.append(ix)
+        logging.info('Unchanged chunks: %d of %d', len(files) - len(indices), len(files))
+
+    (chunk_assets, chunk_reports) = write_chunks(out_dir, module, files, indices, src_lang, jobs)
+    for ix, a in chunk_assets.items():
+        assets.update(a)
+        if cache_dir:
+            fingerprints[files[ix].filename]['assets'] = a
+            fingerprints[files[ix].filename]['reports'] = chunk_reports[ix]
+    # report the bad xrefs of converted and skipped chunks in chunk order
+    for ix, node in enumerate(files):
+        if ix in chunk_reports:
+            fixxref.ReplayXRefReports(chunk_reports[ix])
+        elif cache_dir:
+            fixxref.ReplayXRefReports(fingerprints[node.filename]['reports'])
+
+    if cache_dir:
+        write_fingerprints(cache_file, fingerprints)
     logging.warning("7: %7.3lf: create html", timer() - _t)
 
     # 8) copy assets over
@@ -1917,5 +2215,8 @@ def run(options):
         os.mkdir(output_dir)
 
     # TODO: pass options.extra_dir
+    if options.cache_dir and not os.path.isdir(options.cache_dir):
+        os.makedirs(options.cache_dir)
+
     sys.exit(main(module, document, output_dir, options.uninstalled, options.src_lang,
-                  options.path))
+                  options.path, options.jobs, options.cache_dir, options.lazy_links))
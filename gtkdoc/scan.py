@@ -33,12 +33,23 @@ This second list file is typically copied to '$MODULE-sections.txt' and
 organized into sections ready to output the XML pages.
 """
 
+import hashlib
+import json
 import logging
+import multiprocessing
 import os
 import re
 import shutil
+import sys
+import time
 
-from . import common
+from . import common, config
+
+# bump this when the format of the header cache changes
+HEADER_CACHE_VERSION = 2
+
+# directory for the header cache, if any
+HEADER_CACHE_DIR = None
 
 TYPE_MODIFIERS = ['const', 'signed', 'unsigned', 'long', 'short', 'struct', 'union', 'enum']
 VAR_TYPE_MODIFIER = '(?:' + '|'.join([t + r'\s+' for t in TYPE_MODIFIERS]) + ')*'
@@ -152,6 +163,58 @@ SUB_MATCHER = [
     re.compile(r'^(\S+)(Class|Iface|Interface)\b'),
 ]
 
+# Other matchers used by ScanHeaderContent(), by name
+MATCHER = {
+    # comments
+    'private_header': re.compile(r'^\s*/\*\s*<\s*private_header\s*>\s*\*/'),
+    'comment_start': re.compile(r'^\s*/\*'),
+    'comment_end': re.compile(r'\*/'),
+    'comment_symbol': re.compile(r'\* ([a-zA-Z][a-zA-Z0-9_]+):'),
+    'comment': re.compile(r'/\*.*?\*/', re.MULTILINE),
+    # preprocessor
+    'if_defined': re.compile(r'^\s*#\s*if(?:n?def\b|\s+!?\s*defined\s*\()\s*(\w+)'),
+    'if': re.compile(r'^\s*#\sif'),
+    'endif': re.compile(r'^\s*#endif'),
+    'ifndef': re.compile(r'#ifndef\s+(\w*)'),
+    'cpp_directive': re.compile(r'^\s*#\s*(if*|define|endif)'),
+    'deprecated_guards': None,  # in InitScanner()
+    'ignore_deprecations': re.compile(r'^\s*G_GNUC_(BEGIN|END)_IGNORE_DEPRECATIONS'),
+    'macro_continued': re.compile(r'\\\s*$'),
+    # declarations
+    'var_decorator': re.compile(r'^\s*([A-Za-z_]+VAR)\b'),
+    'word_line': re.compile(r'^\s*\w+\s*$'),
+    'g_declare_args': re.compile(r'\s*(\w+)\s*,\s*(\w+)\s*,\s*(\w+)\s*,\s*(\w+)\s*,\s*(\w+)\s*\).*$'),
+    'function_end': None,  # in InitScanner()
+    'user_function_end': re.compile(r'\).*$'),
+    'void_args': re.compile(r'^(void|)$'),
+    'static_inline': re.compile(r'static\s+inline'),
+    'enum_end': None,  # in InitScanner()
+    'struct_end': None,  # in InitScanner()
+    'deprecated_end': re.compile(r'\n\s*\}.*_DEPRECATED.*;\s*$'),
+    'decorators': None,  # in InitScanner()
+    'struct_decorators': None,  # in InitScanner()
+    'braced_content': re.compile(r'{[^{]*?}'),
+    'open_brace': re.compile(r'(.*?){'),
+    # whitespace
+    'leading_space': re.compile(r'^\s+'),
+    'newline': re.compile(r'\s*\n'),
+    'inner_newlines': re.compile(r'\s*\n\s*(?!$)', re.MULTILINE),
+}
+
+# MatcherStats for all matchers, if enabled
+MATCHER_STATS = None
+
+# Matches the first token of a line: an identifier or a single character
+FIRST_TOKEN_MATCHER = re.compile(r'\s*(\w+|\S)')
+
+# Indices of the CLINE_MATCHER entries that can match a line, keyed by the
+# first token of the line, see InitScanner()
+CLINE_DISPATCH = {}
+# ... for lines starting with any other identifier
+CLINE_DISPATCH_WORD = ()
+# ... for lines starting with any other character
+CLINE_DISPATCH_OTHER = ()
+
 
 def Run(options):
     logging.info('options: %s', str(options.__dict__))
@@ -161,6 +224,13 @@ def Run(options):
     if not os.path.isdir(options.output_dir):
         os.mkdir(options.output_dir)
 
+    global HEADER_CACHE_DIR
+    HEADER_CACHE_DIR = None
+    if options.cache_dir:
+        HEADER_CACHE_DIR = os.path.join(options.cache_dir, 'scan')
+        if not os.path.isdir(HEADER_CACHE_DIR):
+            os.makedirs(HEADER_CACHE_DIR)
+
     base_filename = os.path.join(options.output_dir, options.module)
     old_decl_list = base_filename + '-decl-list.txt'
     new_decl_list = base_filename + '-decl-list.new'
@@ -181,12 +251,19 @@ def Run(options):
     # do not read files twice; checking it here permits to give both srcdir and
     # builddir as --source-dir without fear of duplicities
     seen_headers = {}
+    headers = []
 
     for file in options.headers:
-        ScanHeader(file, section_list, decl_list, get_types, seen_headers, options)
+        AddHeader(file, headers, seen_headers, options)
 
     for dir in options.source_dir:
-        ScanHeaders(dir, section_list, decl_list, get_types, seen_headers, options)
+        FindHeaders(dir, headers, seen_headers, options)
+
+    for result in ScanHeaderFiles(headers, options):
+        AddHeaderResult(result, section_list, decl_list, get_types)
+
+    if MATCHER_STATS is not None:
+        ReportMatcherStats(sys.stdout)
 
     with open(new_decl_list, 'w', encoding='utf-8') as f:
         for section in sorted(section_list.keys()):
@@ -230,8 +307,10 @@ def InitScanner(options):
     """Apply options to regexps.
     """
 
+    # remove the MatcherStats from a previous run
+    UninstallMatcherStats()
+
     # avoid generating regex with |'' (matching no string)
-    # TODO(ensonic): keep in sync with ScanHeaderContent()
     ignore_decorators = ''
     optional_decorators_regex = ''
     if options.ignore_decorators:
@@ -315,6 +394,27 @@ def InitScanner(options):
         ([A-Za-z]\w*)                                               # 3: symbols
         \s*$""" % (ignore_decorators, RET_TYPE_MODIFIER), re.VERBOSE)
 
+    # Dispatch the lines to the matchers that can apply to them. All matchers
+    # are anchored and only look at the start of the line, except for
+    # G_DECLARE_* (see ScanHeaderContent()).
+    global CLINE_DISPATCH_WORD, CLINE_DISPATCH_OTHER
+    # lines starting with any identifier (e.g. a return type)
+    CLINE_DISPATCH_WORD = (2, 4, 15, 16, 18, 19, 20)
+    # the ignored decorators are user supplied regexps that could match
+    # anything, only variables allow them without a word boundary
+    CLINE_DISPATCH_OTHER = (15,) if options.ignore_decorators else ()
+    CLINE_DISPATCH.clear()
+    CLINE_DISPATCH.update({
+        '#': (0,) + CLINE_DISPATCH_OTHER,
+        '(': (3, 20, 21) + CLINE_DISPATCH_OTHER,
+        '*': (3,) + CLINE_DISPATCH_OTHER,
+        'typedef': (1, 6, 7, 8, 11, 12, 13, 14) + CLINE_DISPATCH_WORD,
+        'G_GNUC_EXTENSION': (13,) + CLINE_DISPATCH_WORD,
+        'enum': (5,) + CLINE_DISPATCH_WORD,
+        'struct': (9, 10, 22, 23) + CLINE_DISPATCH_WORD,
+        'union': (9, 10, 24, 25) + CLINE_DISPATCH_WORD,
+    })
+
     # Matchers for 2nd previous line
     global PPLINE_MATCHER
     PPLINE_MATCHER = [
@@ -329,13 +429,105 @@ def InitScanner(options):
             )\s*$""" % ignore_decorators, re.VERBOSE)
         ]
 
+    MATCHER['deprecated_guards'] = re.compile(options.deprecated_guards)
+    # Note that sometimes functions end in ') G_GNUC_PRINTF (2, 3);' or
+    # ') __attribute__ (...);'.
+    MATCHER['function_end'] = re.compile(
+        r'\)\s*(G_GNUC_.*|.*DEPRECATED.*%s\s*|__attribute__\s*\(.*\)\s*)*;.*$' % ignore_decorators,
+        re.MULTILINE)
+    # Examples:
+    # "};"
+    # "} MyEnum;"
+    # "} MyEnum DEPRECATED_FOR(NewEnum);"
+    # "} DEPRECATED_FOR(NewEnum);"
+    MATCHER['enum_end'] = re.compile(r'\n\s*\}\s*(?:(\w+)?%s)?;\s*$' % optional_decorators_regex)
+    # Same regex as for enum
+    MATCHER['struct_end'] = re.compile(r'\n\}\s*(?:(\w+)?%s)?;\s*$' % optional_decorators_regex)
+    MATCHER['decorators'] = re.compile(optional_decorators_regex)
+    MATCHER['struct_decorators'] = re.compile(r'(?:\s+(?:G_GNUC_\w+(?:\(\w*\))?%s))' % ignore_decorators)
+
+    if options.matcher_stats:
+        InstallMatcherStats()
+
+
+class MatcherStats(object):
+    """Counts the uses of a compiled regexp and the time spent in it."""
+
+    def __init__(self, name, regex):
+        self.name = name
+        self.regex = regex
+        self.calls = 0
+        self.hits = 0
+        self.time = 0.0
+
+    def run(self, func, string, *args, **kwargs):
+        start = time.perf_counter()
+        result = func(string, *args, **kwargs)
+        self.time += time.perf_counter() - start
+        self.calls += 1
+        if result and result != string:
+            self.hits += 1
+        return result
+
+    def match(self, *args, **kwargs):
+        return self.run(self.regex.match, *args, **kwargs)
+
+    def search(self, *args, **kwargs):
+        return self.run(self.regex.search, *args, **kwargs)
+
+    def findall(self, *args, **kwargs):
+        return self.run(self.regex.findall, *args, **kwargs)
+
+    def sub(self, repl, string, *args, **kwargs):
+        return self.run(lambda s: self.regex.sub(repl, s, *args, **kwargs), string)
+
+
+def InstallMatcherStats():
+    """Wrap all matchers to collect statistics.
+
+    See ReportMatcherStats().
+    """
+    global MATCHER_STATS
+    MATCHER_STATS = []
+    for (list_name, matchers) in (('CLINE_MATCHER', CLINE_MATCHER), ('PLINE_MATCHER', PLINE_MATCHER),
+                                  ('PPLINE_MATCHER', PPLINE_MATCHER), ('SUB_MATCHER', SUB_MATCHER)):
+        for i in range(len(matchers)):
+            matchers[i] = MatcherStats('%s[%d]' % (list_name, i), matchers[i])
+            MATCHER_STATS.append(matchers[i])
+    for name in MATCHER:
+        MATCHER[name] = MatcherStats(name, MATCHER[name])
+        MATCHER_STATS.append(MATCHER[name])
+
+
+def UninstallMatcherStats():
+    global MATCHER_STATS
+    if MATCHER_STATS is None:
+        return
+    for matchers in (CLINE_MATCHER, PLINE_MATCHER, PPLINE_MATCHER, SUB_MATCHER):
+        for i in range(len(matchers)):
+            matchers[i] = matchers[i].regex
+    for name in MATCHER:
+        MATCHER[name] = MATCHER[name].regex
+    MATCHER_STATS = None
+
+
+def ReportMatcherStats(out):
+    """Print how often each matcher ran and matched and the time spent.
 
-def ScanHeaders(source_dir, section_list, decl_list, get_types, seen_headers, options):
+    Args:
+      out (file): the stream to print the report to
+    """
+    out.write('%-24s %10s %10s %10s\n' % ('matcher', 'calls', 'hits', 'time [ms]'))
+    for stats in sorted(MATCHER_STATS, key=lambda s: s.time, reverse=True):
+        out.write('%-24s %10d %10d %10.2f\n' % (stats.name, stats.calls, stats.hits, stats.time * 1000))
+
+
+def FindHeaders(source_dir, headers, seen_headers, options):
     """Scans a directory tree looking for header files.
 
     Args:
       source_dir (str): the directory to scan.
-      section_list (dict): map of section to filenames.
+      headers (list): the header files to scan
       seen_headers (set): set to avoid scanning headers twice
     """
 
@@ -351,28 +543,22 @@ def ScanHeaders(source_dir, section_list, decl_list, get_types, seen_headers, op
         if os.path.isdir(fullname):
             subdirs.append(file)
         elif file.endswith('.h'):
-            ScanHeader(fullname, section_list, decl_list, get_types,
-                       seen_headers, options)
+            AddHeader(fullname, headers, seen_headers, options)
 
     # Now recursively scan the subdirectories.
     for dir in subdirs:
         matchstr = r'(\s|^)' + re.escape(dir) + r'(\s|$)'
         if re.search(matchstr, options.ignore_headers):
             continue
-        ScanHeaders(os.path.join(source_dir, dir), section_list, decl_list,
-                    get_types, seen_headers, options)
+        FindHeaders(os.path.join(source_dir, dir), headers, seen_headers, options)
 
 
-def ScanHeader(input_file, section_list, decl_list, get_types, seen_headers, options):
-    """Scan a header file for doc commants.
-
-    Look for doc comments and extract them. Parse each doc comments and the
-    symbol declaration.
+def AddHeader(input_file, headers, seen_headers, options):
+    """Add a header file to the list of files to scan.
 
     Args:
       input_file (str): the header file to scan.
-      section_list (dict): a map of section per filename
-      decl_list (list): a list of declarations
+      headers (list): the header files to scan
       seen_headers (set): set to avoid scanning headers twice
     """
 
@@ -402,30 +588,185 @@ def ScanHeader(input_file, section_list, decl_list, get_types, seen_headers, opt
         logging.warning('File does not exist: %s', input_file)
         return
 
+    headers.append(input_file)
+
+
+def ScanHeaderFiles(headers, options):
+    """Scan the header files.
+
+    If options.jobs > 1 the files are scanned by a pool of processes, unless
+    the matcher statistics are enabled. The results are still returned in the
+    order of the headers.
+
+    Args:
+      headers (list): the header files to scan
+      options: the scanner options
+
+    Yields:
+      tuple: the results of ScanHeader() for each header
+    """
+    mp_ctx = None
+    # the matcher statistics are only collected in this process
+    if options.jobs > 1 and len(headers) > 1 and MATCHER_STATS is None:
+        try:
+            mp_ctx = multiprocessing.get_context('fork')
+        except ValueError:
+            logging.warning('Parallel scanning is not supported on this platform')
+
+    if mp_ctx:
+        with mp_ctx.Pool(options.jobs) as p:
+            yield from p.imap(ScanHeaderWorker, [(f, options) for f in headers])
+    else:
+        for input_file in headers:
+            yield ScanHeader(input_file, options)
+
+
+def ScanHeaderWorker(args):
+    return ScanHeader(*args)
+
+
+def ScanHeader(input_file, options):
+    """Scan a header file for doc commants.
+
+    Look for doc comments and extract them. Parse each doc comments and the
+    symbol declaration. If the header cache is enabled and the header has not
+    changed since the last run, the results are taken from the cache.
+
+    Args:
+      input_file (str): the header file to scan.
+
+    Returns:
+      tuple: the file name, the basename, the declarations, the get_type
+             functions, the section list and an error message (or None)
+    """
+    file_basename = os.path.split(input_file)[1][:-2]  # filename ends in .h
+
+    cache_file = None
+    entry = None
+    if HEADER_CACHE_DIR:
+        cache_file = GetHeaderCacheFile(input_file, options)
+        st = os.stat(input_file)
+        entry = ReadHeaderCache(cache_file)
+        if entry and entry['size'] == st.st_size and entry['mtime'] == st.st_mtime_ns:
+            logging.info('Using cached results for %s', input_file)
+            return (input_file, file_basename, entry['decls'], entry['get_types'],
+                    entry['liststr'], entry['error'])
+
+    if cache_file:
+        content_hash = common.GetFileHash(input_file)
+        if entry and entry['hash'] == content_hash:
+            # only the timestamp changed, e.g. the file has been touched
+            logging.info('Using cached results for %s', input_file)
+        else:
+            entry = ScanHeaderFile(input_file, options)
+        entry.update(size=st.st_size, mtime=st.st_mtime_ns, hash=content_hash)
+        WriteHeaderCache(cache_file, entry)
+    else:
+        entry = ScanHeaderFile(input_file, options)
+
+    return (input_file, file_basename, entry['decls'], entry['get_types'],
+            entry['liststr'], entry['error'])
+
+
+def ScanHeaderFile(input_file, options):
+    """Run the scanner on the content of a header file.
+
+    The file is read as a stream of lines.
+
+    Args:
+      input_file (str): the header file to scan.
+
+    Returns:
+      dict: the declarations, the get_type functions, the section list and an
+            error message (or None)
+    """
     logging.info('Scanning %s', input_file)
 
-    with open(input_file, 'r', encoding='utf-8') as hdr:
-        input_lines = hdr.readlines()
+    decl_list = []
+    get_types = []
+    liststr = ''
+    error = None
 
     try:
-        slist, doc_comments = ScanHeaderContent(input_lines, decl_list, get_types, options)
+        with open(input_file, 'r', encoding='utf-8') as hdr:
+            slist, doc_comments = ScanHeaderContent(hdr, decl_list, get_types, options)
         logging.info("Scanning %s done", input_file)
 
         liststr = SeparateSubSections(slist, doc_comments)
-        if liststr != '':
-            if file_basename not in section_list:
-                section_list[file_basename] = ''
-            section_list[file_basename] += "<SECTION>\n<FILE>%s</FILE>\n%s</SECTION>\n\n" % (file_basename, liststr)
-
     except RuntimeError as e:
-        common.LogWarning(input_file, 0, str(e))
+        error = str(e)
+
+    return {'decls': decl_list, 'get_types': get_types, 'liststr': liststr, 'error': error}
+
+
+def GetHeaderCacheFile(input_file, options):
+    """Get the name of the cache file for a header.
+
+    The name depends on the location of the header and all options that change
+    the results of the scanner.
+
+    Args:
+      input_file (str): the header file to scan.
+
+    Returns:
+      str: the path of the cache file
+    """
+    h = hashlib.sha256()
+    for part in (str(HEADER_CACHE_VERSION), config.version, os.path.realpath(input_file),
+                 options.module, options.ignore_decorators, options.deprecated_guards,
+                 str(options.rebuild_types)):
+        h.update(part.encode('utf-8'))
+        h.update(b'\0')
+    return os.path.join(HEADER_CACHE_DIR, h.hexdigest() + '.json')
+
+
+def ReadHeaderCache(cache_file):
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (IOError, ValueError):
+        return None
+
+
+def WriteHeaderCache(cache_file, entry):
+    # write to a temp file first as parallel processes might use the cache too
+    tmp_file = '%s.%d' % (cache_file, os.getpid())
+    try:
+        with open(tmp_file, 'w', encoding='utf-8') as f:
+            json.dump(entry, f)
+        os.replace(tmp_file, cache_file)
+    except IOError as e:
+        logging.info('Cannot write header cache: %s', e)
+
+
+def AddHeaderResult(result, section_list, decl_list, get_types):
+    """Add the results of ScanHeader() to the lists.
+
+    Args:
+      result (tuple): the results of ScanHeader()
+      section_list (dict): a map of section per filename
+      decl_list (list): a list of declarations
+      get_types (list): a list of get_type functions
+    """
+    (input_file, file_basename, decls, types, liststr, error) = result
+    decl_list.extend(decls)
+    get_types.extend(types)
+    if error:
+        common.LogWarning(input_file, 0, error)
+    elif liststr != '':
+        if file_basename not in section_list:
+            section_list[file_basename] = ''
+        section_list[file_basename] += "<SECTION>\n<FILE>%s</FILE>\n%s</SECTION>\n\n" % (file_basename, liststr)
 
 
 def ScanHeaderContent(input_lines, decl_list, get_types, options):
     """Scan the the given content lines.
 
+    The lines are processed as a stream, only the current declaration or
+    comment is kept in memory.
+
     Args:
-      input_lines (list):
+      input_lines (iterable): the lines, e.g. an open file
       decl_list (list): symbols declarations
       get_types (list): lst of symbols that have a get_type function
       options: commandline options
@@ -435,8 +776,8 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
             doc-comment
     """
 
-    # Holds the resulting list of declarations.
-    slist = []
+    # Holds the resulting list of declarations (a dict used as an ordered set).
+    slist = {}
     # Holds the title of the section
     title = None
     # True if we are in a comment.
@@ -478,28 +819,21 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
     deprecated = ''
     doc_comment = ''
 
-    # avoid generating regex with |'' (matching no string)
-    # TODO(ensonic): keep in sync with InitScanner()
-    # TODO(ensonic): extract the remaining regexps
-    ignore_decorators = ''          # 1 uses
-    optional_decorators_regex = ''  # 4 uses
-    if options.ignore_decorators:
-        ignore_decorators = '|' + options.ignore_decorators.replace('()', r'\(\w*\)')
-        optional_decorators_regex = r'(?:\s+(?:%s))?' % ignore_decorators[1:]
-
+    trace = common.IsTracing('header')
     for line in input_lines:
         # If this is a private header, skip it.
         # TODO: consider scanning this first, so that we don't modify: decl_list
         # and get_types
-        if re.search(r'^\s*/\*\s*<\s*private_header\s*>\s*\*/', line):
+        if MATCHER['private_header'].search(line):
             return [], {}
 
         # Skip to the end of the current comment.
         if in_comment:
-            logging.info('Comment: %s', line.strip())
+            if trace:
+                logging.info('Comment: %s', line.strip())
             doc_comment += line
-            if re.search(r'\*/', line):
-                m = re.search(r'\* ([a-zA-Z][a-zA-Z0-9_]+):', doc_comment)
+            if MATCHER['comment_end'].search(line):
+                m = MATCHER['comment_symbol'].search(doc_comment)
                 if m:
                     doc_comments[m.group(1).lower()] = 1
                 in_comment = 0
@@ -509,10 +843,10 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
         # Keep a count of #if, #ifdef, #ifndef nesting,
         # and if we enter a deprecation-symbol-bracketed
         # zone, take note.
-        m = re.search(r'^\s*#\s*if(?:n?def\b|\s+!?\s*defined\s*\()\s*(\w+)', line)
+        m = MATCHER['if_defined'].search(line)
         if m:
             define_name = m.group(1)
-            if deprecated_conditional_nest < 1 and re.search(options.deprecated_guards, define_name):
+            if deprecated_conditional_nest < 1 and MATCHER['deprecated_guards'].search(define_name):
                 deprecated_conditional_nest = 1
             elif deprecated_conditional_nest >= 1:
                 deprecated_conditional_nest += 1
@@ -521,12 +855,12 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
             elif ignore_conditional_nest > 0:
                 ignore_conditional_nest = 1
 
-        elif re.search(r'^\s*#\sif', line):
+        elif MATCHER['if'].search(line):
             if deprecated_conditional_nest >= 1:
                 deprecated_conditional_nest += 1
             if ignore_conditional_nest > 0:
                 ignore_conditional_nest += 1
-        elif re.search(r'^\s*#endif', line):
+        elif MATCHER['endif'].search(line):
             if deprecated_conditional_nest >= 1:
                 deprecated_conditional_nest -= 1
             if ignore_conditional_nest > 0:
@@ -537,10 +871,11 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
         # guard, unless it's a macro definition or the end of a deprecation
         # section (#endif /* XXX_DEPRECATED */
         if deprecated_conditional_nest == 0 and '_DEPRECATED' in line:
-            m = re.search(r'^\s*#\s*(if*|define|endif)', line)
+            m = MATCHER['cpp_directive'].search(line)
             if not (m or in_declaration == 'enum' or in_declaration == 'struct'):
-                logging.info('Found deprecation annotation (decl: "%s"): "%s"',
-                             in_declaration, line.strip())
+                if trace:
+                    logging.info('Found deprecation annotation (decl: "%s"): "%s"',
+                                 in_declaration, line.strip())
                 deprecated_conditional_nest += 0.1
 
         # set flag that is used later when we do AddSymbolToList
@@ -554,27 +889,42 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
 
         if not in_declaration:
             # Skip top-level comments.
-            m = re.search(r'^\s*/\*', line)
+            m = MATCHER['comment_start'].search(line)
             if m:
-                re.sub(r'^\s*/\*', '', line)
-                if re.search(r'\*/', line):
-                    logging.info('Found one-line comment: %s', line.strip())
+                if MATCHER['comment_end'].search(line):
+                    if trace:
+                        logging.info('Found one-line comment: %s', line.strip())
                 else:
                     in_comment = 1
                     doc_comment = line
-                    logging.info('Found start of comment: %s', line.strip())
+                    if trace:
+                        logging.info('Found start of comment: %s', line.strip())
                 continue
 
             # Skip begin/end deprecation macros.
-            m = re.search(r'^\s*G_GNUC_(BEGIN|END)_IGNORE_DEPRECATIONS', line)
+            m = MATCHER['ignore_deprecations'].search(line)
             if m:
                 continue
 
-            logging.info('no decl: %s', line.strip())
-
-            cm = [m.match(line) for m in CLINE_MATCHER]
-            pm = [m.match(previous_line) for m in PLINE_MATCHER]
-            ppm = [m.match(pre_previous_line) for m in PPLINE_MATCHER]
+            if trace:
+                logging.info('no decl: %s', line.strip())
+
+            # Only run the matchers that can apply to this line, the others
+            # are known to fail.
+            cm = [None] * len(CLINE_MATCHER)
+            tm = FIRST_TOKEN_MATCHER.match(line)
+            if tm:
+                token = tm.group(1)
+                if token in CLINE_DISPATCH:
+                    candidates = CLINE_DISPATCH[token]
+                elif token[0].isalnum() or token[0] == '_':
+                    candidates = CLINE_DISPATCH_WORD
+                else:
+                    candidates = CLINE_DISPATCH_OTHER
+                for i in candidates:
+                    cm[i] = CLINE_MATCHER[i].match(line)
+                if '_DECLARE_' in line:
+                    cm[17] = CLINE_MATCHER[17].match(line)
 
             # MACROS
 
@@ -587,15 +937,18 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
                 # standard #ifndef HEADER_FILE #define HEADER_FILE etc.
                 # And we only want TRUE & FALSE defined in GLib.
                 if not symbol.startswith('_') \
-                        and (not re.search(r'#ifndef\s+' + symbol, previous_line)
+                        and (not any(name.startswith(symbol)
+                                     for name in MATCHER['ifndef'].findall(previous_line))
                              or first_macro == 0) \
                         and ((symbol != 'TRUE' and symbol != 'FALSE')
                              or options.module == 'glib') \
                         or symbol == '_':
                     in_declaration = 'macro'
-                    logging.info('Macro: "%s"', symbol)
+                    if trace:
+                        logging.info('Macro: "%s"', symbol)
                 else:
-                    logging.info('skipping Macro: "%s"', symbol)
+                    if trace:
+                        logging.info('skipping Macro: "%s"', symbol)
                     in_declaration = 'macro'
                     internal = 1
                 first_macro = 0
@@ -606,23 +959,27 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
                 symbol = cm[1].group(4)
                 decl = line[cm[1].end():]
                 in_declaration = 'user_function'
-                logging.info('user function (1): "%s", Returns: "%s"', symbol, ret_type)
+                if trace:
+                    logging.info('user function (1): "%s", Returns: "%s"', symbol, ret_type)
 
-            elif pm[1] and cm[2]:
+            elif cm[2] and PLINE_MATCHER[1].match(previous_line):
                 ret_type = format_ret_type(cm[2].group(1), cm[2].group(2), cm[2].group(3))
                 symbol = cm[2].group(4)
                 decl = line[cm[2].end():]
                 in_declaration = 'user_function'
-                logging.info('user function (2): "%s", Returns: "%s"', symbol, ret_type)
+                if trace:
+                    logging.info('user function (2): "%s", Returns: "%s"', symbol, ret_type)
 
-            elif pm[1] and cm[3]:
+            elif cm[3] and PLINE_MATCHER[1].match(previous_line):
                 ret_type = cm[3].group(1)
                 symbol = cm[3].group(2)
                 decl = line[cm[3].end():]
-                if pm[0]:
-                    ret_type = format_ret_type(pm[0].group(1), pm[0].group(2), pm[0].group(3)) + ret_type
+                pm = PLINE_MATCHER[0].match(previous_line)
+                if pm:
+                    ret_type = format_ret_type(pm.group(1), pm.group(2), pm.group(3)) + ret_type
                     in_declaration = 'user_function'
-                    logging.info('user function (3): "%s", Returns: "%s"', symbol, ret_type)
+                    if trace:
+                        logging.info('user function (3): "%s", Returns: "%s"', symbol, ret_type)
 
             # FUNCTION POINTER VARIABLES
             elif cm[4]:
@@ -630,29 +987,32 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
                 symbol = cm[4].group(4)
                 decl = line[cm[4].end():]
                 in_declaration = 'user_function'
-                logging.info('function pointer variable: "%s", Returns: "%s"', symbol, ret_type)
+                if trace:
+                    logging.info('function pointer variable: "%s", Returns: "%s"', symbol, ret_type)
 
             # ENUMS
 
             elif cm[5]:
-                re.sub(r'^\s*enum\s+_?(\w+)\s+\{', r'enum \1 {', line)
                 # We assume that 'enum _<enum_name> {' is really the
                 # declaration of enum <enum_name>.
                 symbol = cm[5].group(1)
                 decl = line
                 in_declaration = 'enum'
-                logging.info('plain enum: "%s"', symbol)
+                if trace:
+                    logging.info('plain enum: "%s"', symbol)
 
             elif cm[6]:
                 # We skip 'typedef enum <enum_name> _<enum_name>;' as the enum will
                 # be declared elsewhere.
-                logging.info('skipping enum typedef: "%s"', line)
+                if trace:
+                    logging.info('skipping enum typedef: "%s"', line)
 
             elif cm[7]:
                 symbol = ''
                 decl = line
                 in_declaration = 'enum'
-                logging.info('typedef enum: -')
+                if trace:
+                    logging.info('typedef enum: -')
 
             # STRUCTS AND UNIONS
 
@@ -663,26 +1023,30 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
                 # will override this (technically if will just be another entry
                 # in the output file and will be joined when reading the file).
                 structsym = cm[8].group(1).upper()
-                logging.info('%s typedef: "%s"', structsym, cm[8].group(2))
+                if trace:
+                    logging.info('%s typedef: "%s"', structsym, cm[8].group(2))
                 forward_decls[cm[8].group(2)] = '<%s>\n<NAME>%s</NAME>\n%s</%s>\n' % (
                     structsym, cm[8].group(2), deprecated, structsym)
 
                 m = SUB_MATCHER[0].match(cm[8].group(2))
                 if m:
                     objectname = m.group(1)
-                    logging.info('Found object: "%s"', objectname)
+                    if trace:
+                        logging.info('Found object: "%s"', objectname)
                     title = '<TITLE>%s</TITLE>' % objectname
 
             elif cm[9]:
                 # Skip private structs/unions.
-                logging.info('private struct/union')
+                if trace:
+                    logging.info('private struct/union')
 
             elif cm[10]:
                 # Do a similar thing for normal structs as for typedefs above.
                 # But we output the declaration as well in this case, so we
                 # can differentiate it from a typedef.
                 structsym = cm[10].group(1).upper()
-                logging.info('%s:%s', structsym, cm[10].group(2))
+                if trace:
+                    logging.info('%s:%s', structsym, cm[10].group(2))
                 forward_decls[cm[10].group(2)] = '<%s>\n<NAME>%s</NAME>\n%s%s</%s>\n' % (
                     structsym, cm[10].group(2), line, deprecated, structsym)
 
@@ -691,32 +1055,37 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
                 decl = line
                 level = 0
                 in_declaration = cm[11].group(1)
-                logging.info('typedef struct/union "%s"', in_declaration)
+                if trace:
+                    logging.info('typedef struct/union "%s"', in_declaration)
 
             # OTHER TYPEDEFS
 
             elif cm[12]:
-                logging.info('Found struct/union(*) typedef "%s": "%s"', cm[12].group(1), line)
+                if trace:
+                    logging.info('Found struct/union(*) typedef "%s": "%s"', cm[12].group(1), line)
                 if AddSymbolToList(slist, cm[12].group(1)):
                     decl_list.append('<TYPEDEF>\n<NAME>%s</NAME>\n%s%s</TYPEDEF>\n' %
                                      (cm[12].group(1), deprecated, line))
 
             elif cm[13]:
                 if cm[13].group(1).split()[0] not in ('struct', 'union'):
-                    logging.info('Found typedef: "%s"', line)
+                    if trace:
+                        logging.info('Found typedef: "%s"', line)
                     if AddSymbolToList(slist, cm[13].group(2)):
                         decl_list.append(
                             '<TYPEDEF>\n<NAME>%s</NAME>\n%s%s</TYPEDEF>\n' % (cm[13].group(2), deprecated, line))
             elif cm[14]:
-                logging.info('Skipping typedef: "%s"', line)
+                if trace:
+                    logging.info('Skipping typedef: "%s"', line)
 
             # VARIABLES (extern'ed variables)
 
             elif cm[15]:
                 symbol = cm[15].group(1)
-                line = re.sub(r'^\s*([A-Za-z_]+VAR)\b', r'extern', line)
+                line = MATCHER['var_decorator'].sub(r'extern', line)
                 decl = line
-                logging.info('Possible extern var "%s": "%s"', symbol, decl)
+                if trace:
+                    logging.info('Possible extern var "%s": "%s"', symbol, decl)
                 if AddSymbolToList(slist, symbol):
                     decl_list.append('<VARIABLE>\n<NAME>%s</NAME>\n%s%s</VARIABLE>\n' % (symbol, deprecated, decl))
 
@@ -725,7 +1094,8 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
             elif cm[16]:
                 symbol = cm[16].group(1)
                 decl = line
-                logging.info('Possible global var" %s": "%s"', symbol, decl)
+                if trace:
+                    logging.info('Possible global var" %s": "%s"', symbol, decl)
                 if AddSymbolToList(slist, symbol):
                     decl_list.append('<VARIABLE>\n<NAME>%s</NAME>\n%s%s</VARIABLE>\n' % (symbol, deprecated, decl))
 
@@ -743,7 +1113,8 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
                 ret_type = format_ret_type(cm[18].group(1), None, cm[18].group(2))
                 symbol = cm[18].group(3)
                 decl = line[cm[18].end():]
-                logging.info('internal Function: "%s", Returns: "%s""%s"', symbol, cm[18].group(1), cm[18].group(2))
+                if trace:
+                    logging.info('internal Function: "%s", Returns: "%s""%s"', symbol, cm[18].group(1), cm[18].group(2))
                 in_declaration = 'function'
                 internal = 1
                 skip_block |= is_inline_func(line)
@@ -752,7 +1123,8 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
                 ret_type = format_ret_type(cm[19].group(1), None, cm[19].group(2))
                 symbol = cm[19].group(3)
                 decl = line[cm[19].end():]
-                logging.info('Function (1): "%s", Returns: "%s""%s"', symbol, cm[19].group(1), cm[19].group(2))
+                if trace:
+                    logging.info('Function (1): "%s", Returns: "%s""%s"', symbol, cm[19].group(1), cm[19].group(2))
                 in_declaration = 'function'
                 skip_block |= is_inline_func(line)
 
@@ -766,35 +1138,45 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
 
                 if is_inline_func(previous_line):
                     skip_block = True
-                    if pm[3]:
-                        ret_type = format_ret_type(pm[3].group(1), None, pm[3].group(2))
-                        logging.info('Function  (3): "%s", Returns: "%s"', symbol, ret_type)
+                    pm = PLINE_MATCHER[3].match(previous_line)
+                    if pm:
+                        ret_type = format_ret_type(pm.group(1), None, pm.group(2))
+                        if trace:
+                            logging.info('Function  (3): "%s", Returns: "%s"', symbol, ret_type)
                         in_declaration = 'function'
                 else:
-                    if pm[2]:
-                        ret_type = format_ret_type(pm[2].group(1), None, pm[2].group(2))
-                        logging.info('Function  (2): "%s", Returns: "%s"', symbol, ret_type)
+                    pm = PLINE_MATCHER[2].match(previous_line)
+                    if pm:
+                        ret_type = format_ret_type(pm.group(1), None, pm.group(2))
+                        if trace:
+                            logging.info('Function  (2): "%s", Returns: "%s"', symbol, ret_type)
                         in_declaration = 'function'
 
             # Try to catch function declarations with the return type and name
             # on the previous line(s), and the start of the parameters on this.
             elif cm[21]:
                 decl = line[cm[21].end():]
-                if pm[4]:
-                    ret_type = pm[4].group(1) + ' ' + pm[4].group(2).strip()
-                    symbol = pm[4].group(3)
+                pm = PLINE_MATCHER[4].match(previous_line)
+                ppm = None
+                if not pm and MATCHER['word_line'].search(previous_line):
+                    ppm = PPLINE_MATCHER[0].match(pre_previous_line)
+                if pm:
+                    ret_type = pm.group(1) + ' ' + pm.group(2).strip()
+                    symbol = pm.group(3)
                     in_declaration = 'function'
-                    logging.info('Function (5): "%s", Returns: "%s"', symbol, ret_type)
+                    if trace:
+                        logging.info('Function (5): "%s", Returns: "%s"', symbol, ret_type)
 
-                elif re.search(r'^\s*\w+\s*$', previous_line) and ppm[0]:
-                    ret_type = ppm[0].group(1)
-                    ret_type = re.sub(r'\s*\n', '', ret_type, flags=re.MULTILINE)
+                elif ppm:
+                    ret_type = ppm.group(1)
+                    ret_type = MATCHER['newline'].sub('', ret_type)
                     in_declaration = 'function'
 
                     symbol = previous_line
-                    symbol = re.sub(r'^\s+', '', symbol)
-                    symbol = re.sub(r'\s*\n', '', symbol, flags=re.MULTILINE)
-                    logging.info('Function (6): "%s", Returns: "%s"', symbol, ret_type)
+                    symbol = MATCHER['leading_space'].sub('', symbol)
+                    symbol = MATCHER['newline'].sub('', symbol)
+                    if trace:
+                        logging.info('Function (6): "%s", Returns: "%s"', symbol, ret_type)
 
             # } elsif (m/^extern\s+/) {
                 # print "DEBUG: Skipping extern: $_"
@@ -812,7 +1194,8 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
                 # we will find the correct level as below we do $level += tr/{//
                 level = 0
                 in_declaration = 'struct'
-                logging.info('Struct(_): "%s"', symbol)
+                if trace:
+                    logging.info('Struct(_): "%s"', symbol)
 
             # UNIONS
             elif cm[24]:
@@ -823,24 +1206,28 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
                 decl = line
                 level = 0
                 in_declaration = 'union'
-                logging.info('Union(_): "%s"', symbol)
+                if trace:
+                    logging.info('Union(_): "%s"', symbol)
         else:
-            logging.info('in decl %s: skip=%s %s', in_declaration, skip_block, line.strip())
+            if trace:
+                logging.info('in decl %s: skip=%s %s', in_declaration, skip_block, line.strip())
             decl += line
 
             if skip_block and '{' in decl:
                 (skip_block, decl) = remove_braced_content(decl)
-                logging.info('in decl: skip=%s decl=[%s]', skip_block, decl)
+                if trace:
+                    logging.info('in decl: skip=%s decl=[%s]', skip_block, decl)
 
         pre_previous_line = previous_line
         previous_line = line
 
         if skip_block:
-            logging.info('skipping, in decl %s, decl=[%s]', in_declaration, decl)
+            if trace:
+                logging.info('skipping, in decl %s, decl=[%s]', in_declaration, decl)
             continue
 
         if in_declaration == "g-declare":
-            dm = re.search(r'\s*(\w+)\s*,\s*(\w+)\s*,\s*(\w+)\s*,\s*(\w+)\s*,\s*(\w+)\s*\).*$', decl)
+            dm = MATCHER['g_declare_args'].search(decl)
             # FIXME the original code does s// stuff here and we don't. Is it necessary?
             if dm:
                 ModuleObjName = dm.group(1)
@@ -857,28 +1244,29 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
                 in_declaration = ''
 
         if in_declaration == 'function':
-            # Note that sometimes functions end in ') G_GNUC_PRINTF (2, 3);' or
-            # ') __attribute__ (...);'.
-            regex = r'\)\s*(G_GNUC_.*|.*DEPRECATED.*%s\s*|__attribute__\s*\(.*\)\s*)*;.*$' % ignore_decorators
-            pm = re.search(regex, decl, flags=re.MULTILINE)
+            pm = MATCHER['function_end'].search(decl)
             if pm:
-                logging.info('scrubbing:[%s]', decl.strip())
-                decl = re.sub(regex, '', decl, flags=re.MULTILINE)
-                logging.info('scrubbed:[%s]', decl.strip())
+                if trace:
+                    logging.info('scrubbing:[%s]', decl.strip())
+                decl = MATCHER['function_end'].sub('', decl)
+                if trace:
+                    logging.info('scrubbed:[%s]', decl.strip())
                 if internal == 0:
-                    decl = re.sub(r'/\*.*?\*/', '', decl, flags=re.MULTILINE)   # remove comments.
-                    decl = re.sub(r'\s*\n\s*(?!$)', ' ', decl, flags=re.MULTILINE)  # remove newlines
+                    decl = MATCHER['comment'].sub('', decl)   # remove comments.
+                    decl = MATCHER['inner_newlines'].sub(' ', decl)  # remove newlines
                     # consolidate whitespace at start/end of lines.
                     decl = decl.strip()
-                    ret_type = re.sub(r'/\*.*?\*/', '', ret_type).strip()       # remove comments in ret type.
+                    ret_type = MATCHER['comment'].sub('', ret_type).strip()       # remove comments in ret type.
                     if AddSymbolToList(slist, symbol):
                         decl_list.append('<FUNCTION>\n<NAME>%s</NAME>\n%s<RETURNS>%s</RETURNS>\n%s\n</FUNCTION>\n' %
                                          (symbol, deprecated, ret_type, decl))
                         if options.rebuild_types:
                             # check if this looks like a get_type function and if so remember
-                            if symbol.endswith('_get_type') and 'GType' in ret_type and re.search(r'^(void|)$', decl):
-                                logging.info(
-                                    "Adding get-type: [%s] [%s] [%s]", ret_type, symbol, decl)
+                            if symbol.endswith('_get_type') and 'GType' in ret_type \
+                                    and MATCHER['void_args'].search(decl):
+                                if trace:
+                                    logging.info(
+                                        "Adding get-type: [%s] [%s] [%s]", ret_type, symbol, decl)
                                 get_types.append(symbol)
                 else:
                     internal = 0
@@ -887,11 +1275,11 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
                 skip_block = False
 
         if in_declaration == 'user_function':
-            if re.search(r'\).*$', decl):
-                decl = re.sub(r'\).*$', '', decl)
+            if MATCHER['user_function_end'].search(decl):
+                decl = MATCHER['user_function_end'].sub('', decl)
                 # TODO: same as above
-                decl = re.sub(r'/\*.*?\*/', '', decl, flags=re.MULTILINE)   # remove comments.
-                decl = re.sub(r'\s*\n\s*(?!$)', ' ', decl, flags=re.MULTILINE)  # remove newlines
+                decl = MATCHER['comment'].sub('', decl)   # remove comments.
+                decl = MATCHER['inner_newlines'].sub(' ', decl)  # remove newlines
                 # TODO: don't stip here (it works above, but fails some test
                 # consolidate whitespace at start/end of lines.
                 # decl = decl.strip()
@@ -902,25 +1290,22 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
                 in_declaration = ''
 
         if in_declaration == 'macro':
-            if not re.search(r'\\\s*$', decl):
+            if not MATCHER['macro_continued'].search(decl):
                 if internal == 0:
                     if AddSymbolToList(slist, symbol):
                         decl_list.append('<MACRO>\n<NAME>%s</NAME>\n%s%s</MACRO>\n' % (symbol, deprecated, decl))
                 else:
-                    logging.info('skip internal macro: [%s]', symbol)
+                    if trace:
+                        logging.info('skip internal macro: [%s]', symbol)
                     internal = 0
                 deprecated_conditional_nest = int(deprecated_conditional_nest)
                 in_declaration = ''
             else:
-                logging.info('skip empty macro: [%s]', symbol)
+                if trace:
+                    logging.info('skip empty macro: [%s]', symbol)
 
         if in_declaration == 'enum':
-            # Examples:
-            # "};"
-            # "} MyEnum;"
-            # "} MyEnum DEPRECATED_FOR(NewEnum);"
-            # "} DEPRECATED_FOR(NewEnum);"
-            em = re.search(r'\n\s*\}\s*(?:(\w+)?%s)?;\s*$' % optional_decorators_regex, decl)
+            em = MATCHER['enum_end'].search(decl)
             if em:
                 if symbol == '':
                     symbol = em.group(1)
@@ -929,10 +1314,10 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
                 # deprecated_conditional_nest above. Here we can check if the
                 # _DEPRECATED is between '}' and ';' which would mean the enum
                 # as a whole is deprecated.
-                if re.search(r'\n\s*\}.*_DEPRECATED.*;\s*$', decl):
+                if MATCHER['deprecated_end'].search(decl):
                     deprecated = '<DEPRECATED/>\n'
                 if AddSymbolToList(slist, symbol):
-                    stripped_decl = re.sub(optional_decorators_regex, '', decl)
+                    stripped_decl = MATCHER['decorators'].sub('', decl)
                     decl_list.append('<ENUM>\n<NAME>%s</NAME>\n%s%s</ENUM>\n' % (symbol, deprecated, stripped_decl))
                 deprecated_conditional_nest = int(deprecated_conditional_nest)
                 in_declaration = ''
@@ -940,30 +1325,30 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
         # We try to handle nested structs/unions, but unmatched brackets in
         # comments will cause problems.
         if in_declaration == 'struct' or in_declaration == 'union':
-            # Same regex as for enum
-            sm = re.search(r'\n\}\s*(?:(\w+)?%s)?;\s*$' % optional_decorators_regex, decl)
+            sm = MATCHER['struct_end'].search(decl)
             if level <= 1 and sm:
                 if symbol == '':
                     symbol = sm.group(1)
 
-                bm = re.search(r'^(\S+)(Class|Iface|Interface)\b', symbol)
+                bm = SUB_MATCHER[0].match(symbol)
                 if bm:
                     objectname = bm.group(1)
-                    logging.info('Found object: "%s"', objectname)
+                    if trace:
+                        logging.info('Found object: "%s"', objectname)
                     title = '<TITLE>%s</TITLE>' % objectname
 
-                logging.info('Store struct: "%s"', symbol)
+                if trace:
+                    logging.info('Store struct: "%s"', symbol)
                 # Structs could contain deprecated members and that doesn't
                 # mean the whole struct is deprecated, so they are ignored when
                 # setting deprecated_conditional_nest above. Here we can check
                 # if the _DEPRECATED is between '}' and ';' which would mean
                 # the struct as a whole is deprecated.
-                if re.search(r'\n\s*\}.*_DEPRECATED.*;\s*$', decl):
+                if MATCHER['deprecated_end'].search(decl):
                     deprecated = '<DEPRECATED/>\n'
                 if AddSymbolToList(slist, symbol):
                     structsym = in_declaration.upper()
-                    regex = r'(?:\s+(?:G_GNUC_\w+(?:\(\w*\))?%s))' % ignore_decorators
-                    stripped_decl = re.sub(regex, '', decl)
+                    stripped_decl = MATCHER['struct_decorators'].sub('', decl)
                     decl_list.append('<%s>\n<NAME>%s</NAME>\n%s%s</%s>\n' %
                                      (structsym, symbol, deprecated, stripped_decl, structsym))
                     if symbol in forward_decls:
@@ -975,7 +1360,8 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
                 # $level accordingly.
                 level += line.count('{')
                 level -= line.count('}')
-                logging.info('struct/union level : %d', level)
+                if trace:
+                    logging.info('struct/union level : %d', level)
 
     # here we want in_declaration=='', otherwise we have a partial declaration
     # Code commented out because it breaks some projects. More work is needed.
@@ -990,8 +1376,8 @@ def ScanHeaderContent(input_lines, decl_list, get_types, options):
 
     # add title
     if title:
-        slist = [title] + slist
-    return slist, doc_comments
+        return [title] + list(slist), doc_comments
+    return list(slist), doc_comments
 
 
 def remove_braced_content(decl):
@@ -1006,15 +1392,15 @@ def remove_braced_content(decl):
 
     skip_block = True
     # Remove all nested pairs of curly braces.
-    brace_remover = r'{[^{]*?}'
-    bm = re.search(brace_remover, decl)
+    brace_remover = MATCHER['braced_content']
+    bm = brace_remover.search(decl)
     while bm:
-        decl = re.sub(brace_remover, '', decl)
+        decl = brace_remover.sub('', decl)
         logging.info('decl=[%s]' % decl)
-        bm = re.search(brace_remover, decl)
+        bm = brace_remover.search(decl)
 
     # If all '{' have been matched and removed, we're done
-    bm = re.search(r'(.*?){', decl)
+    bm = MATCHER['open_brace'].search(decl)
     if not bm:
         # this is a hack to detect the end of declaration
         decl = decl.rstrip() + ';'
@@ -1029,7 +1415,7 @@ def is_inline_func(line):
     if line.startswith('G_INLINE_FUNC'):
         logging.info('skip block after G_INLINE_FUNC function')
         return True
-    if re.search(r'static\s+inline', line):
+    if MATCHER['static_inline'].search(line):
         logging.info('skip block after static inline function')
         return True
     return False
@@ -1149,7 +1535,7 @@ def AddSymbolToList(slist, symbol):
     """ Adds symbol to list of declaration if not already present.
 
     Args:
-        slist: The list of symbols.
+        slist: The symbols, a dict used as an ordered set.
         symbol: The symbol to add to the list.
     """
     if symbol in slist:
@@ -1157,5 +1543,5 @@ def AddSymbolToList(slist, symbol):
         # we return False to skip outputting another entry to -decl.txt
         # this is to avoid redeclarations (e.g. in conditional sections).
         return False
-    slist.append(symbol)
+    slist[symbol] = True
     return True
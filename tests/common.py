@@ -18,6 +18,7 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 #
 
+import io
 from unittest import mock
 import unittest
 
@@ -52,6 +53,26 @@ class TestGetModuleDocDir(unittest.TestCase):
         self.assertEqual(common.GetModuleDocDir('glib-2.0'), '/usr/share/gtk-doc/html')
 
 
+class TestIsTracing(unittest.TestCase):
+
+    def tearDown(self):
+        common.TracedSubsystems = None
+
+    @mock.patch('logging.getLogger')
+    def test_FollowsTheLogLevel(self, get_logger):
+        get_logger.return_value.isEnabledFor.return_value = False
+        self.assertFalse(common.IsTracing('markdown'))
+        get_logger.return_value.isEnabledFor.return_value = True
+        self.assertTrue(common.IsTracing('markdown'))
+
+    @mock.patch('logging.getLogger')
+    def test_OnlyTracesSelectedSubsystems(self, get_logger):
+        get_logger.return_value.isEnabledFor.return_value = True
+        common.TracedSubsystems = {'header'}
+        self.assertTrue(common.IsTracing('header'))
+        self.assertFalse(common.IsTracing('markdown'))
+
+
 class TestCreateValidSGMLID(unittest.TestCase):
 
     def test_AlreadyValid(self):
@@ -63,6 +84,14 @@ class TestCreateValidSGMLID(unittest.TestCase):
     def test_SpecialCharsGetRemoved(self):
         self.assertEqual(common.CreateValidSGMLID('x,;y'), 'xy')
 
+    def test_RepeatedIdsAreCached(self):
+        common.CreateValidSGMLID.cache_clear()
+        common.CreateValidSGMLID('x_y')
+        common.CreateValidSGMLID('x_y')
+        out = io.StringIO()
+        common.ReportIdCacheStats(out)
+        self.assertEqual(['CreateValidSGMLID', '2', '1', '50.0%'], out.getvalue().splitlines()[1].split())
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,159 @@
+# -*- python -*-
+#
+# gtk-doc - GTK DocBook documentation generator.
+# Copyright (C) 2018  Stefan Sauer
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+
+import os
+import tempfile
+import unittest
+
+from gtkdoc import fixxref
+
+
+class TestIndexCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.devhelp = os.path.join(self.tmpdir.name, 'test.devhelp2')
+        with open(self.devhelp, 'w') as f:
+            f.write('<keyword type="function" name="a ()" link="test.html#a"/>\n'
+                    '<keyword type="function" name="b ()" link="test.html#b"/>\n')
+        fixxref.IndexCache = fixxref.OpenIndexCache(
+            os.path.join(self.tmpdir.name, 'xref-index.db'))
+
+    def tearDown(self):
+        fixxref.IndexCache.close()
+        fixxref.IndexCache = None
+        self.tmpdir.cleanup()
+
+    def test_links_are_read_from_the_cache(self):
+        links = fixxref.ReadDevhelpLinks(self.devhelp)
+        self.assertEqual([('a', 'test.html#a'), ('b', 'test.html#b')], links)
+        self.assertEqual(links, fixxref.ReadCachedLinks(self.devhelp))
+
+    def test_modified_file_is_read_again(self):
+        fixxref.ReadDevhelpLinks(self.devhelp)
+        with open(self.devhelp, 'a') as f:
+            f.write('<keyword type="function" name="c ()" link="test.html#c"/>\n')
+        self.assertIsNone(fixxref.ReadCachedLinks(self.devhelp))
+        links = fixxref.ReadDevhelpLinks(self.devhelp)
+        self.assertEqual(('c', 'test.html#c'), links[-1])
+
+
+class TestLazyLinks(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.html_dir = os.path.join(self.tmpdir.name, 'html')
+        self.write_devhelp('book1', ['a', 'b'])
+        self.write_devhelp('book2', ['b'])
+        fixxref.Links.clear()
+
+    def tearDown(self):
+        fixxref.LazyBooks = None
+        fixxref.LazyLinks.clear()
+        self.tmpdir.cleanup()
+
+    def write_devhelp(self, book, ids):
+        os.makedirs(os.path.join(self.html_dir, book))
+        with open(os.path.join(self.html_dir, book, book + '.devhelp2'), 'w') as f:
+            for id in ids:
+                f.write('<keyword type="function" name="%s" link="%s.html#%s"/>\n' % (id, book, id))
+
+    def load(self):
+        fixxref.LoadIndicies(
+            os.path.join(self.tmpdir.name, 'module'), self.html_dir, [],
+            os.path.join(self.tmpdir.name, 'xref-index.db'), True)
+
+    def test_links_are_not_loaded(self):
+        self.load()
+        self.assertEqual({}, fixxref.Links)
+
+    def test_links_are_looked_up(self):
+        self.load()
+        self.assertEqual(('a', '../book1/book1.html#a'), fixxref.GetXRef('a'))
+        self.assertEqual(('c', None), fixxref.GetXRef('c'))
+
+    def test_last_scanned_book_wins(self):
+        self.load()
+        self.assertEqual(('b', '../book2/book2.html#b'), fixxref.GetXRef('b'))
+
+    def test_last_link_in_a_book_wins(self):
+        os.makedirs(os.path.join(self.html_dir, 'book3'))
+        with open(os.path.join(self.html_dir, 'book3', 'book3.devhelp2'), 'w') as f:
+            f.write('<keyword type="function" name="d" link="first.html#d"/>\n'
+                    '<keyword type="function" name="d" link="second.html#d"/>\n')
+        self.load()
+        self.assertEqual(('d', '../book3/second.html#d'), fixxref.GetXRef('d'))
+
+    def test_eager_load_forgets_the_lazy_links(self):
+        self.load()
+        self.assertEqual(('a', '../book1/book1.html#a'), fixxref.GetXRef('a'))
+        os.remove(os.path.join(self.html_dir, 'book1', 'book1.devhelp2'))
+        fixxref.LoadIndicies(os.path.join(self.tmpdir.name, 'module'), self.html_dir, [])
+        self.assertEqual(('a', None), fixxref.GetXRef('a'))
+
+
+class TestFixHTMLFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.file = os.path.join(self.tmpdir.name, 'test.html')
+        fixxref.Links.clear()
+        fixxref.Links['foo-bar'] = '../test/test.html#foo-bar'
+
+    def tearDown(self):
+        fixxref.Links.clear()
+        self.tmpdir.cleanup()
+
+    def fix(self, content):
+        with open(self.file, 'w') as f:
+            f.write(content)
+        fixxref.FixHTMLFile('c', 'test', self.file)
+        with open(self.file) as f:
+            return f.read()
+
+    def test_links_are_resolved(self):
+        self.assertEqual(
+            '<p><a href="test.html#foo-bar">foo_bar</a></p>',
+            self.fix('<p><GTKDOCLINK HREF="foo-bar">foo_bar</GTKDOCLINK></p>\n'))
+
+    def test_escaped_links_are_resolved(self):
+        self.assertEqual(
+            '<a href="test.html#foo-bar">foo_bar</a>',
+            self.fix('&lt;GTKDOCLINK HREF=&quot;foo-bar&quot;&gt;foo_bar&lt;/GTKDOCLINK&gt;'))
+
+    def test_marked_up_functions_are_linked(self):
+        self.assertEqual(
+            '<span class="function"><a href="test.html#foo-bar">foo_bar</a></span>',
+            self.fix('<span class="function">foo_bar</span>'))
+
+    def test_worker_collects_reports(self):
+        with open(self.file, 'w') as f:
+            f.write('<span class="function">baz</span>\n'
+                    '<GTKDOCLINK HREF="no-link">no_link</GTKDOCLINK>\n')
+        reports = fixxref.FixHTMLFileWorker(('c', 'test', self.file))
+        self.assertEqual([
+            ('baz',),
+            (self.file, 1, 'baz', 'baz'),
+            (self.file, 2, 'no-link', 'no_link'),
+        ], reports)
+
+
+if __name__ == '__main__':
+    unittest.main()
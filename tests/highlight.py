@@ -18,7 +18,10 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 #
 
+import os
+import tempfile
 import unittest
+from unittest import mock
 
 from gtkdoc import highlight
 
@@ -30,5 +33,36 @@ class HighlightTestCase(unittest.TestCase):
         self.assertIsNotNone(code)
 
 
+class HighlightCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        highlight.CACHE.clear()
+
+    def tearDown(self):
+        highlight.set_cache_dir(None)
+
+    def test_result_is_cached(self):
+        code = highlight.highlight_code('int i;')
+        with mock.patch('gtkdoc.highlight.highlight') as h:
+            self.assertEqual(code, highlight.highlight_code('int i;'))
+            h.assert_not_called()
+
+    def test_cache_is_bounded(self):
+        with mock.patch('gtkdoc.highlight.CACHE_SIZE', 2):
+            for i in range(3):
+                highlight.highlight_code('int i%d;' % i)
+        self.assertEqual(2, len(highlight.CACHE))
+
+    def test_result_is_cached_on_disk(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            highlight.set_cache_dir(cache_dir)
+            code = highlight.highlight_code('int i;')
+            self.assertEqual(1, len(os.listdir(cache_dir)))
+            highlight.CACHE.clear()
+            with mock.patch('gtkdoc.highlight.highlight') as h:
+                self.assertEqual(code, highlight.highlight_code('int i;'))
+                h.assert_not_called()
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -285,5 +285,21 @@ frame
         self.assertEqual(expected, output)
 
 
+class TestConverterCache(unittest.TestCase):
+
+    def setUp(self):
+        md_to_db.Init()
+        md_to_db.MarkDownParseText.cache_clear()
+
+    def test_RepeatedDocsAreCached(self):
+        output = md_to_db.MarkDownParse('a #GObject', 'symbol1')
+        self.assertEqual('<para>a <link linkend="GObject"><type>GObject</type></link></para>\n', output)
+        self.assertIs(output, md_to_db.MarkDownParse('a #GObject', 'symbol2'))
+
+    def test_DocsWithMarkupAreNotCached(self):
+        md_to_db.MarkDownParse('<para>a #GObject</para>', 'symbol')
+        self.assertEqual(0, md_to_db.MarkDownParseText.cache_info().currsize)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -18,9 +18,16 @@
 # Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
 #
 
+import argparse
+import io
+import logging
+import os
+import tempfile
 import textwrap
 import unittest
 
+from unittest import mock
+
 from gtkdoc import mkdb
 
 
@@ -35,22 +42,33 @@ class ScanSourceContentTestCase(unittest.TestCase):
 class ScanSourceContent(ScanSourceContentTestCase):
 
     def test_EmptyInput(self):
-        blocks = mkdb.ScanSourceContent([])
+        blocks = list(mkdb.ScanSourceContent([]))
         self.assertEqual(0, len(blocks))
 
     def test_SkipsSingleLineComment(self):
-        blocks = mkdb.ScanSourceContent("/** foo */")
+        blocks = list(mkdb.ScanSourceContent("/** foo */"))
         self.assertEqual(0, len(blocks))
 
     def test_FindsSingleDocComment(self):
-        blocks = mkdb.ScanSourceContent("""\
+        blocks = list(mkdb.ScanSourceContent("""\
             /**
              * symbol:
              *
              * Description.
-             */""".splitlines(keepends=True))
+             */""".splitlines(keepends=True)))
         self.assertEqual(1, len(blocks))
 
+    def test_ReadsLinesFromStream(self):
+        stream = io.StringIO(textwrap.dedent("""\
+            /**
+             * symbol:
+             *
+             * Description.
+             */
+            """))
+        blocks = mkdb.ScanSourceContent(stream)
+        self.assertEqual((['symbol:\n', '\n', 'Description.\n'], 2), next(blocks))
+
 
 class ParseCommentBlock(ScanSourceContentTestCase):
 
@@ -237,6 +255,375 @@ class ScanSourceContentAnnotations(ScanSourceContentTestCase):
     # multiple annotations, multiline annotations, symbol-level ...
 
 
+class ScanSourceFileWorker(ScanSourceContentTestCase):
+
+    def setUp(self):
+        super().setUp()
+        mkdb.SourceSymbolDocs = {}
+        mkdb.SymbolAnnotations = {}
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.source = os.path.join(self.tmp_dir.name, 'source.c')
+        with open(self.source, 'w', encoding='utf-8') as f:
+            f.write(textwrap.dedent("""\
+                /**
+                 * symbol: (skip)
+                 *
+                 * Description.
+                 */
+                """))
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_CallsAreRecordedAndReplayed(self):
+        calls = mkdb.ScanSourceFileWorker((self.source, ''))
+        self.assertIsNone(mkdb.SourceCalls)
+        self.assertEqual({}, mkdb.SourceSymbolDocs)
+        self.assertEqual({}, mkdb.SymbolAnnotations)
+
+        for (func, args) in calls:
+            func(*args)
+        self.assertEqual('Description.\n', mkdb.SourceSymbolDocs['symbol'])
+        self.assertEqual({'symbol': '(skip)'}, mkdb.SymbolAnnotations)
+
+    def test_TextIsConvertedInTheWorker(self):
+        with open(self.source, 'a', encoding='utf-8') as f:
+            f.write('/**\n * other:\n *\n * a < b <programlisting>\n */\n')
+        with mock.patch.object(mkdb, 'INLINE_MARKUP_MODE', True):
+            calls = mkdb.ScanSourceFileWorker((self.source, ''))
+        calls = [(func, args) for (func, args) in calls if args[0] == 'other']
+        self.assertEqual([mkdb.LogMissingEndTag, mkdb.ParseCommentBlockSegments], [func for (func, args) in calls])
+        self.assertEqual('a &lt; b <programlisting>\n', calls[1][1][1]['body'])
+
+    def test_SameResultsAsScanSourceFile(self):
+        for (func, args) in mkdb.ScanSourceFileWorker((self.source, '')):
+            func(*args)
+        results = (mkdb.SourceSymbolDocs, mkdb.SymbolAnnotations)
+        mkdb.SourceSymbolDocs = {}
+        mkdb.SymbolAnnotations = {}
+        mkdb.ScanSourceFile(self.source, '')
+        self.assertEqual(results, (mkdb.SourceSymbolDocs, mkdb.SymbolAnnotations))
+
+
+class SourceCache(ScanSourceFileWorker):
+
+    def setUp(self):
+        super().setUp()
+        self.cache_dir = mkdb.SOURCE_CACHE_DIR
+        mkdb.SOURCE_CACHE_DIR = os.path.join(self.tmp_dir.name, 'cache')
+        os.mkdir(mkdb.SOURCE_CACHE_DIR)
+
+    def tearDown(self):
+        mkdb.SOURCE_CACHE_DIR = self.cache_dir
+        super().tearDown()
+
+    def scanSourceFile(self):
+        with mock.patch.object(mkdb, 'ScanSourceFile', wraps=mkdb.ScanSourceFile) as m:
+            calls = mkdb.ScanSourceFileWorker((self.source, ''))
+        return [(func, list(args)) for (func, args) in calls], m.called
+
+    def test_UnchangedFileIsTakenFromCache(self):
+        calls, scanned = self.scanSourceFile()
+        self.assertTrue(scanned)
+        cached, scanned = self.scanSourceFile()
+        self.assertFalse(scanned)
+        self.assertEqual(calls, cached)
+
+    def test_ChangedFileIsScanned(self):
+        self.scanSourceFile()
+        with open(self.source, 'a', encoding='utf-8') as f:
+            f.write('/**\n * other:\n *\n * Other.\n */\n')
+        calls, scanned = self.scanSourceFile()
+        self.assertTrue(scanned)
+        self.assertEqual(['symbol', 'other'],
+                         [args[0] for (func, args) in calls if func == mkdb.ParseCommentBlockSegments])
+
+
+class ReadArgsFile(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.args_file = os.path.join(self.tmp_dir.name, 'test.args')
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def readArgsFile(self, *args):
+        with open(self.args_file, 'w', encoding='utf-8') as f:
+            for (obj, name) in args:
+                f.write(textwrap.dedent("""\
+                    <ARG>
+                    <NAME>%s::%s</NAME>
+                    <TYPE>gint</TYPE>
+                    <RANGE>>= 0</RANGE>
+                    <FLAGS>rw</FLAGS>
+                    <NICK>nick</NICK>
+                    <BLURB>blurb</BLURB>
+                    <DEFAULT>0</DEFAULT>
+                    </ARG>
+
+                    """ % (obj, name)))
+        mkdb.ReadArgsFile(self.args_file)
+
+    def test_ArgsAreGroupedByObject(self):
+        self.readArgsFile(('GtkdocObject', 'prop_a'), ('GtkdocIface', 'prop'),
+                          ('GtkdocObject', 'prop-b'))
+        self.assertEqual(['GtkdocObject', 'GtkdocIface'], list(mkdb.Args))
+        self.assertEqual(['prop-a', 'prop-b'], [arg.name for arg in mkdb.Args['GtkdocObject']])
+        arg = mkdb.Args['GtkdocIface'][0]
+        self.assertEqual(('gint', 'rw', '>= 0', '0', 'blurb'),
+                         (arg.type, arg.flags, arg.range, arg.default, arg.blurb))
+
+    def test_ReadingResetsArgs(self):
+        self.readArgsFile(('GtkdocObject', 'prop'))
+        self.readArgsFile(('GtkdocIface', 'prop'))
+        self.assertEqual(['GtkdocIface'], list(mkdb.Args))
+
+
+class ReadObjectHierarchy(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.hierarchy_file = os.path.join(self.tmp_dir.name, 'test.hierarchy')
+        with open(self.hierarchy_file, 'w', encoding='utf-8') as f:
+            f.write(textwrap.dedent("""\
+                GObject
+                  GtkdocObject
+                    GtkdocSubObject
+                      GtkdocSubSubObject
+                    GtkdocOtherObject
+                  GtkdocHidden
+                GInterface
+                  GtkdocIface
+                """))
+        mkdb.MODULE = 'test'
+        mkdb.KnownSymbols = {
+            'GtkdocObject': 1, 'GtkdocSubObject': 1, 'GtkdocSubSubObject': 1,
+            'GtkdocOtherObject': 1, 'GtkdocIface': 1,
+        }
+        mkdb.ReadObjectHierarchy(self.hierarchy_file)
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_ParentsAndChildren(self):
+        self.assertEqual(None, mkdb.ObjectParents[mkdb.ObjectIndices['GObject']])
+        self.assertEqual(mkdb.ObjectIndices['GtkdocObject'],
+                         mkdb.ObjectParents[mkdb.ObjectIndices['GtkdocSubObject']])
+        self.assertEqual([mkdb.ObjectIndices['GtkdocSubObject'], mkdb.ObjectIndices['GtkdocOtherObject']],
+                         mkdb.ObjectChildren[mkdb.ObjectIndices['GtkdocObject']])
+        self.assertNotIn('GtkdocHidden', mkdb.ObjectIndices)
+
+    def test_HierarchyShowsAncestorsAndChildren(self):
+        hierarchy = mkdb.GetHierarchy('GtkdocSubObject', [])
+        self.assertEqual([
+            '    <link linkend="GObject">GObject</link>',
+            '        <link linkend="GtkdocObject">GtkdocObject</link>',
+            '            GtkdocSubObject',
+            '                <link linkend="GtkdocSubSubObject">GtkdocSubSubObject</link>',
+        ], hierarchy)
+
+    def test_DuplicateObjectKeepsChildrenOfItsFirstEntry(self):
+        with open(self.hierarchy_file, 'w', encoding='utf-8') as f:
+            f.write(textwrap.dedent("""\
+                GObject
+                  GtkdocObject
+                    GtkdocSubObject
+                GInitiallyUnowned
+                  GtkdocObject
+                    GtkdocOtherObject
+                """))
+        mkdb.ReadObjectHierarchy(self.hierarchy_file)
+        self.assertEqual([
+            '    <link linkend="GObject">GObject</link>',
+            '        GtkdocObject',
+            '            <link linkend="GtkdocSubObject">GtkdocSubObject</link>',
+        ], mkdb.GetHierarchy('GtkdocObject', []))
+        self.assertEqual([
+            '    <link linkend="GInitiallyUnowned">GInitiallyUnowned</link>',
+            '        <link linkend="GtkdocObject">GtkdocObject</link>',
+            '            GtkdocOtherObject',
+        ], mkdb.GetHierarchy('GtkdocOtherObject', []))
+
+    def test_ImplementationsAreSorted(self):
+        interfaces_file = os.path.join(self.tmp_dir.name, 'test.interfaces')
+        with open(interfaces_file, 'w', encoding='utf-8') as f:
+            f.write('GtkdocSubObject GtkdocIface\nGtkdocObject GtkdocIface\n')
+        mkdb.ReadInterfaces(interfaces_file)
+        self.assertEqual(['GtkdocObject', 'GtkdocSubObject'], mkdb.Implementations['GtkdocIface'])
+
+
+class SectionCache(unittest.TestCase):
+
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.sections_file = os.path.join(self.tmp_dir.name, 'test-sections.txt')
+        with open(self.sections_file, 'w', encoding='utf-8') as f:
+            f.write(textwrap.dedent("""\
+                <SECTION>
+                <FILE>first</FILE>
+                gtkdoc_first
+                </SECTION>
+
+                <SECTION>
+                <FILE>second</FILE>
+                gtkdoc_second
+                </SECTION>
+                """))
+        self.root_dir = mkdb.ROOT_DIR
+        mkdb.ROOT_DIR = self.tmp_dir.name
+        mkdb.MODULE = 'test'
+        mkdb.doctype_header = ''
+        mkdb.SymbolDocs = {}
+        self.options = argparse.Namespace(default_includes='', default_stability='')
+
+    def tearDown(self):
+        mkdb.ROOT_DIR = self.root_dir
+        self.tmp_dir.cleanup()
+
+    def getHashes(self):
+        return [inputs for (inputs, keys) in mkdb.GetSectionInputs(self.sections_file, self.options)]
+
+    def test_SymbolDocsOnlyChangeTheirSection(self):
+        first, second = self.getHashes()
+        mkdb.SymbolDocs['gtkdoc_second'] = 'Changed.'
+        self.assertEqual([first], self.getHashes()[:1])
+        self.assertNotEqual(second, self.getHashes()[1])
+
+    def test_SectionDocsChangeTheirSection(self):
+        first, second = self.getHashes()
+        mkdb.SymbolDocs['first:long_description'] = 'Changed.'
+        self.assertNotEqual(first, self.getHashes()[0])
+        self.assertEqual(second, self.getHashes()[1])
+
+    def test_RecordsAnnotationsAndWarnings(self):
+        mkdb.AnnotationsUsed.clear()
+        mkdb.AnnotationsUsed['out'] = 1
+        record = {'annotations': [], 'warnings': {}, 'line': 0}
+        with mock.patch.object(logging.getLogger(), 'handlers', []):
+            saved_annotations = mkdb.StartSectionRecording(record, 'gtkdoc_first')
+            mkdb.AnnotationsUsed['out'] = 1
+            mkdb.AnnotationsUsed['nullable'] = 1
+            with mock.patch('builtins.print'):
+                mkdb.common.LogWarning('test.c', 1, 'warning')
+            logging.warning('logged')
+            mkdb.StopSectionRecording(record, saved_annotations)
+        self.assertEqual(['out', 'nullable'], record['annotations'])
+        self.assertEqual(['gtkdoc_first'], list(record['warnings']))
+        (warning, logged) = record['warnings']['gtkdoc_first']
+        self.assertEqual(('test.c', 1, 'warning'), warning)
+        self.assertEqual('logged', logged['msg'])
+        self.assertEqual({'out', 'nullable'}, set(mkdb.AnnotationsUsed))
+
+    def test_ReplaysWarningsWithTheSection(self):
+        entry = {'warnings': {'gtkdoc_first': [
+            [self.sections_file, 3, 'moved'], ['test.c', 1, 'kept']]}, 'line': 1}
+        with mock.patch('gtkdoc.common.LogWarning') as log_warning:
+            mkdb.ReplaySectionWarnings(entry, 'gtkdoc_first', self.sections_file, 6)
+            mkdb.ReplaySectionWarnings(entry, '', self.sections_file, 6)
+        self.assertEqual([mock.call(self.sections_file, 8, 'moved'), mock.call('test.c', 1, 'kept')],
+                         log_warning.call_args_list)
+
+    def test_SectionLinesOnlyChangeTheirSection(self):
+        first, second = self.getHashes()
+        with open(self.sections_file, 'r+', encoding='utf-8') as f:
+            content = f.read()
+            f.seek(0)
+            f.write(content.replace('gtkdoc_first\n', 'gtkdoc_first\ngtkdoc_first_new\n'))
+        self.assertNotEqual(first, self.getHashes()[0])
+        self.assertEqual(second, self.getHashes()[1])
+
+    def test_DeclarationsOnlyChangeTheirSection(self):
+        first, second = self.getHashes()
+        mkdb.Declarations['gtkdoc_second'] = 'void gtkdoc_second (void);'
+        try:
+            self.assertEqual([first], self.getHashes()[:1])
+            self.assertNotEqual(second, self.getHashes()[1])
+        finally:
+            del mkdb.Declarations['gtkdoc_second']
+
+    def test_IncludeChangesLaterSections(self):
+        with open(self.sections_file, 'r+', encoding='utf-8') as f:
+            content = f.read()
+            f.seek(0)
+            f.write(content.replace('<FILE>first</FILE>\n', '<FILE>first</FILE>\n<INCLUDE>a.h</INCLUDE>\n'))
+        first, second = self.getHashes()
+        with open(self.sections_file, 'w', encoding='utf-8') as f:
+            f.write(content.replace('<FILE>first</FILE>\n', '<FILE>first</FILE>\n<INCLUDE>b.h</INCLUDE>\n'))
+        self.assertNotEqual(first, self.getHashes()[0])
+        self.assertNotEqual(second, self.getHashes()[1])
+
+    def test_KnownSymbolsInOtherSectionsChangeTheHierarchy(self):
+        hierarchy_file = os.path.join(self.tmp_dir.name, 'test.hierarchy')
+        with open(hierarchy_file, 'w', encoding='utf-8') as f:
+            f.write('GObject\n  GtkdocObject\n    GtkdocSubObject\n')
+        with open(self.sections_file, 'r+', encoding='utf-8') as f:
+            content = f.read()
+            f.seek(0)
+            f.write(content.replace('gtkdoc_first\n', 'GtkdocObject\n'))
+
+        def getHashes():
+            mkdb.KnownSymbols = {}
+            mkdb.ReadKnownSymbols(self.sections_file)
+            mkdb.ReadObjectHierarchy(hierarchy_file)
+            return self.getHashes()
+
+        try:
+            first, second = getHashes()
+            with open(self.sections_file, 'r+', encoding='utf-8') as f:
+                content = f.read()
+                f.seek(0)
+                f.write(content.replace('gtkdoc_second\n', 'gtkdoc_second\nGtkdocSubObject\n'))
+            self.assertNotEqual(first, getHashes()[0])
+        finally:
+            mkdb.KnownSymbols = {}
+            mkdb.ReadObjectHierarchy(hierarchy_file)
+            mkdb.ObjectRoots.clear()
+
+
+class ModifyXMLElements(unittest.TestCase):
+
+    def modify(self, text):
+        return mkdb.ModifyXMLElements(text, 'symbol', '<!\\[CDATA\\[|<ulink[^>]*>',
+                                      lambda tag: ']]>' if tag == '<![CDATA[' else '</ulink>',
+                                      lambda text, symbol, tag: text if tag else text.upper())
+
+    def test_OnlyChangesTextOutsideElements(self):
+        self.assertEqual('A <![CDATA[b]]> C <ulink url="d">e</ulink> F',
+                         self.modify('a <![CDATA[b]]> c <ulink url="d">e</ulink> f'))
+
+    def test_UnterminatedElementTakesTheRest(self):
+        with mock.patch('builtins.print'):
+            self.assertEqual('A <![CDATA[b < c', self.modify('a <![CDATA[b < c'))
+
+
+class ExpandAbbreviationsCallback(unittest.TestCase):
+
+    def expand(self, text):
+        return mkdb.ExpandAbbreviationsCallback(text, 'symbol', '')
+
+    def test_TextWithoutAbbreviationsIsUnchanged(self):
+        self.assertEqual('plain (text) here', self.expand('plain (text) here'))
+
+    def test_ExpandsAbbreviations(self):
+        self.assertEqual(
+            '<parameter>a</parameter> <link linkend="FOO:CAPS"><literal>FOO</literal></link> '
+            '<link linkend="Bar"><type>Bar</type></link>',
+            self.expand('@a %FOO #Bar'))
+
+    def test_ExpandsFunctions(self):
+        self.assertEqual(' <link linkend="foo-bar"><function>foo_bar()</function></link>',
+                         self.expand(' foo_bar ()'))
+
+    def test_KeepsEscapedAbbreviations(self):
+        self.assertEqual('\\@a \\%b #c', self.expand('\\@a \\%b \\#c'))
+
+    def test_ReusesTheLinks(self):
+        link = mkdb.MakeHashXRef('Obj::sig', 'type')
+        self.assertEqual('<link linkend="Obj-sig"><type>“sig”</type></link>', link)
+        self.assertIs(link, mkdb.MakeHashXRef('Obj::sig', 'type'))
+
+
 class OutputStruct(unittest.TestCase):
 
     def test_SimpleStructGetNormalized(self):
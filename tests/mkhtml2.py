@@ -19,6 +19,8 @@
 #
 
 import logging
+import os
+import tempfile
 import textwrap
 import unittest
 
@@ -106,6 +108,20 @@ class TestDataExtraction(unittest.TestCase):
         self.assertIn('API', mkhtml2.glossary)
         self.assertEqual('Application Programming Interface', mkhtml2.glossary['API'])
 
+    def test_number_footnotes(self):
+        files = self.chunk_db(textwrap.dedent("""\
+            <book>
+              <preface id="intro">
+                <para>One<footnote><para>1st</para></footnote></para>
+                <para>Two<footnote><para>2nd</para></footnote></para>
+              </preface>
+              <chapter id="chap1">
+                <para>Three<footnote><para>3rd</para></footnote></para>
+              </chapter>
+            </book>"""))
+        mkhtml2.number_footnotes(files)
+        self.assertEqual([1, 1, 3], [f.footnote_idx for f in files])
+
 
 class TestDevhelp(unittest.TestCase):
 
@@ -317,6 +333,173 @@ class TestNavNodes(unittest.TestCase):
         self.assertIn('nav_next', nav)
 
 
+class TestXInclude(unittest.TestCase):
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.parser = etree.XMLParser()
+        os.mkdir(os.path.join(self.tmpdir.name, 'xml'))
+        self.write('xml/chap.xml', '<chapter id="chap"><para>Text</para></chapter>')
+        self.write('xml/text.txt', 'int i;')
+        self.write('xml/para.xml', '<para>Para</para>')
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        mkhtml2.fragments.clear()
+
+    def write(self, name, content):
+        with open(os.path.join(self.tmpdir.name, name), 'w') as f:
+            f.write(content)
+
+    def load(self, body):
+        self.write('doc.xml',
+                   '<book xmlns:xi="http://www.w3.org/2003/XInclude">%s</book>' % body)
+        return etree.parse(os.path.join(self.tmpdir.name, 'doc.xml'), self.parser)
+
+    def test_xinclude_keeps_chunks_as_fragments(self):
+        tree = self.load('<xi:include href="xml/chap.xml"/>')
+        self.assertEqual([], mkhtml2.xinclude(tree.getroot(), self.parser))
+        files = mkhtml2.chunk(tree.getroot(), 'test')
+        chap = files.children[0]
+        self.assertEqual('chapter', chap.name)
+        self.assertEqual(chap.xml, chap.xml.getroottree().getroot())
+        self.assertEqual(0, len(tree.getroot()))
+
+    def test_xinclude_inserts_included_text(self):
+        tree = self.load('<para><xi:include href="xml/text.txt" parse="text"/> x</para>')
+        mkhtml2.xinclude(tree.getroot(), self.parser)
+        self.assertEqual('int i; x', tree.getroot()[0].text)
+
+    def test_xinclude_uses_fallback(self):
+        tree = self.load('<para><xi:include href="xml/none.xml"><xi:fallback>none</xi:fallback></xi:include></para>')
+        mkhtml2.xinclude(tree.getroot(), self.parser)
+        self.assertEqual('none', tree.getroot()[0].text)
+
+    def test_xinclude_fails_for_missing_include_without_fallback(self):
+        tree = self.load('<para><xi:include href="xml/none.xml"/></para>')
+        with self.assertRaises(etree.XIncludeError):
+            mkhtml2.resolve_xincludes(tree.getroot(), self.parser)
+
+    def test_xinclude_keeps_missing_include_in_included_doc(self):
+        self.write('xml/note.xml', '<note xmlns:xi="http://www.w3.org/2003/XInclude">'
+                   '<xi:include href="none.xml"/></note>')
+        tree = self.load('<para><xi:include href="xml/note.xml"/></para>')
+        mkhtml2.resolve_xincludes(tree.getroot(), self.parser)
+        self.assertEqual(mkhtml2.XINCLUDE_TAG, tree.getroot()[0][0][0].tag)
+
+    def test_xinclude_leaves_fragments_to_chunk_if_libxml2_is_used(self):
+        tree = self.load('<xi:include href="xml/chap.xml"/>'
+                         '<preface><xi:include href="xml/para.xml" xpointer="xpointer(/para)"/></preface>')
+        mkhtml2.resolve_xincludes(tree.getroot(), self.parser)
+        self.assertEqual('Para', tree.getroot()[1][0].text)
+        files = mkhtml2.chunk(tree.getroot(), 'test')
+        self.assertEqual(['chapter', 'preface'], [c.name for c in files.children])
+        self.assertEqual('Text', files.children[0].xml[0].text)
+        self.assertEqual({}, mkhtml2.fragments)
+
+    def test_xinclude_skips_includes_in_unused_fallback(self):
+        tree = self.load('<para><xi:include href="xml/text.txt" parse="text">'
+                         '<xi:fallback><xi:include href="xml/none.xml"/></xi:fallback>'
+                         '</xi:include></para>')
+        mkhtml2.resolve_xincludes(tree.getroot(), self.parser)
+        self.assertEqual('int i;', tree.getroot()[0].text)
+        self.assertEqual(0, len(tree.getroot()[0]))
+
+    def test_xinclude_resolves_includes_in_used_fallback(self):
+        tree = self.load('<para><xi:include href="xml/none.xml">'
+                         '<xi:fallback><xi:include href="xml/text.txt" parse="text"/></xi:fallback>'
+                         '</xi:include></para>')
+        mkhtml2.resolve_xincludes(tree.getroot(), self.parser)
+        self.assertEqual('int i;', tree.getroot()[0].text)
+
+
+class TestFingerprint(unittest.TestCase):
+
+    xml = textwrap.dedent("""\
+        <book id="index">
+          <bookinfo><title>test Reference Manual</title></bookinfo>
+          <chapter id="chap1"><title>Intro</title><para>See <xref linkend="chap2"/></para></chapter>
+          <chapter id="chap2"><title>%s</title></chapter>
+          <chapter id="chap3"><title>Misc</title><para>%s</para></chapter>
+        </book>""")
+
+    def fingerprints(self, xml):
+        root = etree.XML(xml)
+        files = mkhtml2.chunk(root, 'test')
+        files = [f for f in PreOrderIter(files) if f.anchor is None]
+        mkhtml2.add_id_links_and_titles(files, {})
+        return [mkhtml2.chunk_fingerprint('test', files, f, 'c') for f in files]
+
+    def test_fingerprint_is_stable(self):
+        fp1 = self.fingerprints(self.xml % ('Content', 'text'))
+        fp2 = self.fingerprints(self.xml % ('Content', 'text'))
+        self.assertEqual(fp1, fp2)
+
+    def test_fingerprint_changes_for_modified_chunk_only(self):
+        fp1 = self.fingerprints(self.xml % ('Content', 'text'))
+        fp2 = self.fingerprints(self.xml % ('Content', 'more text'))
+        self.assertEqual(fp1[:3], fp2[:3])
+        self.assertNotEqual(fp1[3], fp2[3])
+
+    def test_fingerprint_changes_for_referenced_title(self):
+        fp1 = self.fingerprints(self.xml % ('Content', 'text'))
+        fp2 = self.fingerprints(self.xml % ('Details', 'text'))
+        # book (toc), chap1 (xref, nav) and chap2 itself, chap3 (nav)
+        for i in range(4):
+            self.assertNotEqual(fp1[i], fp2[i])
+
+
+class TestWriteChunks(unittest.TestCase):
+
+    xml = textwrap.dedent("""\
+        <book id="index">
+          <bookinfo><title>test Reference Manual</title></bookinfo>
+          <chapter id="chap1"><title>Intro</title>
+            <para>See <xref linkend="chap2"/> and <link linkend="sect1">Details</link></para>
+            <mediaobject><imageobject><imagedata fileref="intro.png"/></imageobject></mediaobject>
+          </chapter>
+          <chapter id="chap2"><title>Usage</title>
+            <sect1 id="sect1"><title>Details</title><para>Text<footnote><para>Note</para></footnote></para></sect1>
+            <programlisting language="c">int i;</programlisting>
+          </chapter>
+          <chapter id="chap3"><title>Misc</title>
+            <para><inlinegraphic fileref="misc.png"/></para>
+          </chapter>
+        </book>""")
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+        mkhtml2.assets.clear()
+
+    def write_chunks(self, jobs):
+        out_dir = os.path.join(self.tmpdir.name, str(jobs))
+        os.mkdir(out_dir)
+        files = mkhtml2.chunk(etree.XML(self.xml), 'test')
+        files = [f for f in PreOrderIter(files) if f.anchor is None]
+        mkhtml2.add_id_links_and_titles(files, {})
+        mkhtml2.build_glossary(files)
+        mkhtml2.number_footnotes(files)
+        (chunk_assets, chunk_reports) = mkhtml2.write_chunks(
+            out_dir, 'test', files, range(len(files)), 'c', jobs)
+        html = {}
+        for name in sorted(os.listdir(out_dir)):
+            with open(os.path.join(out_dir, name), 'rb') as f:
+                html[name] = f.read()
+        return (html, chunk_assets, chunk_reports)
+
+    def test_parallel_output_is_identical(self):
+        (html1, assets1, reports1) = self.write_chunks(1)
+        (html2, assets2, reports2) = self.write_chunks(2)
+        self.assertEqual(['chap1.html', 'chap2.html', 'chap3.html', 'index.html'], list(html1))
+        self.assertEqual(html1, html2)
+        self.assertEqual({0: [], 1: ['intro.png'], 2: [], 3: ['misc.png']}, assets1)
+        self.assertEqual(assets1, assets2)
+        self.assertEqual(reports1, reports2)
+
+
 class TestConverter(unittest.TestCase):
 
     xml_book_beg = textwrap.dedent("""\
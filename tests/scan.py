@@ -19,9 +19,14 @@
 #
 
 import argparse
+import io
+import os
+import tempfile
 import textwrap
 import unittest
 
+from unittest import mock
+
 from parameterized import parameterized
 
 from gtkdoc import scan
@@ -68,6 +73,9 @@ class ScanHeaderContentTestCase(unittest.TestCase):
         self.decls = []
         self.types = []
         self.options = argparse.Namespace(
+            module='tester',
+            jobs=1,
+            matcher_stats=False,
             deprecated_guards='GTKDOC_TESTER_DISABLE_DEPRECATED',
             ignore_decorators='',
             rebuild_types=False)
@@ -94,6 +102,11 @@ class ScanHeaderContent(ScanHeaderContentTestCase):
         slist, doc_comments = self.scanHeaderContent([])
         self.assertNothingFound(slist, doc_comments)
 
+    def test_ReadsLinesFromStream(self):
+        stream = io.StringIO('#define FOO 1\n#define BAR 2\n')
+        slist, doc_comments = self.scanHeaderContent(stream)
+        self.assertEqual(['FOO', 'BAR'], slist)
+
     def test_IgnoresOneLineComments(self):
         slist, doc_comments = self.scanHeaderContent(['/* test */'])
         self.assertNothingFound(slist, doc_comments)
@@ -937,6 +950,99 @@ class RemoveBracedContent(ScanHeaderContentTestCase):
         self.assertEqual(skip, False)
 
 
+class ScanHeaderCache(ScanHeaderContentTestCase):
+    """Test the cache for the results of scanning header files."""
+
+    def setUp(self):
+        super().setUp()
+        self.options.rebuild_types = True
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.header = os.path.join(self.tmp_dir.name, 'gtkdoc-object.h')
+        self.writeHeader('GType gtkdoc_object_get_type (void);\n')
+        self.cache_dir = scan.HEADER_CACHE_DIR
+        scan.HEADER_CACHE_DIR = os.path.join(self.tmp_dir.name, 'cache')
+        os.mkdir(scan.HEADER_CACHE_DIR)
+
+    def tearDown(self):
+        scan.HEADER_CACHE_DIR = self.cache_dir
+        self.tmp_dir.cleanup()
+
+    def writeHeader(self, content):
+        with open(self.header, 'w', encoding='utf-8') as f:
+            f.write(content)
+
+    def scanHeader(self):
+        with mock.patch.object(scan, 'ScanHeaderFile', wraps=scan.ScanHeaderFile) as m:
+            result = scan.ScanHeader(self.header, self.options)
+        return result, m.called
+
+    def test_UnchangedHeaderIsTakenFromCache(self):
+        result, scanned = self.scanHeader()
+        self.assertTrue(scanned)
+        self.assertEqual(['gtkdoc_object_get_type'], result[3])
+        cached, scanned = self.scanHeader()
+        self.assertFalse(scanned)
+        self.assertEqual(result, cached)
+
+    def test_TouchedHeaderIsTakenFromCache(self):
+        self.scanHeader()
+        st = os.stat(self.header)
+        os.utime(self.header, ns=(st.st_atime_ns, st.st_mtime_ns + 10**9))
+        _, scanned = self.scanHeader()
+        self.assertFalse(scanned)
+
+    def test_ChangedHeaderIsScanned(self):
+        self.scanHeader()
+        self.writeHeader('GType gtkdoc_object_get_type (void);\nint gtkdoc_object_new (void);\n')
+        result, scanned = self.scanHeader()
+        self.assertTrue(scanned)
+        self.assertIn('<NAME>gtkdoc_object_new</NAME>', ''.join(result[2]))
+
+    def test_ChangedOptionsAreScanned(self):
+        self.scanHeader()
+        self.options.deprecated_guards = 'GTKDOC_OTHER_DISABLE_DEPRECATED'
+        _, scanned = self.scanHeader()
+        self.assertTrue(scanned)
+
+    def test_ChangedModuleIsScanned(self):
+        self.scanHeader()
+        self.options.module = 'glib'
+        _, scanned = self.scanHeader()
+        self.assertTrue(scanned)
+
+
+class MatcherStats(ScanHeaderContentTestCase):
+    """Test the statistics for the matchers."""
+
+    def setUp(self):
+        super().setUp()
+        self.options.matcher_stats = True
+        scan.InitScanner(self.options)
+
+    def tearDown(self):
+        self.options.matcher_stats = False
+        scan.InitScanner(self.options)
+
+    def test_CountsCallsAndHits(self):
+        self.scanHeaderContent([
+            '#define FOO 1\n',
+            '#define BAR 2\n',
+        ])
+        stats = {s.name: s for s in scan.MATCHER_STATS}
+        self.assertEqual(2, stats['CLINE_MATCHER[0]'].calls)
+        self.assertEqual(2, stats['CLINE_MATCHER[0]'].hits)
+        self.assertEqual(0, stats['CLINE_MATCHER[1]'].calls)
+        self.assertEqual(2, stats['private_header'].calls)
+        self.assertEqual(0, stats['private_header'].hits)
+
+    def test_InitScannerRemovesStats(self):
+        self.options.matcher_stats = False
+        scan.InitScanner(self.options)
+        self.assertIsNone(scan.MATCHER_STATS)
+        self.assertFalse(isinstance(scan.CLINE_MATCHER[0], scan.MatcherStats))
+        self.assertFalse(isinstance(scan.MATCHER['private_header'], scan.MatcherStats))
+
+
 if __name__ == '__main__':
     from gtkdoc import common
     common.setup_logging()
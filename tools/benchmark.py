@@ -0,0 +1,412 @@
+#!/usr/bin/env python3
+# -*- python; coding: utf-8 -*-
+#
+# gtk-doc - GTK DocBook documentation generator.
+# Copyright (C) 2017  Stefan Sauer
+#
+# This program is free software; you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation; either version 2 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program; if not, write to the Free Software
+# Foundation, Inc., 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301, USA.
+#
+
+"""Benchmarks for the gtk-doc tools.
+
+The benchmarks run on the test suites. Build those first, so that the docs
+have been generated, e.g.:
+make check
+
+To compare two revisions run the benchmark in both checkouts.
+
+Examples:
+python3 tools/benchmark.py mkhtml2-memory tests/bugs/docs tests/gobject/docs
+python3 tools/benchmark.py fixxref --repeat=5 tests/gobject/docs/html
+python3 tools/benchmark.py scan --repeat=5 --synthetic=2000 tests/*/src
+python3 tools/benchmark.py scan-source --repeat=5 --synthetic=2000 tests/*/src
+python3 tools/benchmark.py doc-comment --repeat=3 --size=1024
+"""
+
+import argparse
+import glob
+import os
+import subprocess
+import sys
+import tempfile
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MKHTML2_CHILD = """
+import logging, resource, sys
+from gtkdoc import mkhtml2
+print(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, flush=True)
+logging.basicConfig(level=logging.ERROR)
+mkhtml2.main(sys.argv[1], sys.argv[2], sys.argv[3], True, 'c', [])
+"""
+
+FIXXREF_CHILD = """
+import logging, shutil, sys, tempfile
+from timeit import default_timer as timer
+from gtkdoc import fixxref
+logging.basicConfig(level=logging.ERROR)
+fixxref.LoadIndicies(sys.argv[2], '', [])
+with tempfile.TemporaryDirectory() as tmp_dir:
+    module_dir = shutil.copytree(sys.argv[2], tmp_dir + '/html')
+    _t = timer()
+    fixxref.FixCrossReferences(module_dir, sys.argv[1], 'c')
+    print(timer() - _t)
+"""
+
+SCAN_CHILD = """
+import argparse, logging, sys
+from timeit import default_timer as timer
+from gtkdoc import scan
+logging.basicConfig(level=logging.ERROR)
+options = argparse.Namespace(deprecated_guards='GTKDOC_TESTER_DISABLE_DEPRECATED',
+                             ignore_decorators='', rebuild_types=True, module='tester',
+                             matcher_stats=False)
+scan.InitScanner(options)
+for header in sys.argv[2:]:
+    with open(header, 'r', encoding='utf-8') as f:
+        input_lines = f.readlines()
+    times = []
+    for _ in range(int(sys.argv[1])):
+        _t = timer()
+        scan.ScanHeaderContent(input_lines, [], [], options)
+        times.append(timer() - _t)
+    print(min(times), len(input_lines))
+"""
+
+SCAN_SOURCE_CHILD = """
+import logging, sys
+from timeit import default_timer as timer
+from gtkdoc import mkdb
+logging.basicConfig(level=logging.ERROR)
+for source in sys.argv[2:]:
+    times = []
+    for _ in range(int(sys.argv[1])):
+        with open(source, 'r', encoding='utf-8') as f:
+            _t = timer()
+            lines = sum(1 for _ in f)
+            f.seek(0)
+            blocks = sum(1 for _ in mkdb.ScanSourceContent(f))
+            times.append(timer() - _t)
+    print(min(times), lines)
+"""
+
+DOC_COMMENT_CHILD = """
+import logging, sys
+from timeit import default_timer as timer
+from gtkdoc import mkdb
+logging.basicConfig(level=logging.ERROR)
+with open(sys.argv[2], 'r', encoding='utf-8') as f:
+    text = f.read()
+mkdb.INLINE_MARKUP_MODE = True
+for func in (mkdb.ExpandAbbreviations, mkdb.ConvertXMLChars):
+    times = []
+    for _ in range(int(sys.argv[1])):
+        _t = timer()
+        func('synthetic', text)
+        times.append(timer() - _t)
+    print(func.__name__, min(times))
+"""
+
+SYNTHETIC_HEADER = """
+#define GTKDOC_TYPE_OBJECT%(n)d (gtkdoc_object%(n)d_get_type())
+#define GTKDOC_OBJECT%(n)d(obj) (G_TYPE_CHECK_INSTANCE_CAST ((obj), \\
+    GTKDOC_TYPE_OBJECT%(n)d, GtkdocObject%(n)d))
+
+typedef struct _GtkdocObject%(n)d GtkdocObject%(n)d;
+typedef struct _GtkdocObject%(n)dClass GtkdocObject%(n)dClass;
+
+/**
+ * GtkdocEnum%(n)d:
+ * @GTKDOC_ENUM%(n)d_V1: first
+ * @GTKDOC_ENUM%(n)d_V2: second
+ *
+ * Enum values.
+ */
+typedef enum {
+  GTKDOC_ENUM%(n)d_V1 = 0,
+  GTKDOC_ENUM%(n)d_V2 = 1
+} GtkdocEnum%(n)d;
+
+struct _GtkdocObject%(n)d {
+  GObject parent;
+  /*< private >*/
+  gint counter;
+};
+
+typedef void (*GtkdocCallback%(n)d) (GtkdocObject%(n)d *self,
+                                     gpointer user_data);
+
+GType gtkdoc_object%(n)d_get_type (void) G_GNUC_CONST;
+GtkdocObject%(n)d *gtkdoc_object%(n)d_new (void);
+void gtkdoc_object%(n)d_set_name (GtkdocObject%(n)d *self,
+                                  const gchar *name);
+const gchar *
+gtkdoc_object%(n)d_get_name (GtkdocObject%(n)d *self);
+extern gint gtkdoc_object%(n)d_counter;
+
+#ifndef GTKDOC_TESTER_DISABLE_DEPRECATED
+void gtkdoc_object%(n)d_frobnicate (GtkdocObject%(n)d *self);
+#endif
+
+static inline gint
+gtkdoc_object%(n)d_inline (gint a)
+{
+  return a + 1;
+}
+"""
+
+SYNTHETIC_SOURCE = """
+/**
+ * gtkdoc_object%(n)d_set_name:
+ * @self: the object
+ * @name: the new name
+ *
+ * Sets the name of the object. See gtkdoc_object%(n)d_get_name().
+ *
+ * Since: 1.%(n)d
+ */
+void
+gtkdoc_object%(n)d_set_name (GtkdocObject%(n)d *self, const gchar *name)
+{
+  g_return_if_fail (GTKDOC_IS_OBJECT%(n)d (self));
+
+  /* replace the old name */
+  g_free (self->name);
+  self->name = g_strdup (name);
+  g_object_notify_by_pspec (G_OBJECT (self), properties[PROP_NAME]);
+}
+
+static void
+gtkdoc_object%(n)d_finalize (GObject *object)
+{
+  GtkdocObject%(n)d *self = GTKDOC_OBJECT%(n)d (object);
+
+  g_free (self->name);
+
+  G_OBJECT_CLASS (gtkdoc_object%(n)d_parent_class)->finalize (object);
+}
+"""
+
+SYNTHETIC_DOC_COMMENT = """
+Call gtkdoc_object%(n)d_new() to create a #GtkdocObject%(n)d and pass %%NULL for
+@name to keep the default name. See <ulink url="https://example.org/%(n)d">the
+website</ulink> for details, the value must be < 10 && > 0.
+|[<!-- language="C" -->
+GtkdocObject%(n)d *obj = gtkdoc_object%(n)d_new ();
+if (a < b && b > c)
+  gtkdoc_object%(n)d_set_name (obj, "name");
+]|
+<programlisting>
+x = gtkdoc_object%(n)d_get_name (obj) < y;
+</programlisting>
+"""
+
+
+def synthetic_header(blocks):
+    """Generate a large header with typical declarations.
+
+    Args:
+        blocks (int): number of times the declarations are repeated
+
+    Returns:
+        str: the content of the header
+    """
+    return ''.join(SYNTHETIC_HEADER % {'n': n} for n in range(blocks))
+
+
+def synthetic_source(blocks):
+    """Generate a large source file with typical code and doc comments.
+
+    Args:
+        blocks (int): number of times the functions are repeated
+
+    Returns:
+        str: the content of the source file
+    """
+    return ''.join(SYNTHETIC_SOURCE % {'n': n} for n in range(blocks))
+
+
+def synthetic_doc_comment(size):
+    """Generate a long doc comment with markup, links and code examples.
+
+    Args:
+        size (int): the minimal size of the text in bytes
+
+    Returns:
+        str: the text of the doc comment
+    """
+    parts = []
+    length = n = 0
+    while length < size:
+        parts.append(SYNTHETIC_DOC_COMMENT % {'n': n})
+        length += len(parts[-1])
+        n += 1
+    return ''.join(parts)
+
+
+def find_files(paths, suffix):
+    """Collect the files from the paths.
+
+    Args:
+        paths (list): files or directories
+        suffix (str): the suffix of the files to take from the directories
+
+    Returns:
+        list: the files
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(glob.glob(os.path.join(path, '*' + suffix))))
+        else:
+            files.append(path)
+    return files
+
+
+def run_scan_child(code, suffix, synthetic, options):
+    files = find_files(options.paths, suffix)
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        if options.synthetic:
+            synthetic_file = os.path.join(tmp_dir, 'synthetic' + suffix)
+            with open(synthetic_file, 'w', encoding='utf-8') as f:
+                f.write(synthetic(options.synthetic))
+            files.append(synthetic_file)
+        output, _ = run_child(code, [str(options.repeat)] + files, os.getcwd())
+
+    total_time = total_lines = 0
+    for name, result in zip(files, output.splitlines()):
+        time, lines = result.split()
+        total_time += float(time)
+        total_lines += int(lines)
+        print('%-40s %8s lines, scan: %8.4lf s' % (os.path.basename(name), lines, float(time)))
+    print('%-40s %8d lines, scan: %8.4lf s' % ('total', total_lines, total_time))
+
+
+def run_child(code, args, cwd):
+    """Run python code in a new process.
+
+    Args:
+        code (str): the python code
+        args (list): command line arguments for the code
+        cwd (str): working directory
+
+    Returns:
+        tuple: the output of the code and the peak resident set size in kB
+    """
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [ROOT_DIR, env.get('PYTHONPATH')]))
+    proc = subprocess.Popen([sys.executable, '-c', code] + args, cwd=cwd, env=env,
+                            stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+                            universal_newlines=True)
+    output = proc.stdout.read()
+    _, status, rusage = os.wait4(proc.pid, 0)
+    if status:
+        raise subprocess.CalledProcessError(status, code)
+    return output, rusage.ru_maxrss
+
+
+def bench_mkhtml2_memory(options):
+    for docs_dir in options.docs_dirs:
+        with tempfile.TemporaryDirectory() as out_dir:
+            output, peak = run_child(MKHTML2_CHILD,
+                                     [options.module, options.main_file, out_dir],
+                                     docs_dir)
+        # the rss after the imports is the baseline
+        startup = int(output.split()[0])
+        print('%-30s peak rss: %8d kB, after imports: %8d kB, growth: %8d kB' % (
+            docs_dir, peak, startup, peak - startup))
+
+
+def bench_fixxref(options):
+    for html_dir in options.html_dirs:
+        times = []
+        for _ in range(options.repeat):
+            output, _ = run_child(FIXXREF_CHILD, [options.module, os.path.abspath(html_dir)],
+                                  os.getcwd())
+            times.append(float(output))
+        print('%-30s fix html: %8.3lf s' % (html_dir, min(times)))
+
+
+def bench_scan(options):
+    run_scan_child(SCAN_CHILD, '.h', synthetic_header, options)
+
+
+def bench_scan_source(options):
+    run_scan_child(SCAN_SOURCE_CHILD, '.c', synthetic_source, options)
+
+
+def bench_doc_comment(options):
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        doc_file = os.path.join(tmp_dir, 'doc-comment.txt')
+        with open(doc_file, 'w', encoding='utf-8') as f:
+            f.write(synthetic_doc_comment(options.size * 1024))
+        output, _ = run_child(DOC_COMMENT_CHILD, [str(options.repeat), doc_file], os.getcwd())
+    for result in output.splitlines():
+        name, time = result.split()
+        print('%-30s %6d kB: %8.4lf s' % (name, options.size, float(time)))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='gtk-doc benchmarks')
+    subparsers = parser.add_subparsers(dest='benchmark')
+    subparsers.required = True
+
+    mkhtml2_memory = subparsers.add_parser(
+        'mkhtml2-memory', help='Peak memory use of gtkdoc-mkhtml2')
+    mkhtml2_memory.add_argument('--module', default='tester')
+    mkhtml2_memory.add_argument('--main-file', default='tester-docs.xml')
+    mkhtml2_memory.add_argument('docs_dirs', nargs='+')
+    mkhtml2_memory.set_defaults(func=bench_mkhtml2_memory)
+
+    fixxref = subparsers.add_parser(
+        'fixxref', help='Time for fixing the cross references of html files')
+    fixxref.add_argument('--module', default='tester')
+    fixxref.add_argument('--repeat', type=int, default=1,
+                         help='Run this often and report the best time')
+    fixxref.add_argument('html_dirs', nargs='+')
+    fixxref.set_defaults(func=bench_fixxref)
+
+    scan = subparsers.add_parser(
+        'scan', help='Time for scanning header files')
+    scan.add_argument('--repeat', type=int, default=1,
+                      help='Run this often and report the best time')
+    scan.add_argument('--synthetic', type=int, default=0,
+                      help='Also scan a generated header with this many blocks of declarations')
+    scan.add_argument('paths', nargs='*', help='Header files or directories')
+    scan.set_defaults(func=bench_scan)
+
+    scan_source = subparsers.add_parser(
+        'scan-source', help='Time for finding the doc comments in source files')
+    scan_source.add_argument('--repeat', type=int, default=1,
+                             help='Run this often and report the best time')
+    scan_source.add_argument('--synthetic', type=int, default=0,
+                             help='Also scan a generated source file with this many blocks of functions')
+    scan_source.add_argument('paths', nargs='*', help='Source files or directories')
+    scan_source.set_defaults(func=bench_scan_source)
+
+    doc_comment = subparsers.add_parser(
+        'doc-comment', help='Time for expanding the abbreviations of a long doc comment')
+    doc_comment.add_argument('--repeat', type=int, default=1,
+                             help='Run this often and report the best time')
+    doc_comment.add_argument('--size', type=int, default=1024,
+                             help='Size of the generated doc comment in kB')
+    doc_comment.set_defaults(func=bench_doc_comment)
+
+    options = parser.parse_args()
+    options.func(options)
+
+
+if __name__ == '__main__':
+    main()